@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+AFH Property Scout Startup Benchmark
+Measures cold-start time and modules loaded for each CLI mode
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+from pathlib import Path
+
+# Components each CLI mode touches before doing its work (see AFHPropertyScout in src/main.py)
+MODE_COMPONENTS = {
+    'summary': ['db_manager'],
+    'rescore': ['db_manager', 'afh_analyzer'],
+    'portfolio': ['db_manager', 'afh_analyzer', 'portfolio_optimizer'],
+    'sensitivity': ['db_manager', 'afh_analyzer', 'sensitivity_analyzer'],
+    'notify': ['db_manager', 'afh_analyzer', 'notification_manager'],
+    'schedule': ['scheduler'],
+    'compact': ['db_manager'],
+    'export': ['db_manager'],
+    'daily': ['db_manager', 'property_filter', 'comps_engine', 'afh_analyzer', 'analysis_cache',
+              'notification_manager', 'property_scraper'],
+    # --search runs the daily search once
+    'search': ['db_manager', 'property_filter', 'comps_engine', 'afh_analyzer', 'analysis_cache',
+               'notification_manager', 'property_scraper'],
+}
+
+# Runs in a fresh interpreter so import costs are not hidden by a warm sys.modules
+STARTUP_SCRIPT = '''
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {src!r})
+from loguru import logger
+logger.remove()
+from main import AFHPropertyScout
+scout = AFHPropertyScout({config!r})
+for component in {components!r}:
+    getattr(scout, component)
+print(json.dumps({{'seconds': time.perf_counter() - start, 'modules': len(sys.modules)}}))
+'''
+
+def measure(mode: str, config_path: str, runs: int) -> dict:
+    """Median startup time and module count for one CLI mode"""
+    script = STARTUP_SCRIPT.format(src=str(Path(__file__).parent / 'src'), config=config_path,
+                                   components=MODE_COMPONENTS[mode])
+    timings = []
+    modules = 0
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()
+            return {'mode': mode, 'error': error[-1] if error else f'exit code {result.returncode}'}
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(sample['seconds'])
+        modules = sample['modules']
+    
+    return {'mode': mode, 'median_ms': statistics.median(timings) * 1000, 'modules': modules}
+
+def main():
+    """Run the startup benchmark for the selected CLI modes"""
+    parser = argparse.ArgumentParser(description="Benchmark AFH Property Scout startup per CLI mode")
+    parser.add_argument('modes', nargs='*', default=list(MODE_COMPONENTS), help='Modes to benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreter runs per mode')
+    parser.add_argument('--config', default='config/settings.yaml', help='Configuration file path')
+    args = parser.parse_args()
+    
+    print(f"{'mode':<12}{'startup (ms)':>14}{'modules':>10}")
+    for mode in args.modes:
+        result = measure(mode, args.config, args.runs)
+        if 'error' in result:
+            print(f"{mode:<12}  unavailable: {result['error']}")
+        else:
+            print(f"{mode:<12}{result['median_ms']:>14.1f}{result['modules']:>10}")
+
+if __name__ == "__main__":
+    main()
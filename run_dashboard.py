@@ -12,7 +12,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent / 'src'))
 
 from dashboard.dashboard import AFHDashboard, create_dashboard_templates
-from storage.database import DatabaseManager
+from storage.backends import create_database_manager
 import yaml
 
 def main():
@@ -32,7 +32,7 @@ def main():
     create_dashboard_templates()
     
     # Initialize database manager
-    db_manager = DatabaseManager(config['database'])
+    db_manager = create_database_manager(config['database'])
     
     # Create and run dashboard
     dashboard = AFHDashboard(db_manager, config)
@@ -11,17 +11,21 @@ from pathlib import Path
 # Add src to path
 sys.path.append(str(Path(__file__).parent / 'src'))
 
-from main import AFHPropertyScout
+from main import AFHPropertyScout, build_parser
 
 def main():
     """Run the AFH Property Scout system"""
     
+    # Same flags as src/main.py, so every command is available from this entry point
+    parser = build_parser()
+    args = parser.parse_args()
+    
     print("🏠 AFH Property Scout - Starting System")
     print("=" * 50)
     
     try:
         # Initialize the scout system
-        scout = AFHPropertyScout()
+        scout = AFHPropertyScout(args.config)
         
         print("\nSystem initialized successfully!")
         print("\nAvailable commands:")
@@ -30,44 +34,84 @@ def main():
         print("3. Check notifications: python run_scout.py --notify")
         print("4. Start scheduler: python run_scout.py --schedule")
         print("5. Show summary: python run_scout.py --summary")
-        print("6. Run dashboard: python run_dashboard.py")
+        print("6. Re-score stored analyses: python run_scout.py --rescore")
+        print("7. Optimize portfolio: python run_scout.py --portfolio [--budget AMOUNT]")
+        print("8. Sensitivity analysis: python run_scout.py --sensitivity [N]")
+        print("9. Compact database: python run_scout.py --compact")
+        print("10. Export snapshot: python run_scout.py --export [DIR] [--export-format parquet|arrow]")
+        print("11. Run dashboard: python run_dashboard.py")
         
         # Check command line arguments
-        if len(sys.argv) > 1:
-            command = sys.argv[1]
+        if args.daily:
+            print("\n🔄 Running daily search...")
+            results = scout.run_daily_search()
+            print(f"✅ Daily search completed. Found {len(results)} viable properties.")
+            
+        elif args.search:
+            print("\n🔍 Running one-time search...")
+            results = scout.run_one_time_search()
+            print(f"✅ Search completed. Found {len(results)} viable properties.")
+            
+        elif args.notify:
+            print("\n📧 Checking notifications...")
+            scout.check_notifications()
+            print("✅ Notification check completed.")
+            
+        elif args.schedule:
+            print("\n⏰ Starting daily scheduler...")
+            print("Scheduler will run daily at 8:00 AM")
+            print("Press Ctrl+C to stop the scheduler")
+            scout.start_scheduler()
+            
+        elif args.rescore:
+            print("\n🧮 Re-scoring stored analyses...")
+            rescored = scout.rescore_analyses()
+            print(f"✅ Re-scored {rescored} analyses.")
             
-            if command == '--daily':
-                print("\n🔄 Running daily search...")
-                results = scout.run_daily_search()
-                print(f"✅ Daily search completed. Found {len(results)} viable properties.")
-                
-            elif command == '--search':
-                print("\n🔍 Running one-time search...")
-                results = scout.run_one_time_search()
-                print(f"✅ Search completed. Found {len(results)} viable properties.")
-                
-            elif command == '--notify':
-                print("\n📧 Checking notifications...")
-                scout.check_notifications()
-                print("✅ Notification check completed.")
-                
-            elif command == '--schedule':
-                print("\n⏰ Starting daily scheduler...")
-                print("Scheduler will run daily at 8:00 AM")
-                print("Press Ctrl+C to stop the scheduler")
-                scout.start_scheduler()
-                
-            elif command == '--summary':
-                print("\n📊 Property Summary:")
-                summary = scout.get_property_summary()
-                print(f"Total properties: {summary.get('total', 0)}")
-                print(f"Viable properties: {summary.get('viable', 0)}")
-                print(f"New properties: {summary.get('new', 0)}")
-                print(f"Average viability score: {summary.get('average_viability_score', 0)}%")
-                
+        elif args.portfolio:
+            print("\n💼 Optimizing portfolio...")
+            portfolio = scout.optimize_portfolio(args.budget)
+            print(f"Portfolio ({portfolio['candidates_considered']} candidates, budget ${portfolio['budget']:,.0f}):")
+            for selected in portfolio['selected']:
+                print(f"  {selected['address']}: ${selected['capital_required']:,.0f} capital, "
+                      f"${selected['monthly_cash_flow']:,.0f}/mo, marginal ${selected['marginal_value']:,.0f}/mo")
+            print(f"✅ Total: ${portfolio['total_capital']:,.0f} capital, "
+                  f"${portfolio['total_monthly_cash_flow']:,.0f}/mo cash flow")
+            
+        elif args.sensitivity is not None:
+            print("\n🎲 Running sensitivity analysis...")
+            results = scout.run_sensitivity(args.sensitivity)
+            percentiles = scout.sensitivity_analyzer.percentiles
+            min_cash_flow = scout.afh_analyzer.min_cash_flow
+            for result in results:
+                cash_flow = ', '.join(f"p{percentile} ${result[f'cash_flow_p{percentile}']:,.0f}" for percentile in percentiles)
+                print(f"  {result['address']}: cash flow {cash_flow}/mo; "
+                      f"P(cash flow >= ${min_cash_flow:,.0f}) {result['prob_min_cash_flow']:.0%}, "
+                      f"P(viable) {result['prob_viable']:.0%}")
+            print(f"✅ Sensitivity analysis completed for {len(results)} properties.")
+            
+        elif args.compact:
+            print("\n🧹 Compacting database...")
+            result = scout.compact_database()
+            if 'error' in result:
+                print(f"❌ Compaction failed: {result['error']}")
             else:
-                print(f"❌ Unknown command: {command}")
-                print("Use --help to see available commands")
+                print(f"✅ Compaction deleted {sum(result['deleted'].values())} rows, "
+                      f"reclaimed {result['bytes_reclaimed'] / (1024 * 1024):.2f} MB.")
+            
+        elif args.export is not None:
+            print("\n📦 Exporting property snapshot...")
+            result = scout.export_snapshot(args.export or None, args.export_format)
+            print(f"✅ Exported {result['rows']} properties in {result['files']} files to {result['path']}.")
+            
+        elif args.summary:
+            print("\n📊 Property Summary:")
+            summary = scout.get_property_summary()
+            print(f"Total properties: {summary.get('total', 0)}")
+            print(f"Viable properties: {summary.get('viable', 0)}")
+            print(f"New properties: {summary.get('new', 0)}")
+            print(f"Average viability score: {summary.get('average_viability_score', 0)}%")
+            
         else:
             print("\n💡 No command specified. Use --help to see available commands")
             
@@ -64,7 +64,7 @@ def setup_database():
     try:
         # Import and initialize database
         sys.path.append('src')
-        from storage.database import DatabaseManager
+        from storage.backends import create_database_manager
         import yaml
         
         # Load config
@@ -72,7 +72,7 @@ def setup_database():
             config = yaml.safe_load(f)
         
         # Initialize database
-        db_manager = DatabaseManager(config['database'])
+        db_manager = create_database_manager(config['database'])
         print("✅ Database initialized successfully")
         return True
     except Exception as e:
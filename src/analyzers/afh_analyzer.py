@@ -3,16 +3,161 @@ AFH Financial Analyzer - Analyzes properties for AFH viability and optimal prici
 """
 
 import math
-from typing import Dict, Any, List
+import os
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 from loguru import logger
-import pandas as pd
+import numpy as np
+from analyzers.financing import FinancingModel
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Bump when scoring logic changes so cached analyses are invalidated
+ANALYSIS_VERSION = 3
+
+# afh_analysis settings that do not affect component scores (excluded from config_hash). The
+# viability weights and threshold only combine component scores, so cached and stored analyses
+# are re-scored with them (apply_viability, rescore_analyses) rather than re-analyzed
+NON_SCORING_CONFIG_KEYS = ('parallel', 'pricing_grid', 'sensitivity', 'loan_products',
+                           'viability_weights', 'viability_threshold')
+
+# Property fields that influence analyze_property results
+ANALYSIS_FIELDS = (
+    'price', 'bedrooms', 'bathrooms', 'sqft', 'county',
+    'wabo_status', 'property_type', 'description'
+)
+
+# Default component weights for the overall viability score
+DEFAULT_VIABILITY_WEIGHTS = {
+    'basic': 0.25,      # 25% - Property characteristics
+    'financial': 0.30,  # 30% - Financial viability
+    'market': 0.15,     # 15% - Market position
+    'wabo': 0.20,       # 20% - WABO status
+    'risk': 0.10        # 10% - Risk assessment (inverted risk score)
+}
+DEFAULT_VIABILITY_THRESHOLD = 70
+
+# Target counties for basic viability scoring
+TARGET_COUNTIES = ['lewis', 'thurston', 'pierce', 'king']
+
+# Market positioning by county (first match wins)
+COUNTY_MARKET_DATA = {
+    'king': {'avg_price_per_sqft': 400, 'market_demand': 'high', 'competition': 'high'},
+    'pierce': {'avg_price_per_sqft': 250, 'market_demand': 'medium', 'competition': 'medium'},
+    'thurston': {'avg_price_per_sqft': 200, 'market_demand': 'medium', 'competition': 'low'},
+    'lewis': {'avg_price_per_sqft': 150, 'market_demand': 'low', 'competition': 'low'}
+}
+DEFAULT_MARKET_DATA = {'avg_price_per_sqft': 250, 'market_demand': 'medium', 'competition': 'medium'}
+
+# WABO status scoring
+WABO_SCORES = {
+    'approved': 100,
+    'inspected': 80,
+    'mentioned': 60,
+    'none': 20,
+    'unknown': 30
+}
+
+# Additional WABO-related keywords
+WABO_KEYWORDS = {
+    'dshs': 20,
+    'licensed': 25,
+    'inspection': 15,
+    'ready': 20,
+    'turnkey': 15,
+    'renovated': 10
+}
+
+# Columnar encodings used by analyze_batch (code 0 is always "other")
+COUNTY_CODES = ('other',) + tuple(COUNTY_MARKET_DATA)
+WABO_CODES = ('other',) + tuple(WABO_SCORES)
+PROPERTY_TYPE_CODES = ('other', 'single_story', 'multi_story')
+DESCRIPTION_KEYWORDS = tuple(WABO_KEYWORDS) + ('needs work', 'fixer')
+KEYWORD_FLAGS = {keyword: 1 << bit for bit, keyword in enumerate(DESCRIPTION_KEYWORDS)}
+
+def weighted_viability_score(basic, financial, market, wabo, risk, weights: Dict[str, float]):
+    """Combine component scores (scalars or arrays) into the overall viability score"""
+    # Summation order is fixed so scalar, batch and SQL re-scoring agree exactly
+    return (
+        basic * weights['basic'] +
+        financial * weights['financial'] +
+        market * weights['market'] +
+        wabo * weights['wabo'] +
+        (100 - risk) * weights['risk']
+    )
+
+def county_code(county: str) -> int:
+    """Map a county name to its COUNTY_CODES index (first match wins, 0 for other)"""
+    county = county.lower()
+    for code, county_key in enumerate(COUNTY_CODES[1:], start=1):
+        if county_key in county:
+            return code
+    return 0
+
+def listing_key(property_data: Dict[str, Any]) -> tuple:
+    """(source, listing_id, address) identity of a listing, as text like the stored UNIQUE key"""
+    return tuple(str(property_data.get(column, '')) for column in ('source', 'listing_id', 'address'))
+
+def encode_property(property_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Encode a property dict into the columnar codes used by analyze_batch"""
+    wabo_status = property_data.get('wabo_status', 'unknown')
+    wabo_code = WABO_CODES.index(wabo_status) if wabo_status in WABO_SCORES else 0
+    
+    property_type = property_data.get('property_type', '').lower()
+    if 'rambler' in property_type or 'single story' in property_type:
+        property_type_code = 1
+    elif 'two story' in property_type or 'multi' in property_type:
+        property_type_code = 2
+    else:
+        property_type_code = 0
+    
+    description = property_data.get('description', '').lower()
+    keyword_flags = 0
+    for keyword, flag in KEYWORD_FLAGS.items():
+        if keyword in description:
+            keyword_flags |= flag
+    
+    return {
+        'price': property_data.get('price', 0),
+        'bedrooms': property_data.get('bedrooms', 0),
+        'bathrooms': property_data.get('bathrooms', 0),
+        'sqft': property_data.get('sqft', 0),
+        'county_code': county_code(property_data.get('county', '')),
+        'in_lewis': 'lewis' in property_data.get('county', '').lower(),
+        'wabo_code': wabo_code,
+        'property_type_code': property_type_code,
+        'keyword_flags': keyword_flags,
+        'listing_key': listing_key(property_data)
+    }
+
+def encode_properties(properties: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Encode a list of property dicts into NumPy columns for analyze_batch"""
+    encoded = [encode_property(property_data) for property_data in properties]
+    return {
+        'price': np.array([e['price'] for e in encoded], dtype=np.float64),
+        'bedrooms': np.array([e['bedrooms'] for e in encoded], dtype=np.float64),
+        'bathrooms': np.array([e['bathrooms'] for e in encoded], dtype=np.float64),
+        'sqft': np.array([e['sqft'] for e in encoded], dtype=np.float64),
+        'county_code': np.array([e['county_code'] for e in encoded], dtype=np.int8),
+        'in_lewis': np.array([e['in_lewis'] for e in encoded], dtype=bool),
+        'wabo_code': np.array([e['wabo_code'] for e in encoded], dtype=np.int8),
+        'property_type_code': np.array([e['property_type_code'] for e in encoded], dtype=np.int8),
+        'keyword_flags': np.array([e['keyword_flags'] for e in encoded], dtype=np.int32),
+        'listing_key': [e['listing_key'] for e in encoded]
+    }
 
 class AFHAnalyzer:
     """Analyzes properties for Adult Family Home financial viability"""
     
-    def __init__(self, analysis_config: Dict[str, Any]):
-        """Initialize the AFH analyzer with configuration"""
+    def __init__(self, analysis_config: Dict[str, Any], comps_engine=None):
+        """Initialize the AFH analyzer with configuration and an optional comps engine"""
         self.config = analysis_config
+        self.comps_engine = comps_engine
         self.medicaid_rate = analysis_config.get('medicaid_rate_per_day', 120)
         self.private_pay_rate = analysis_config.get('private_pay_rate_per_day', 200)
         self.occupancy_rate = analysis_config.get('occupancy_rate', 0.85)
@@ -28,54 +173,46 @@ class AFHAnalyzer:
         self.min_cash_flow = analysis_config.get('min_cash_flow', 3000)
         self.min_cap_rate = analysis_config.get('min_cap_rate', 0.08)
         self.max_debt_ratio = analysis_config.get('max_debt_ratio', 0.75)
+        
+        # Viability scoring model
+        self.viability_weights = dict(DEFAULT_VIABILITY_WEIGHTS)
+        self.viability_weights.update(analysis_config.get('viability_weights', {}) or {})
+        self.viability_threshold = analysis_config.get('viability_threshold', DEFAULT_VIABILITY_THRESHOLD)
+        
+        # Financing terms and cached annuity factors
+        self.financing = FinancingModel(analysis_config)
+        
+        # Process pool settings for analyze_many
+        parallel_config = analysis_config.get('parallel', {}) or {}
+        self.parallel_workers = parallel_config.get('workers') or os.cpu_count() or 1
+        self.parallel_chunk_size = parallel_config.get('chunk_size', 64)
+        self.parallel_min_batch = parallel_config.get('min_batch', 256)
+        
+        # Fingerprint of the configuration used to key cached analyses
+        scoring_config = {key: value for key, value in analysis_config.items()
+                          if key not in NON_SCORING_CONFIG_KEYS}
+        self.config_hash = hashlib.sha1(
+            json.dumps([ANALYSIS_VERSION, scoring_config], sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+    
+    def property_hash(self, property_data: Dict[str, Any]) -> str:
+        """Hash the property fields that influence the analysis"""
+        fields = [property_data.get(field) for field in ANALYSIS_FIELDS]
+        if self.comps_engine:
+            # Local comps move with the market, so they are part of the cache key
+            fields.append(self._comps_price_per_sqft(property_data))
+        return hashlib.sha1(json.dumps(fields, default=str).encode('utf-8')).hexdigest()
     
-    def analyze_property(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_property(self, property_data: Dict[str, Any],
+                         include_narrative: Optional[bool] = None) -> Dict[str, Any]:
         """Analyze a property for AFH viability and return comprehensive analysis"""
+        # Narrative sections are only built for viable properties unless include_narrative is set
         try:
-            logger.info(f"Analyzing property: {property_data.get('address', 'Unknown')}")
-            
-            # Basic property analysis
-            basic_analysis = self._analyze_basic_viability(property_data)
-            
-            # Financial analysis
-            financial_analysis = self._analyze_financials(property_data)
+            analysis = self.score_property(property_data)
             
-            # Market analysis
-            market_analysis = self._analyze_market_position(property_data)
+            if include_narrative or (include_narrative is None and analysis['viable']):
+                self.add_narrative(analysis, property_data)
             
-            # WABO and licensing analysis
-            wabo_analysis = self._analyze_wabo_status(property_data)
-            
-            # Risk assessment
-            risk_analysis = self._assess_risks(property_data)
-            
-            # Optimal pricing analysis
-            pricing_analysis = self._calculate_optimal_pricing(property_data, financial_analysis)
-            
-            # Overall viability score
-            viability_score = self._calculate_viability_score(
-                basic_analysis, financial_analysis, market_analysis, 
-                wabo_analysis, risk_analysis
-            )
-            
-            # Compile final analysis
-            analysis = {
-                'viable': viability_score >= 70,  # 70% threshold for viability
-                'viability_score': viability_score,
-                'basic_analysis': basic_analysis,
-                'financial_analysis': financial_analysis,
-                'market_analysis': market_analysis,
-                'wabo_analysis': wabo_analysis,
-                'risk_analysis': risk_analysis,
-                'pricing_analysis': pricing_analysis,
-                'recommendations': self._generate_recommendations(
-                    basic_analysis, financial_analysis, market_analysis,
-                    wabo_analysis, risk_analysis, pricing_analysis
-                ),
-                'analysis_date': pd.Timestamp.now().isoformat()
-            }
-            
-            logger.info(f"Analysis completed. Viability: {viability_score:.1f}%")
             return analysis
             
         except Exception as e:
@@ -84,9 +221,315 @@ class AFHAnalyzer:
                 'viable': False,
                 'viability_score': 0,
                 'error': str(e),
-                'analysis_date': pd.Timestamp.now().isoformat()
+                'analysis_date': datetime.now().isoformat()
             }
     
+    def analyze_many(self, properties: List[Dict[str, Any]], include_narrative: Optional[bool] = None,
+                     workers: Optional[int] = None, chunk_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Analyze properties on a process pool; results are returned in input order"""
+        workers = workers or self.parallel_workers
+        chunk_size = chunk_size or self.parallel_chunk_size
+        if workers <= 1 or len(properties) < self.parallel_min_batch:
+            return [self.analyze_property(property_data, include_narrative) for property_data in properties]
+        
+        # Comps need the database, so they are resolved here and shipped with each chunk
+        chunks = [
+            (chunk, self._comps_snapshot(chunk), include_narrative)
+            for chunk in (properties[start:start + chunk_size] for start in range(0, len(properties), chunk_size))
+        ]
+        
+        try:
+            # The config is sent once per worker via the initializer, not with every chunk
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                     initializer=_init_worker, initargs=(self.config,)) as executor:
+                analyses = []
+                for chunk_analyses in executor.map(_analyze_chunk, chunks):
+                    analyses.extend(chunk_analyses)
+                
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"Process pool unavailable, analyzing serially: {e}")
+            return [self.analyze_property(property_data, include_narrative) for property_data in properties]
+        
+        logger.info(f"Analyzed {len(analyses)} properties with {min(workers, len(chunks))} workers")
+        return analyses
+    
+    def price_grid(self, bedrooms, cash_flow_targets: Optional[List[float]] = None,
+                   interest_rates: Optional[List[float]] = None) -> Dict[str, np.ndarray]:
+        """Max purchase price curves over cash flow targets and interest rates for many properties"""
+        grid_config = self.config.get('pricing_grid', {}) or {}
+        if cash_flow_targets is None:
+            cash_flow_targets = grid_config.get('cash_flow_targets', [1000, 2000, 3000, 4000, 5000])
+        if interest_rates is None:
+            interest_rates = grid_config.get('interest_rates', [0.05, 0.055, 0.06, 0.065, 0.07, 0.075])
+        
+        total_monthly_revenue, total_monthly_expenses = self._batch_revenue_and_expenses(bedrooms)
+        monthly_net_income = total_monthly_revenue - total_monthly_expenses
+        annual_net_income = monthly_net_income * 12
+        
+        return {
+            'cash_flow_targets': np.asarray(cash_flow_targets, dtype=np.float64),
+            'interest_rates': np.asarray(interest_rates, dtype=np.float64),
+            'max_price': self.financing.max_price_grid(monthly_net_income, cash_flow_targets, interest_rates),
+            'cap_rate_price': annual_net_income / self.min_cap_rate if self.min_cap_rate > 0 else np.zeros_like(annual_net_income)
+        }
+    
+    def _comps_snapshot(self, properties: List[Dict[str, Any]]) -> Optional[Dict[tuple, Optional[float]]]:
+        """Local comps medians for a chunk, keyed like CompsSnapshot lookups"""
+        if not self.comps_engine:
+            return None
+        return {
+            CompsSnapshot.key(
+                county_code(property_data.get('county', '')), property_data.get('bedrooms', 0),
+                property_data.get('bathrooms', 0), property_data.get('sqft', 0), listing_key(property_data)
+            ): self._comps_price_per_sqft(property_data)
+            for property_data in properties
+        }
+    
+    def score_property(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Cheap numeric pass: component analyses, pricing and viability without narrative"""
+        logger.debug(f"Analyzing property: {property_data.get('address', 'Unknown')}")
+        
+        # Basic property analysis
+        basic_analysis = self._analyze_basic_viability(property_data)
+        
+        # Financial analysis
+        financial_analysis = self._analyze_financials(property_data)
+        
+        # Market analysis
+        market_analysis = self._analyze_market_position(property_data)
+        
+        # WABO and licensing analysis
+        wabo_analysis = self._analyze_wabo_status(property_data)
+        
+        # Risk assessment
+        risk_analysis = self._assess_risks(property_data)
+        
+        # Optimal pricing analysis
+        pricing_analysis = self._calculate_optimal_pricing(property_data, financial_analysis)
+        
+        # Overall viability score
+        component_scores = self._calculate_component_scores(
+            basic_analysis, financial_analysis, market_analysis, 
+            wabo_analysis, risk_analysis
+        )
+        viability_score = weighted_viability_score(weights=self.viability_weights, **component_scores)
+        
+        logger.debug(f"Analysis completed. Viability: {viability_score:.1f}%")
+        return {
+            'viable': viability_score >= self.viability_threshold,
+            'viability_score': viability_score,
+            'component_scores': component_scores,
+            'basic_analysis': basic_analysis,
+            'financial_analysis': financial_analysis,
+            'market_analysis': market_analysis,
+            'wabo_analysis': wabo_analysis,
+            'risk_analysis': risk_analysis,
+            'pricing_analysis': pricing_analysis,
+            'analysis_date': datetime.now().isoformat()
+        }
+    
+    def apply_viability(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Recompute viability_score and viable from an analysis's component scores with the current weights"""
+        if 'component_scores' not in analysis:
+            return analysis
+        
+        viability_score = weighted_viability_score(weights=self.viability_weights, **analysis['component_scores'])
+        analysis['viability_score'] = viability_score
+        analysis['viable'] = viability_score >= self.viability_threshold
+        return analysis
+    
+    def add_narrative(self, analysis: Dict[str, Any], property_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Add recommendations and negotiation strategy to a scored analysis (idempotent)"""
+        if analysis.get('recommendations') or 'error' in analysis:
+            return analysis
+        
+        pricing_analysis = analysis['pricing_analysis']
+        pricing_analysis['negotiation_strategy'] = self._generate_negotiation_strategy(
+            pricing_analysis['current_price'], pricing_analysis['optimal_price'], property_data
+        )
+        analysis['recommendations'] = self._generate_recommendations(
+            analysis['basic_analysis'], analysis['financial_analysis'], analysis['market_analysis'],
+            analysis['wabo_analysis'], analysis['risk_analysis'], pricing_analysis
+        )
+        return analysis
+    
+    def analyze_batch(self, price, bedrooms, bathrooms, sqft, county_code, wabo_code,
+                      property_type_code, keyword_flags, in_lewis=None, listing_key=None) -> 'pd.DataFrame':
+        """Analyze many properties at once from columnar inputs built by encode_properties"""
+        # Mirrors analyze_property operation for operation so results match the scalar path exactly
+        price = np.asarray(price, dtype=np.float64)
+        bedrooms = np.asarray(bedrooms, dtype=np.float64)
+        bathrooms = np.asarray(bathrooms, dtype=np.float64)
+        sqft = np.asarray(sqft, dtype=np.float64)
+        county_code = np.asarray(county_code, dtype=np.intp)
+        wabo_code = np.asarray(wabo_code, dtype=np.intp)
+        property_type_code = np.asarray(property_type_code, dtype=np.intp)
+        keyword_flags = np.asarray(keyword_flags, dtype=np.int64)
+        
+        def has_keyword(keyword):
+            return (keyword_flags & KEYWORD_FLAGS[keyword]) != 0
+        
+        # county_code keeps only the first matching county, so a multi-county name such as
+        # "King/Lewis" needs the separate substring mask the scalar risk check uses
+        if in_lewis is None:
+            is_lewis = county_code == COUNTY_CODES.index('lewis')
+        else:
+            is_lewis = np.asarray(in_lewis, dtype=bool)
+        wabo_none = wabo_code == WABO_CODES.index('none')
+        wabo_unknown = wabo_code == WABO_CODES.index('unknown')
+        
+        # Basic property analysis
+        basic_score = (
+            np.select([bedrooms >= 4, bedrooms >= 3], [25, 15], 0) +
+            np.select([bathrooms >= 3, bathrooms >= 2], [20, 15], 0) +
+            np.select([sqft >= 2500, sqft >= 2000], [20, 15], 0) +
+            np.array([10, 15, 5])[property_type_code] +
+            np.where(county_code > 0, 10, 5) +
+            np.select([(price >= 300000) & (price <= 1500000), price > 1500000], [10, 0], 5)
+        )
+        basic_percentage = (basic_score / 100) * 100
+        
+        # Financial analysis
+        total_monthly_revenue, total_monthly_expenses = self._batch_revenue_and_expenses(bedrooms)
+        
+        loan_amount = self.financing.loan_amount(price)
+        monthly_payment = self.financing.monthly_payment(loan_amount)
+        
+        monthly_net_income = total_monthly_revenue - total_monthly_expenses
+        monthly_cash_flow = monthly_net_income - monthly_payment
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cap_rate = np.where(price > 0, (monthly_net_income * 12) / price, 0.0)
+            dscr = np.where(monthly_payment > 0, monthly_net_income / monthly_payment, 0.0)
+            price_per_sqft = np.where(sqft > 0, price / sqft, 0.0)
+        
+        financial_score = np.minimum(
+            np.select([monthly_cash_flow >= self.min_cash_flow * 1.5,
+                       monthly_cash_flow >= self.min_cash_flow,
+                       monthly_cash_flow >= self.min_cash_flow * 0.5], [40, 30, 20], 0) +
+            np.select([cap_rate >= self.min_cap_rate * 1.2,
+                       cap_rate >= self.min_cap_rate,
+                       cap_rate >= self.min_cap_rate * 0.8], [30, 25, 15], 0) +
+            np.select([dscr >= 1.5, dscr >= 1.25, dscr >= 1.0], [30, 25, 20], 0),
+            100
+        )
+        
+        # Market analysis
+        market_rows = [DEFAULT_MARKET_DATA] + [COUNTY_MARKET_DATA[key] for key in COUNTY_CODES[1:]]
+        demand_points = {'high': 20, 'medium': 10, 'low': 0}
+        market_avg = np.array([row['avg_price_per_sqft'] for row in market_rows], dtype=np.float64)[county_code]
+        if self.comps_engine:
+            for index in range(len(price)):
+                local_avg = self.comps_engine.local_price_per_sqft(
+                    county_code[index], bedrooms[index], bathrooms[index], sqft[index],
+                    listing_key[index] if listing_key is not None else None
+                )
+                if local_avg is not None:
+                    market_avg[index] = local_avg
+        market_score = np.minimum(
+            50 +
+            np.select([price_per_sqft < market_avg * 0.9, price_per_sqft > market_avg * 1.1], [30, 0], 20) +
+            np.array([demand_points[row['market_demand']] for row in market_rows])[county_code],
+            100
+        )
+        
+        # WABO analysis
+        keyword_bonus = np.zeros(len(price), dtype=np.int64)
+        for keyword, bonus in WABO_KEYWORDS.items():
+            keyword_bonus += np.where(has_keyword(keyword), bonus, 0)
+        wabo_base = np.array([30] + [WABO_SCORES[status] for status in WABO_CODES[1:]])[wabo_code]
+        wabo_score = np.minimum(wabo_base + keyword_bonus, 100)
+        estimated_licensing_cost = np.select(
+            [wabo_code == WABO_CODES.index('approved'), wabo_code == WABO_CODES.index('inspected')],
+            [5000, 10000], 20000
+        )
+        
+        # Risk assessment
+        risk_score = (
+            np.select([price > 1200000, price < 400000], [20, 15], 0) +
+            np.where(is_lewis, 10, 0) +
+            np.select([has_keyword('needs work') | has_keyword('fixer'),
+                       has_keyword('turnkey') | has_keyword('renovated')], [25, -10], 0) +
+            np.select([wabo_none, wabo_unknown], [30, 15], 0) +
+            np.where(sqft < 2200, 10, 0)
+        )
+        total_risk_score = np.clip(risk_score, 0, 100)
+        
+        # Optimal pricing
+        max_monthly_payment = monthly_net_income - self.min_cash_flow
+        max_purchase_price = np.where(max_monthly_payment > 0,
+                                      self.financing.max_purchase_price(max_monthly_payment), 0.0)
+        annual_net_income = monthly_net_income * 12
+        if self.min_cap_rate > 0:
+            cap_rate_price = annual_net_income / self.min_cap_rate
+        else:
+            cap_rate_price = np.zeros(len(price))
+        optimal_price = np.where(
+            (max_purchase_price > 0) & (cap_rate_price > 0),
+            np.minimum(max_purchase_price, cap_rate_price),
+            np.maximum(max_purchase_price, cap_rate_price)
+        )
+        
+        # Overall viability score
+        viability_score = weighted_viability_score(
+            basic_percentage, financial_score, market_score, wabo_score, total_risk_score,
+            self.viability_weights
+        )
+        
+        logger.info(f"Batch analysis completed for {len(price)} properties")
+        
+        import pandas as pd  # Deferred: only batch paths return DataFrames
+        return pd.DataFrame({
+            'viable': viability_score >= self.viability_threshold,
+            'viability_score': viability_score,
+            'basic_score': basic_percentage,
+            'financial_score': financial_score,
+            'market_score': market_score,
+            'wabo_score': wabo_score,
+            'risk_score': total_risk_score,
+            'monthly_revenue': total_monthly_revenue,
+            'monthly_expenses': np.full(len(price), total_monthly_expenses, dtype=np.float64),
+            'monthly_payment': monthly_payment,
+            'monthly_cash_flow': monthly_cash_flow,
+            'cap_rate': cap_rate,
+            'dscr': dscr,
+            'price_per_sqft': price_per_sqft,
+            'estimated_licensing_cost': estimated_licensing_cost,
+            'optimal_price': optimal_price
+        })
+    
+    def analyze_loan_products(self, price, bedrooms) -> 'pd.DataFrame':
+        """Evaluate every configured loan product against every property in one pass"""
+        price = np.asarray(price, dtype=np.float64)
+        total_monthly_revenue, total_monthly_expenses = self._batch_revenue_and_expenses(bedrooms)
+        
+        products = self.financing.products
+        results = self.financing.evaluate_products(
+            price, total_monthly_revenue - total_monthly_expenses,
+            cash_flow_target=self.min_cash_flow, products=products
+        )
+        
+        num_properties = len(price)
+        import pandas as pd
+        return pd.DataFrame({
+            'property_index': np.tile(np.arange(num_properties), len(products)),
+            'loan_product': np.repeat([product.name for product in products], num_properties),
+            **{column: values.ravel() for column, values in results.items()}
+        })
+    
+    def _batch_revenue_and_expenses(self, bedrooms):
+        """Vectorized monthly revenue and operating expenses (same arithmetic as _analyze_financials)"""
+        bedrooms = np.asarray(bedrooms, dtype=np.float64)
+        medicaid_residents = np.floor(bedrooms * 0.6)
+        private_residents = bedrooms - medicaid_residents
+        monthly_medicaid_revenue = medicaid_residents * self.medicaid_rate * 30 * self.occupancy_rate
+        monthly_private_revenue = private_residents * self.private_pay_rate * 30 * self.occupancy_rate
+        total_monthly_revenue = monthly_medicaid_revenue + monthly_private_revenue
+        total_monthly_expenses = (
+            self.monthly_utilities + self.monthly_insurance +
+            self.monthly_maintenance + self.monthly_supplies + self.monthly_licensing
+        )
+        return total_monthly_revenue, total_monthly_expenses
+    
     def _analyze_basic_viability(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze basic property characteristics for AFH suitability"""
         score = 0
@@ -143,8 +586,7 @@ class AFHAnalyzer:
         
         # Check county (target counties get bonus)
         county = property_data.get('county', '').lower()
-        target_counties = ['lewis', 'thurston', 'pierce', 'king']
-        if any(target in county for target in target_counties):
+        if any(target in county for target in TARGET_COUNTIES):
             score += 10
             strengths.append(f"Target county: {county}")
         else:
@@ -190,11 +632,9 @@ class AFHAnalyzer:
             self.monthly_maintenance + self.monthly_supplies + self.monthly_licensing
         )
         
-        # Calculate debt service (assuming 80% LTV, 6% interest, 30-year term)
-        loan_amount = price * 0.8
-        monthly_interest_rate = 0.06 / 12
-        num_payments = 30 * 12
-        monthly_payment = loan_amount * (monthly_interest_rate * (1 + monthly_interest_rate)**num_payments) / ((1 + monthly_interest_rate)**num_payments - 1)
+        # Calculate debt service from the configured financing terms
+        loan_amount = self.financing.loan_amount(price)
+        monthly_payment = self.financing.monthly_payment(loan_amount)
         
         # Calculate cash flow
         monthly_cash_flow = total_monthly_revenue - total_monthly_expenses - monthly_payment
@@ -238,66 +678,61 @@ class AFHAnalyzer:
         price_per_sqft = price / sqft if sqft > 0 else 0
         
         # Market positioning based on county
-        county_analysis = {
-            'king': {'avg_price_per_sqft': 400, 'market_demand': 'high', 'competition': 'high'},
-            'pierce': {'avg_price_per_sqft': 250, 'market_demand': 'medium', 'competition': 'medium'},
-            'thurston': {'avg_price_per_sqft': 200, 'market_demand': 'medium', 'competition': 'low'},
-            'lewis': {'avg_price_per_sqft': 150, 'market_demand': 'low', 'competition': 'low'}
-        }
-        
         market_data = None
-        for county_key, data in county_analysis.items():
+        for county_key, data in COUNTY_MARKET_DATA.items():
             if county_key in county:
                 market_data = data
                 break
         
         if not market_data:
-            market_data = {'avg_price_per_sqft': 250, 'market_demand': 'medium', 'competition': 'medium'}
+            market_data = DEFAULT_MARKET_DATA
+        
+        # Prefer the median of local comparable listings over the county table
+        market_avg_price_per_sqft = market_data['avg_price_per_sqft']
+        market_reference = 'county_table'
+        local_avg = self._comps_price_per_sqft(property_data)
+        if local_avg is not None:
+            market_avg_price_per_sqft = local_avg
+            market_reference = 'local_comps'
         
         # Compare to market average
         market_comparison = 'at_market'
-        if price_per_sqft < market_data['avg_price_per_sqft'] * 0.9:
+        if price_per_sqft < market_avg_price_per_sqft * 0.9:
             market_comparison = 'below_market'
-        elif price_per_sqft > market_data['avg_price_per_sqft'] * 1.1:
+        elif price_per_sqft > market_avg_price_per_sqft * 1.1:
             market_comparison = 'above_market'
         
         return {
             'price_per_sqft': price_per_sqft,
-            'market_avg_price_per_sqft': market_data['avg_price_per_sqft'],
+            'market_avg_price_per_sqft': market_avg_price_per_sqft,
+            'market_reference': market_reference,
             'market_comparison': market_comparison,
             'market_demand': market_data['market_demand'],
             'competition_level': market_data['competition'],
             'county': county
         }
     
+    def _comps_price_per_sqft(self, property_data: Dict[str, Any]):
+        """Median price/sqft of local comparables, or None without enough comps"""
+        if not self.comps_engine:
+            return None
+        return self.comps_engine.local_price_per_sqft(
+            county_code(property_data.get('county', '')),
+            property_data.get('bedrooms', 0),
+            property_data.get('bathrooms', 0),
+            property_data.get('sqft', 0),
+            listing_key(property_data)
+        )
+    
     def _analyze_wabo_status(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze WABO status and licensing readiness"""
         wabo_status = property_data.get('wabo_status', 'unknown')
         description = property_data.get('description', '').lower()
         
-        # WABO status scoring
-        wabo_scores = {
-            'approved': 100,
-            'inspected': 80,
-            'mentioned': 60,
-            'none': 20,
-            'unknown': 30
-        }
-        
-        wabo_score = wabo_scores.get(wabo_status, 30)
-        
-        # Additional WABO-related keywords
-        wabo_keywords = {
-            'dshs': 20,
-            'licensed': 25,
-            'inspection': 15,
-            'ready': 20,
-            'turnkey': 15,
-            'renovated': 10
-        }
+        wabo_score = WABO_SCORES.get(wabo_status, 30)
         
         keyword_bonus = 0
-        for keyword, bonus in wabo_keywords.items():
+        for keyword, bonus in WABO_KEYWORDS.items():
             if keyword in description:
                 keyword_bonus += bonus
         
@@ -319,8 +754,7 @@ class AFHAnalyzer:
             'wabo_score': total_wabo_score,
             'licensing_timeline': licensing_timeline,
             'estimated_licensing_cost': estimated_licensing_cost,
-            'keyword_bonus': keyword_bonus,
-            'description_analysis': description
+            'keyword_bonus': keyword_bonus
         }
     
     def _assess_risks(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -384,12 +818,9 @@ class AFHAnalyzer:
         # Maximum monthly payment that still meets cash flow target
         max_monthly_payment = monthly_revenue - monthly_expenses - monthly_cash_flow_target
         
-        # Calculate maximum loan amount from monthly payment
-        monthly_interest_rate = 0.06 / 12
-        num_payments = 30 * 12
+        # Calculate maximum purchase price from monthly payment
         if max_monthly_payment > 0:
-            max_loan_amount = max_monthly_payment * ((1 + monthly_interest_rate)**num_payments - 1) / (monthly_interest_rate * (1 + monthly_interest_rate)**num_payments)
-            max_purchase_price = max_loan_amount / 0.8  # 80% LTV
+            max_purchase_price = self.financing.max_purchase_price(max_monthly_payment)
         else:
             max_purchase_price = 0
         
@@ -400,16 +831,12 @@ class AFHAnalyzer:
         # Take the lower of the two calculations
         optimal_price = min(max_purchase_price, cap_rate_price) if max_purchase_price > 0 and cap_rate_price > 0 else max(max_purchase_price, cap_rate_price)
         
-        # Negotiation strategy
-        negotiation_strategy = self._generate_negotiation_strategy(current_price, optimal_price, property_data)
-        
         return {
             'current_price': current_price,
             'optimal_price': optimal_price,
             'max_price': max_purchase_price,
             'cap_rate_price': cap_rate_price,
             'negotiation_target': optimal_price * 0.95,  # 5% below optimal
-            'negotiation_strategy': negotiation_strategy,
             'price_difference': current_price - optimal_price,
             'price_difference_percentage': ((current_price - optimal_price) / current_price * 100) if current_price > 0 else 0
         }
@@ -452,31 +879,28 @@ class AFHAnalyzer:
     def _calculate_viability_score(self, basic_analysis: Dict, financial_analysis: Dict, 
                                  market_analysis: Dict, wabo_analysis: Dict, risk_analysis: Dict) -> float:
         """Calculate overall viability score"""
-        # Weighted scoring
-        weights = {
-            'basic': 0.25,      # 25% - Property characteristics
-            'financial': 0.30,  # 30% - Financial viability
-            'market': 0.15,     # 15% - Market position
-            'wabo': 0.20,       # 20% - WABO status
-            'risk': 0.10        # 10% - Risk assessment
-        }
-        
-        # Calculate weighted score
-        basic_score = basic_analysis['percentage']
-        financial_score = self._calculate_financial_score(financial_analysis)
-        market_score = self._calculate_market_score(market_analysis)
-        wabo_score = wabo_analysis['wabo_score']
-        risk_score = 100 - risk_analysis['total_risk_score']  # Invert risk score
-        
-        total_score = (
-            basic_score * weights['basic'] +
-            financial_score * weights['financial'] +
-            market_score * weights['market'] +
-            wabo_score * weights['wabo'] +
-            risk_score * weights['risk']
+        component_scores = self._calculate_component_scores(
+            basic_analysis, financial_analysis, market_analysis, wabo_analysis, risk_analysis
         )
-        
-        return total_score
+        return weighted_viability_score(weights=self.viability_weights, **component_scores)
+    
+    def component_scores_from_analysis(self, analysis: Dict[str, Any]) -> Dict[str, float]:
+        """Recompute component scores from the stored sections of a previous analysis"""
+        return self._calculate_component_scores(
+            analysis['basic_analysis'], analysis['financial_analysis'], analysis['market_analysis'],
+            analysis['wabo_analysis'], analysis['risk_analysis']
+        )
+    
+    def _calculate_component_scores(self, basic_analysis: Dict, financial_analysis: Dict,
+                                    market_analysis: Dict, wabo_analysis: Dict, risk_analysis: Dict) -> Dict[str, float]:
+        """Calculate the component scores that feed the viability score (risk is not inverted)"""
+        return {
+            'basic': basic_analysis['percentage'],
+            'financial': self._calculate_financial_score(financial_analysis),
+            'market': self._calculate_market_score(market_analysis),
+            'wabo': wabo_analysis['wabo_score'],
+            'risk': risk_analysis['total_risk_score']
+        }
     
     def _calculate_financial_score(self, financial_analysis: Dict) -> float:
         """Calculate financial viability score"""
@@ -574,3 +998,34 @@ class AFHAnalyzer:
             recommendations.append("Use AFH-specific factors in negotiation")
         
         return recommendations
+
+class CompsSnapshot:
+    """Precomputed local comps medians standing in for a CompsEngine inside worker processes"""
+    
+    def __init__(self, medians: Dict[tuple, Optional[float]]):
+        """Initialize with medians keyed by (county code, bedrooms, bathrooms, sqft, listing)"""
+        self.medians = medians
+    
+    @staticmethod
+    def key(code: int, bedrooms: float, bathrooms: float, sqft: float, listing: Optional[tuple]) -> tuple:
+        """Lookup key for a comps query"""
+        return (code, bedrooms, bathrooms, sqft, listing)
+    
+    def local_price_per_sqft(self, code: int, bedrooms: float, bathrooms: float,
+                             sqft: float, listing: Optional[tuple] = None) -> Optional[float]:
+        """Median price/sqft resolved by the parent process, or None"""
+        return self.medians.get(self.key(code, bedrooms, bathrooms, sqft, listing))
+
+# Analyzer built once per worker process by _init_worker
+_worker_analyzer = None
+
+def _init_worker(analysis_config: Dict[str, Any]):
+    """Process pool initializer: build the worker's analyzer from the shipped config"""
+    global _worker_analyzer
+    _worker_analyzer = AFHAnalyzer(analysis_config)
+
+def _analyze_chunk(chunk: tuple) -> List[Dict[str, Any]]:
+    """Analyze one (properties, comps medians, include_narrative) chunk in a worker"""
+    properties, comps_medians, include_narrative = chunk
+    _worker_analyzer.comps_engine = CompsSnapshot(comps_medians) if comps_medians is not None else None
+    return [_worker_analyzer.analyze_property(property_data, include_narrative) for property_data in properties]
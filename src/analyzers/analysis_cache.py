@@ -0,0 +1,59 @@
+"""
+Analysis Cache - Reuses stored analyses for listings whose content and config are unchanged
+"""
+
+from typing import Dict, Any, List
+from loguru import logger
+from analyzers.afh_analyzer import AFHAnalyzer, listing_key
+
+def cache_key(property_data: Dict[str, Any]) -> str:
+    """analysis_cache key for a listing: its listing_key joined as 'source|listing_id|address'"""
+    return '|'.join(listing_key(property_data))
+
+class AnalysisCache:
+    """Memoizes AFHAnalyzer results keyed by property content hash and analyzer config hash"""
+    
+    def __init__(self, analyzer: AFHAnalyzer, db_manager):
+        """Initialize the cache and evict entries written under a different analyzer config"""
+        self.analyzer = analyzer
+        self.db_manager = db_manager
+        self.config_hash = analyzer.config_hash
+        
+        evicted = self.db_manager.evict_stale_analysis_cache(self.config_hash)
+        if evicted:
+            logger.info(f"Evicted {evicted} cached analyses from a previous analyzer configuration")
+    
+    def analyze_properties(self, properties: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Analyze properties, reusing cached results; returns analyses in input order"""
+        keys = [cache_key(property_data) for property_data in properties]
+        hashes = [self.analyzer.property_hash(property_data) for property_data in properties]
+        cached = self.db_manager.get_cached_analyses(keys)
+        
+        analyses = []
+        misses = []
+        for index, (key, property_hash) in enumerate(zip(keys, hashes)):
+            entry = cached.get(key)
+            if entry and entry['property_hash'] == property_hash and entry['config_hash'] == self.config_hash:
+                # Weights and threshold are not part of config_hash, so hits are re-scored with the current ones
+                analysis = self.analyzer.apply_viability(entry['analysis'])
+                if analysis['viable']:
+                    self.analyzer.add_narrative(analysis, properties[index])
+                analyses.append(analysis)
+            else:
+                analyses.append(None)
+                misses.append(index)
+        
+        # Misses are analyzed together so large batches can use the process pool
+        new_entries = []
+        fresh = self.analyzer.analyze_many([properties[index] for index in misses])
+        for index, analysis in zip(misses, fresh):
+            analysis['property_hash'] = hashes[index]
+            analysis['config_hash'] = self.config_hash
+            if 'error' not in analysis:
+                new_entries.append((keys[index], analysis))
+            analyses[index] = analysis
+        
+        # Replacing by listing key evicts entries whose property hash changed
+        self.db_manager.store_cached_analyses(new_entries)
+        logger.info(f"Analysis cache: {len(properties) - len(misses)} hits, {len(misses)} misses")
+        return analyses
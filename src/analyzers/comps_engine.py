@@ -0,0 +1,144 @@
+"""
+Comps Engine - In-memory comparable-sales index over stored properties
+Answers k-nearest comparable queries per county on (beds, baths, sqft)
+"""
+
+import statistics
+from typing import Dict, Any, Optional, Tuple
+from loguru import logger
+import numpy as np
+from scipy.spatial import cKDTree
+from analyzers.afh_analyzer import county_code, listing_key
+
+class CompsEngine:
+    """Per-county nearest-neighbour index of stored listings for local price/sqft medians"""
+    
+    def __init__(self, db_manager, comps_config: Optional[Dict[str, Any]] = None):
+        """Initialize comps engine with a database manager and market_comps configuration"""
+        comps_config = comps_config or {}
+        self.db_manager = db_manager
+        self.enabled = comps_config.get('enabled', True)
+        self.k = comps_config.get('k', 15)
+        self.min_comps = comps_config.get('min_comps', 5)
+        # Refreshes re-read this far behind the newest updated_at seen, for writes that commit late
+        self.refresh_overlap_seconds = comps_config.get('refresh_overlap_seconds', 300)
+        
+        # Feature scaling: one bedroom ~ one bathroom ~ 500 sqft
+        self.feature_scale = np.array([
+            comps_config.get('bedroom_scale', 1.0),
+            comps_config.get('bathroom_scale', 1.0),
+            comps_config.get('sqft_scale', 500.0)
+        ], dtype=np.float64)
+        
+        self._rows = {}  # property id -> (county_code, bedrooms, bathrooms, sqft, price_per_sqft)
+        self._listing_ids = {}  # listing_key -> property id
+        self._indexes = {}  # county_code -> (KD-tree, price_per_sqft, property ids, positions)
+        self._dirty_counties = set()
+        self._last_updated_at = None
+        self._loaded = False
+    
+    def refresh(self) -> int:
+        """Load listings added or updated since the last refresh; returns rows applied"""
+        if not self.enabled:
+            return 0
+        
+        rows = self.db_manager.get_comparable_properties(
+            updated_since=self._last_updated_at, overlap_seconds=self.refresh_overlap_seconds
+        )
+        applied = 0
+        for property_id, source, listing_id, address, county, bedrooms, bathrooms, sqft, price, updated_at in rows:
+            if updated_at and (self._last_updated_at is None or updated_at > self._last_updated_at):
+                self._last_updated_at = updated_at
+            
+            listing = listing_key({'source': source, 'listing_id': listing_id, 'address': address})
+            self._listing_ids[listing] = property_id
+            row = None
+            if price and sqft and price > 0 and sqft > 0:
+                row = (county_code(county or ''), bedrooms or 0, bathrooms or 0, sqft, price / sqft)
+            
+            # Rows re-read from the overlap window are usually unchanged; leave their index alone
+            previous = self._rows.get(property_id)
+            if row == previous:
+                continue
+            
+            applied += 1
+            if previous:
+                del self._rows[property_id]
+                self._dirty_counties.add(previous[0])
+            if row:
+                self._rows[property_id] = row
+                self._dirty_counties.add(row[0])
+        
+        self._loaded = True
+        if applied:
+            logger.info(f"Comps index refreshed with {applied} listings ({len(self._rows)} indexed)")
+        return applied
+    
+    def _index(self, code: int) -> Tuple[cKDTree, np.ndarray, np.ndarray, Dict[int, int]]:
+        """Get the (rebuilt if stale) KD-tree index for a county code
+        
+        Returns the tree over scaled (beds, baths, sqft), price_per_sqft and property ids by
+        tree position, and each property id's position.
+        """
+        if not self._loaded:
+            self.refresh()
+        
+        if code in self._dirty_counties or code not in self._indexes:
+            property_ids = [property_id for property_id, row in self._rows.items() if row[0] == code]
+            rows = [self._rows[property_id] for property_id in property_ids]
+            features = np.array([row[1:4] for row in rows], dtype=np.float64).reshape(-1, 3)
+            self._indexes[code] = (
+                cKDTree(features / self.feature_scale),
+                np.array([row[4] for row in rows], dtype=np.float64),
+                np.array(property_ids, dtype=np.int64),
+                {property_id: position for position, property_id in enumerate(property_ids)}
+            )
+            self._dirty_counties.discard(code)
+        
+        return self._indexes[code]
+    
+    def _nearest_positions(self, tree: cKDTree, bedrooms: float, bathrooms: float, sqft: float,
+                           k: int, excluded: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(distances, tree positions) of the k nearest rows other than excluded, nearest first"""
+        # One extra neighbour covers the excluded row, which is dropped if it comes back
+        k = min(k + (excluded is not None), tree.n)
+        if k == 0:
+            return np.empty(0), np.empty(0, dtype=np.intp)
+        
+        distances, positions = tree.query(np.array([bedrooms, bathrooms, sqft]) / self.feature_scale, k=k)
+        distances, positions = np.atleast_1d(distances), np.atleast_1d(positions)
+        if excluded is not None:
+            keep = positions != excluded
+            distances, positions = distances[keep][:k - 1], positions[keep][:k - 1]
+        return distances, positions
+    
+    def _excluded(self, positions: Dict[int, int], listing: Optional[tuple]) -> Optional[int]:
+        """Tree position of the given listing's row, or None when it is not indexed"""
+        property_id = self._listing_ids.get(listing) if listing is not None else None
+        return positions.get(property_id)
+    
+    def nearest(self, code: int, bedrooms: float, bathrooms: float, sqft: float,
+                k: Optional[int] = None, listing: Optional[tuple] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (distances, price_per_sqft) of the k nearest comparables in a county"""
+        tree, price_per_sqft, _, positions = self._index(code)
+        distances, nearest = self._nearest_positions(tree, bedrooms, bathrooms, sqft, k or self.k,
+                                                     self._excluded(positions, listing))
+        return distances, price_per_sqft[nearest]
+    
+    def local_price_per_sqft(self, code: int, bedrooms: float, bathrooms: float,
+                             sqft: float, listing: Optional[tuple] = None) -> Optional[float]:
+        """Median price/sqft of the nearest comparables, or None when there are too few
+        
+        listing is the subject's listing_key; its stored row is left out of its own comps.
+        """
+        if not self.enabled:
+            return None
+        
+        tree, price_per_sqft, _, positions = self._index(code)
+        excluded = self._excluded(positions, listing)
+        if tree.n - (excluded is not None) < self.min_comps:
+            return None
+        
+        _, nearest = self._nearest_positions(tree, bedrooms, bathrooms, sqft, self.k, excluded)
+        # statistics.median is cheaper than np.median for a handful of values
+        return float(statistics.median(price_per_sqft[nearest].tolist()))
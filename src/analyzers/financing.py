@@ -0,0 +1,119 @@
+"""
+Financing Model - Loan terms and memoized annuity factors for AFH analysis
+"""
+
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+class LoanProduct(NamedTuple):
+    """Financing terms for a single loan product"""
+    name: str
+    interest_rate: float  # Annual rate, e.g. 0.06
+    term_years: int
+    loan_to_value: float  # e.g. 0.8 for 80% LTV
+
+@lru_cache(maxsize=256)
+def annuity_factors(interest_rate: float, term_years: int) -> Tuple[float, float]:
+    """Return (payment factor, inverse payment factor) for an annual rate and term"""
+    # monthly_payment = loan_amount * payment_factor
+    # loan_amount = monthly_payment * inverse_payment_factor
+    monthly_interest_rate = interest_rate / 12
+    num_payments = term_years * 12
+    if monthly_interest_rate == 0:
+        return 1 / num_payments, float(num_payments)
+    
+    growth = (1 + monthly_interest_rate)**num_payments
+    payment_factor = (monthly_interest_rate * growth) / (growth - 1)
+    inverse_payment_factor = (growth - 1) / (monthly_interest_rate * growth)
+    return payment_factor, inverse_payment_factor
+
+class FinancingModel:
+    """Financing terms read from afh_analysis config with cached annuity factors"""
+    
+    def __init__(self, analysis_config: Dict[str, Any]):
+        """Initialize financing model from the afh_analysis configuration"""
+        self.default_product = LoanProduct(
+            name='default',
+            interest_rate=analysis_config.get('interest_rate', 0.06),
+            term_years=analysis_config.get('loan_term_years', 30),
+            loan_to_value=analysis_config.get('loan_to_value', 0.8)
+        )
+        
+        # Additional loan products compared side by side in batch evaluation
+        self.products = [self.default_product]
+        for product_config in analysis_config.get('loan_products', []) or []:
+            self.products.append(LoanProduct(
+                name=product_config['name'],
+                interest_rate=product_config.get('interest_rate', self.default_product.interest_rate),
+                term_years=product_config.get('term_years', self.default_product.term_years),
+                loan_to_value=product_config.get('loan_to_value', self.default_product.loan_to_value)
+            ))
+    
+    def factors(self, product: Optional[LoanProduct] = None) -> Tuple[float, float]:
+        """Get memoized (payment, inverse payment) factors for a product"""
+        product = product or self.default_product
+        return annuity_factors(product.interest_rate, product.term_years)
+    
+    def loan_amount(self, price, product: Optional[LoanProduct] = None):
+        """Loan amount for a purchase price (scalar or array)"""
+        product = product or self.default_product
+        return price * product.loan_to_value
+    
+    def monthly_payment(self, loan_amount, product: Optional[LoanProduct] = None):
+        """Monthly debt service for a loan amount (scalar or array)"""
+        payment_factor, _ = self.factors(product)
+        return loan_amount * payment_factor
+    
+    def max_purchase_price(self, max_monthly_payment, product: Optional[LoanProduct] = None):
+        """Maximum purchase price supportable by a monthly payment (scalar or array)"""
+        product = product or self.default_product
+        _, inverse_payment_factor = self.factors(product)
+        return max_monthly_payment * inverse_payment_factor / product.loan_to_value
+    
+    def evaluate_products(self, price: np.ndarray, monthly_net_income: np.ndarray,
+                          cash_flow_target: float = 0.0,
+                          products: Optional[List[LoanProduct]] = None) -> Dict[str, np.ndarray]:
+        """Evaluate every loan product against every property; arrays are (products, properties)"""
+        products = products or self.products
+        price = np.asarray(price, dtype=np.float64)[np.newaxis, :]
+        monthly_net_income = np.asarray(monthly_net_income, dtype=np.float64)[np.newaxis, :]
+        
+        loan_to_value = np.array([p.loan_to_value for p in products], dtype=np.float64)[:, np.newaxis]
+        factors = np.array([self.factors(p) for p in products], dtype=np.float64)
+        payment_factor = factors[:, 0:1]
+        inverse_payment_factor = factors[:, 1:2]
+        
+        loan_amount = price * loan_to_value
+        monthly_payment = loan_amount * payment_factor
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dscr = np.where(monthly_payment > 0, monthly_net_income / monthly_payment, 0.0)
+        max_monthly_payment = monthly_net_income - cash_flow_target
+        
+        return {
+            'loan_amount': loan_amount,
+            'monthly_payment': monthly_payment,
+            'monthly_cash_flow': monthly_net_income - monthly_payment,
+            'dscr': dscr,
+            'max_price': np.where(max_monthly_payment > 0,
+                                  max_monthly_payment * inverse_payment_factor / loan_to_value, 0.0)
+        }
+    
+    def max_price_grid(self, monthly_net_income: np.ndarray, cash_flow_targets: List[float],
+                       interest_rates: List[float], product: Optional[LoanProduct] = None) -> np.ndarray:
+        """Max purchase price for every property, cash flow target and interest rate
+        
+        Returns an array shaped (properties, cash flow targets, interest rates); prices are 0
+        where net income does not cover the target.
+        """
+        product = product or self.default_product
+        monthly_net_income = np.asarray(monthly_net_income, dtype=np.float64)[:, np.newaxis, np.newaxis]
+        cash_flow_targets = np.asarray(cash_flow_targets, dtype=np.float64)[np.newaxis, :, np.newaxis]
+        inverse_payment_factor = np.array(
+            [annuity_factors(rate, product.term_years)[1] for rate in interest_rates], dtype=np.float64
+        )[np.newaxis, np.newaxis, :]
+        
+        # Same arithmetic as max_purchase_price, broadcast over the grid
+        max_monthly_payment = monthly_net_income - cash_flow_targets
+        return np.where(max_monthly_payment > 0,
+                        max_monthly_payment * inverse_payment_factor / product.loan_to_value, 0.0)
@@ -0,0 +1,124 @@
+"""
+Portfolio Optimizer - Selects the set of viable properties that maximizes cash flow within a capital budget
+Knapsack DP over capital bucketed into fixed-size dollar steps
+"""
+
+import math
+from typing import Dict, Any, List, Optional, Tuple
+from loguru import logger
+import numpy as np
+
+class PortfolioOptimizer:
+    """Chooses properties to buy under a capital budget and risk limits from AFHAnalyzer output"""
+    
+    def __init__(self, portfolio_config: Optional[Dict[str, Any]] = None):
+        """Initialize optimizer with the portfolio configuration"""
+        portfolio_config = portfolio_config or {}
+        self.budget = portfolio_config.get('budget', 500000)
+        self.bucket_size = portfolio_config.get('bucket_size', 1000)
+        self.max_risk_score = portfolio_config.get('max_risk_score', 60)
+        self.max_properties = portfolio_config.get('max_properties')
+        self.budget_step = portfolio_config.get('budget_step', 25000)
+    
+    @staticmethod
+    def capital_required(analysis: Dict[str, Any]) -> float:
+        """Down payment plus estimated licensing cost for one analyzed property"""
+        financial_analysis = analysis['financial_analysis']
+        down_payment = financial_analysis['purchase_price'] - financial_analysis['loan_amount']
+        return down_payment + analysis['wabo_analysis'].get('estimated_licensing_cost', 0)
+    
+    def optimize(self, candidates: List[Dict[str, Any]], budget: Optional[float] = None,
+                 max_risk_score: Optional[float] = None,
+                 max_properties: Optional[int] = None) -> Dict[str, Any]:
+        """Select candidates maximizing total monthly cash flow within the budget
+        
+        Candidates are {'property', 'analysis'} pairs as produced in run_daily_search, or flat
+        rows from DatabaseManager.get_top_properties. Capital is rounded up to whole buckets,
+        so the chosen set never exceeds the budget.
+        """
+        budget = self.budget if budget is None else budget
+        max_risk_score = self.max_risk_score if max_risk_score is None else max_risk_score
+        max_properties = self.max_properties if max_properties is None else max_properties
+        
+        # Only cash-flow positive candidates within the risk limit (and within reach of the
+        # extended budget used for the marginal value of capital) can improve the set
+        eligible = []
+        for index, candidate in enumerate(candidates):
+            analysis = candidate.get('analysis', candidate)
+            try:
+                capital = self.capital_required(analysis)
+                cash_flow = analysis['financial_analysis']['monthly_cash_flow']
+                risk_score = analysis['risk_analysis']['total_risk_score']
+            except (KeyError, TypeError):
+                continue
+            if cash_flow > 0 and capital <= budget + self.budget_step and risk_score <= max_risk_score:
+                eligible.append((index, capital, cash_flow, risk_score))
+        
+        capacity = int(budget // self.bucket_size)
+        extra = max(1, math.ceil(self.budget_step / self.bucket_size))
+        costs = np.array([math.ceil(capital / self.bucket_size) for _, capital, _, _ in eligible], dtype=np.int64)
+        values = np.array([cash_flow for _, _, cash_flow, _ in eligible], dtype=np.float64)
+        
+        # Solve once past the budget so the value of extra capital comes from the same table
+        best, chosen = self._solve(costs, values, capacity + extra, max_properties, capacity)
+        total = float(best[capacity])
+        budget_marginal_value = (float(best[capacity + extra]) - total) / (extra * self.bucket_size) * self.budget_step
+        
+        selected = []
+        for item in chosen:
+            index, capital, cash_flow, risk_score = eligible[item]
+            # Marginal value: optimum lost if this property were unavailable
+            without = values.copy()
+            without[item] = 0.0
+            best_without, _ = self._solve(costs, without, capacity, max_properties, None)
+            selected.append({
+                'index': index,
+                'address': candidates[index].get('property', candidates[index]).get('address', ''),
+                'capital_required': capital,
+                'monthly_cash_flow': cash_flow,
+                'risk_score': risk_score,
+                'marginal_value': total - float(best_without[capacity])
+            })
+        
+        logger.info(f"Portfolio: selected {len(selected)} of {len(eligible)} eligible properties, "
+                    f"${total:,.0f}/mo cash flow")
+        return {
+            'selected': selected,
+            'total_monthly_cash_flow': total,
+            'total_capital': float(sum(item['capital_required'] for item in selected)),
+            'budget': budget,
+            'budget_marginal_value': budget_marginal_value,  # Cash flow gained per budget_step of extra capital
+            'candidates_considered': len(eligible)
+        }
+    
+    def _solve(self, costs: np.ndarray, values: np.ndarray, capacity: int, max_properties: Optional[int],
+               backtrack_capacity: Optional[int]) -> Tuple[np.ndarray, List[int]]:
+        """0/1 knapsack; returns best value per capacity and the items chosen at backtrack_capacity"""
+        # With a property limit the table gains a count axis: row k holds the best using at most k items
+        shift = 1 if max_properties else 0
+        rows = max_properties + 1 if max_properties else 1
+        best = np.zeros((rows, capacity + 1))
+        taken = np.zeros((len(costs), rows, capacity + 1), dtype=bool) if backtrack_capacity is not None else None
+        
+        for item, (cost, value) in enumerate(zip(costs, values)):
+            if cost > capacity or value <= 0:
+                continue
+            candidate = best[:rows - shift, :capacity + 1 - cost] + value
+            improved = candidate > best[shift:, cost:]
+            if not improved.any():
+                continue
+            best[shift:, cost:] = np.where(improved, candidate, best[shift:, cost:])
+            if taken is not None:
+                taken[item, shift:, cost:] = improved
+        
+        chosen = []
+        if taken is not None:
+            row, remaining = rows - 1, backtrack_capacity
+            for item in range(len(costs) - 1, -1, -1):
+                if taken[item, row, remaining]:
+                    chosen.append(item)
+                    remaining -= costs[item]
+                    row -= shift
+            chosen.reverse()
+        
+        return best[rows - 1], chosen
@@ -0,0 +1,245 @@
+"""
+Sensitivity Analyzer - Monte Carlo viability analysis for AFH properties
+Samples occupancy, daily rates and expenses and reports per-property percentiles
+and probabilities of meeting the analyzer's targets
+"""
+
+from typing import Dict, Any, List, Optional
+from loguru import logger
+import numpy as np
+import pandas as pd
+from analyzers.afh_analyzer import AFHAnalyzer, encode_properties, weighted_viability_score
+
+# Default assumption distributions, centred on the point estimates in afh_analysis
+DEFAULT_DISTRIBUTIONS = {
+    'occupancy_rate': {'type': 'triangular', 'low': 0.70, 'high': 0.95},
+    'medicaid_rate_per_day': {'type': 'normal', 'std': 10},
+    'private_pay_rate_per_day': {'type': 'normal', 'std': 20},
+    'expense_factor': {'type': 'normal', 'mean': 1.0, 'std': 0.10}
+}
+
+class SensitivityAnalyzer:
+    """Runs vectorized Monte Carlo scenarios on top of AFHAnalyzer batch results"""
+    
+    def __init__(self, analyzer: AFHAnalyzer, sensitivity_config: Optional[Dict[str, Any]] = None):
+        """Initialize sensitivity analyzer with an AFH analyzer and sensitivity configuration"""
+        sensitivity_config = sensitivity_config or analyzer.config.get('sensitivity', {}) or {}
+        self.analyzer = analyzer
+        self.num_scenarios = sensitivity_config.get('scenarios', 10000)
+        self.seed = sensitivity_config.get('seed')
+        self.percentiles = sensitivity_config.get('percentiles', [5, 25, 50, 75, 95])
+        
+        self.distributions = {}
+        for name, default_spec in DEFAULT_DISTRIBUTIONS.items():
+            spec = dict(default_spec)
+            spec.update((sensitivity_config.get('distributions', {}) or {}).get(name, {}) or {})
+            self.distributions[name] = spec
+    
+    def sample_scenarios(self, num_scenarios: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Sample assumption values for each scenario (shared by all properties)"""
+        num_scenarios = num_scenarios or self.num_scenarios
+        rng = np.random.default_rng(self.seed)
+        point_estimates = {
+            'occupancy_rate': self.analyzer.occupancy_rate,
+            'medicaid_rate_per_day': self.analyzer.medicaid_rate,
+            'private_pay_rate_per_day': self.analyzer.private_pay_rate,
+            'expense_factor': 1.0
+        }
+        
+        return {
+            name: self._sample(rng, spec, point_estimates[name], num_scenarios)
+            for name, spec in self.distributions.items()
+        }
+    
+    def _sample(self, rng: np.random.Generator, spec: Dict[str, Any], point_estimate: float,
+                size: int) -> np.ndarray:
+        """Draw samples from a distribution spec"""
+        dist_type = spec.get('type', 'fixed')
+        mean = spec.get('mean', point_estimate)
+        
+        if dist_type == 'normal':
+            samples = rng.normal(mean, spec.get('std', 0), size)
+        elif dist_type == 'triangular':
+            low = spec.get('low', mean)
+            high = spec.get('high', mean)
+            mode = min(max(spec.get('mode', mean), low), high)
+            samples = rng.triangular(low, mode, high, size) if high > low else np.full(size, mode)
+        elif dist_type == 'uniform':
+            samples = rng.uniform(spec.get('low', mean), spec.get('high', mean), size)
+        elif dist_type == 'fixed':
+            samples = np.full(size, mean, dtype=np.float64)
+        else:
+            raise ValueError(f"Unknown distribution type: {dist_type}")
+        
+        if 'min' in spec or 'max' in spec:
+            samples = np.clip(samples, spec.get('min', -np.inf), spec.get('max', np.inf))
+        return samples
+    
+    def analyze_properties(self, properties: List[Dict[str, Any]],
+                           num_scenarios: Optional[int] = None) -> pd.DataFrame:
+        """Run sensitivity analysis for a list of property dicts"""
+        return self.analyze_batch(encode_properties(properties), num_scenarios)
+    
+    def analyze_batch(self, columns: Dict[str, np.ndarray],
+                      num_scenarios: Optional[int] = None) -> pd.DataFrame:
+        """Run sensitivity analysis over columnar inputs built by encode_properties"""
+        scenarios = self.sample_scenarios(num_scenarios)
+        num_scenarios = len(scenarios['occupancy_rate'])
+        
+        # Components that do not depend on the sampled assumptions
+        base = self.analyzer.analyze_batch(**columns)
+        components = self._fixed_components(base)
+        price = np.asarray(columns['price'], dtype=np.float64)
+        monthly_payment = base['monthly_payment'].to_numpy()
+        
+        # Monthly net income only varies with bedroom count, so each scenario row is
+        # computed and sorted once per distinct bedroom count rather than per property
+        bedroom_values, group = np.unique(np.asarray(columns['bedrooms'], dtype=np.float64), return_inverse=True)
+        net_income = np.sort(self._net_income_matrix(bedroom_values, scenarios), axis=1)
+        
+        # Cash flow, DSCR, cap rate and viability are all non-decreasing in net income,
+        # so their percentiles and exceedance probabilities follow from the sorted rows
+        net_percentiles = np.percentile(net_income, self.percentiles, axis=1).T[group]
+        cash_flow = net_percentiles - monthly_payment[:, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dscr = np.where(monthly_payment[:, np.newaxis] > 0, net_percentiles / monthly_payment[:, np.newaxis], 0.0)
+        viability = self._viability_percentiles(net_income, group, components, monthly_payment, price)
+        
+        min_cash_flow_net = monthly_payment + self.analyzer.min_cash_flow
+        dscr_net = np.where(monthly_payment > 0, monthly_payment, np.inf)
+        viable_net = self._min_viable_net_income(components, monthly_payment, price)
+        
+        frame = pd.DataFrame({'viability_score': base['viability_score'].to_numpy()})
+        for name, values in (('cash_flow', cash_flow), ('dscr', dscr), ('viability', viability)):
+            for column, percentile in enumerate(self.percentiles):
+                frame[f'{name}_p{percentile}'] = values[:, column]
+        frame['prob_min_cash_flow'] = self._exceedance(net_income, group, min_cash_flow_net)
+        frame['prob_dscr_above_1'] = self._exceedance(net_income, group, dscr_net)
+        frame['prob_viable'] = self._exceedance(net_income, group, viable_net)
+        
+        logger.info(f"Sensitivity analysis completed: {len(price)} properties x {num_scenarios} scenarios")
+        return frame
+    
+    def scenario_matrix(self, columns: Dict[str, np.ndarray],
+                        num_scenarios: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Materialize full (properties x scenarios) cash flow, DSCR and viability matrices"""
+        scenarios = self.sample_scenarios(num_scenarios)
+        base = self.analyzer.analyze_batch(**columns)
+        components = self._fixed_components(base)
+        price = np.asarray(columns['price'], dtype=np.float64)[:, np.newaxis]
+        monthly_payment = base['monthly_payment'].to_numpy()[:, np.newaxis]
+        
+        net_income = self._net_income_matrix(np.asarray(columns['bedrooms'], dtype=np.float64), scenarios)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dscr = np.where(monthly_payment > 0, net_income / monthly_payment, 0.0)
+        viability = self._viability_score(components, self._financial_score(net_income, monthly_payment, price))
+        
+        return {
+            'cash_flow': net_income - monthly_payment,
+            'dscr': dscr,
+            'viability': viability,
+            'viable': viability >= self.analyzer.viability_threshold
+        }
+    
+    def _fixed_components(self, base: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Component scores that do not depend on the sampled assumptions, as column vectors"""
+        return {
+            'basic': base['basic_score'].to_numpy()[:, np.newaxis],
+            'market': base['market_score'].to_numpy()[:, np.newaxis],
+            'wabo': base['wabo_score'].to_numpy()[:, np.newaxis],
+            'risk': base['risk_score'].to_numpy()[:, np.newaxis]
+        }
+    
+    def _viability_score(self, components: Dict[str, np.ndarray], financial_score) -> np.ndarray:
+        """Weighted viability score using the analyzer's weights"""
+        return weighted_viability_score(
+            components['basic'], financial_score, components['market'],
+            components['wabo'], components['risk'], self.analyzer.viability_weights
+        )
+    
+    def _net_income_matrix(self, bedrooms: np.ndarray, scenarios: Dict[str, np.ndarray]) -> np.ndarray:
+        """Monthly net operating income as a (bedrooms x scenarios) matrix"""
+        medicaid_residents = np.floor(bedrooms * 0.6)[:, np.newaxis]
+        private_residents = bedrooms[:, np.newaxis] - medicaid_residents
+        occupancy = scenarios['occupancy_rate']
+        medicaid_revenue = scenarios['medicaid_rate_per_day'] * 30 * occupancy
+        private_revenue = scenarios['private_pay_rate_per_day'] * 30 * occupancy
+        _, base_expenses = self.analyzer._batch_revenue_and_expenses(bedrooms)
+        expenses = base_expenses * scenarios['expense_factor']
+        return medicaid_residents * medicaid_revenue + private_residents * private_revenue - expenses
+    
+    def _financial_score(self, net_income: np.ndarray, monthly_payment: np.ndarray,
+                         price: np.ndarray) -> np.ndarray:
+        """Financial score for given net incomes (same thresholds as _calculate_financial_score)"""
+        min_cash_flow = self.analyzer.min_cash_flow
+        min_cap_rate = self.analyzer.min_cap_rate
+        
+        cash_flow = net_income - monthly_payment
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cap_rate = np.where(price > 0, (net_income * 12) / price, 0.0)
+            dscr = np.where(monthly_payment > 0, net_income / monthly_payment, 0.0)
+        
+        return (
+            np.select([cash_flow >= min_cash_flow * 1.5, cash_flow >= min_cash_flow,
+                       cash_flow >= min_cash_flow * 0.5], [40, 30, 20], 0) +
+            np.select([cap_rate >= min_cap_rate * 1.2, cap_rate >= min_cap_rate,
+                       cap_rate >= min_cap_rate * 0.8], [30, 25, 15], 0) +
+            np.select([dscr >= 1.5, dscr >= 1.25, dscr >= 1.0], [30, 25, 20], 0)
+        )
+    
+    def _viability_percentiles(self, sorted_net_income: np.ndarray, group: np.ndarray,
+                               components: Dict[str, np.ndarray], monthly_payment: np.ndarray,
+                               price: np.ndarray) -> np.ndarray:
+        """Viability percentiles, interpolated between order statistics like np.percentile"""
+        positions = np.asarray(self.percentiles, dtype=np.float64) / 100 * (sorted_net_income.shape[1] - 1)
+        lower = np.floor(positions).astype(np.intp)
+        upper = np.minimum(lower + 1, sorted_net_income.shape[1] - 1)
+        
+        def score_at(index):
+            net_income = sorted_net_income[:, index][group]
+            return self._viability_score(components, self._financial_score(
+                net_income, monthly_payment[:, np.newaxis], price[:, np.newaxis]
+            ))
+        
+        lower_score = score_at(lower)
+        return lower_score + (score_at(upper) - lower_score) * (positions - lower)
+    
+    def _min_viable_net_income(self, components: Dict[str, np.ndarray], monthly_payment: np.ndarray,
+                               price: np.ndarray) -> np.ndarray:
+        """Smallest monthly net income at which each property scores as viable (inf if never)"""
+        min_cash_flow = self.analyzer.min_cash_flow
+        min_cap_rate = self.analyzer.min_cap_rate
+        
+        # The financial score only steps up where net income crosses one of these thresholds
+        breakpoints = [np.full(len(price), -np.inf)]
+        for multiple in (0.5, 1.0, 1.5):
+            breakpoints.append(monthly_payment + min_cash_flow * multiple)
+        for multiple in (0.8, 1.0, 1.2):
+            breakpoints.append(np.where(price > 0, min_cap_rate * multiple * price / 12, np.inf))
+        for ratio in (1.0, 1.25, 1.5):
+            breakpoints.append(np.where(monthly_payment > 0, monthly_payment * ratio, np.inf))
+        breakpoints = np.sort(np.column_stack(breakpoints), axis=1)
+        
+        # Score each step just above its breakpoint so rounding cannot land on the wrong side
+        finite = np.isfinite(breakpoints)
+        with np.errstate(invalid='ignore'):
+            candidates = np.where(finite, breakpoints + np.abs(breakpoints) * 1e-9 + 1e-9, 0.0)
+        score = self._viability_score(components, self._financial_score(
+            candidates, monthly_payment[:, np.newaxis], price[:, np.newaxis]
+        ))
+        viable = (score >= self.analyzer.viability_threshold) & finite
+        # The -inf breakpoint covers arbitrarily low net income, where the financial score is 0
+        viable[:, 0] = self._viability_score(components, 0)[:, 0] >= self.analyzer.viability_threshold
+        first_viable = np.where(viable.any(axis=1), viable.argmax(axis=1), -1)
+        return np.where(first_viable >= 0, breakpoints[np.arange(len(price)), first_viable], np.inf)
+    
+    def _exceedance(self, sorted_net_income: np.ndarray, group: np.ndarray,
+                    thresholds: np.ndarray) -> np.ndarray:
+        """Fraction of scenarios whose net income is at or above each property's threshold"""
+        num_scenarios = sorted_net_income.shape[1]
+        probabilities = np.zeros(len(group), dtype=np.float64)
+        for group_index in range(len(sorted_net_income)):
+            members = group == group_index
+            below = np.searchsorted(sorted_net_income[group_index], thresholds[members], side='left')
+            probabilities[members] = (num_scenarios - below) / num_scenarios
+        return probabilities
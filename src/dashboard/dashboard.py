@@ -4,13 +4,36 @@ AFH Property Scout Dashboard - Web-based dashboard for monitoring and analysis
 
 import os
 import json
+import math
+import base64
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from loguru import logger
 import pandas as pd
 from flask import Flask, render_template, jsonify, request, send_from_directory
 import plotly.graph_objs as go
 import plotly.utils
+from analyzers.afh_analyzer import AFHAnalyzer
+
+# Query parameters accepted as filters by cursor-paginated /api/properties and /api/search, with their types
+PROPERTY_FILTER_ARGS = {
+    'source': str,
+    'county': str,
+    'city': str,
+    'wabo_status': str,
+    'min_price': float,
+    'max_price': float,
+    'min_bedrooms': int,
+    'min_score': float,
+    'viable': int
+}
+
+# Maximum list lengths accepted by /api/price_grid; the grid allocates ids x targets x rates prices
+PRICE_GRID_LIMITS = {
+    'ids': 500,
+    'targets': 50,
+    'rates': 50
+}
 
 class AFHDashboard:
     """Web dashboard for AFH Property Scout"""
@@ -21,6 +44,7 @@ class AFHDashboard:
         self.config = config
         self.app = Flask(__name__)
         self.app.secret_key = os.urandom(24)
+        self.afh_analyzer = AFHAnalyzer(config.get('afh_analysis', {}))
         
         # Setup routes
         self._setup_routes()
@@ -45,13 +69,33 @@ class AFHDashboard:
         
         @self.app.route('/api/properties')
         def api_properties():
-            """Get properties data"""
+            """Get properties data (pass cursor= to page through all properties)"""
             try:
                 limit = request.args.get('limit', 50, type=int)
                 min_score = request.args.get('min_score', 70.0, type=float)
                 
-                properties = self.db_manager.get_top_properties(limit=limit, min_score=min_score)
-                return jsonify(properties)
+                fields = self._parse_list_arg('fields', str.strip)
+                
+                if 'cursor' in request.args:
+                    # Keyset pages: an empty cursor starts at the beginning, next_cursor continues
+                    filters = {name: request.args.get(name, type=cast)
+                               for name, cast in PROPERTY_FILTER_ARGS.items() if name in request.args}
+                    properties, after = self.db_manager.get_properties_page(
+                        filters,
+                        order_by=request.args.get('order_by', 'id'),
+                        page_size=min(max(limit, 1), 1000),
+                        after=self._decode_cursor(request.args['cursor']),
+                        fields=fields
+                    )
+                    return jsonify({
+                        'properties': [property_row.to_dict() for property_row in properties],
+                        'next_cursor': self._encode_cursor(after)
+                    })
+                
+                properties = self.db_manager.get_top_properties(limit=limit, min_score=min_score, fields=fields)
+                return jsonify([property_row.to_dict() for property_row in properties])
+            except ValueError as e:
+                return jsonify({'error': f'Invalid parameter: {e}'}), 400
             except Exception as e:
                 logger.error(f"Error getting properties: {e}")
                 return jsonify({'error': str(e)}), 500
@@ -66,6 +110,82 @@ class AFHDashboard:
                 logger.error(f"Error getting stats: {e}")
                 return jsonify({'error': str(e)}), 500
         
+        @self.app.route('/api/search')
+        def api_search():
+            """Keyword search over listing descriptions, addresses and cities"""
+            try:
+                query = request.args.get('q', '').strip()
+                if not query:
+                    return jsonify({'error': 'q parameter is required'}), 400
+                
+                filters = {name: request.args.get(name, type=cast)
+                           for name, cast in PROPERTY_FILTER_ARGS.items() if name in request.args}
+                properties = self.db_manager.search_properties(
+                    query,
+                    limit=min(max(request.args.get('limit', 20, type=int), 1), 1000),
+                    filters=filters,
+                    fields=self._parse_list_arg('fields', str.strip)
+                )
+                return jsonify([property_row.to_dict() for property_row in properties])
+            except ValueError as e:
+                return jsonify({'error': f'Invalid parameter: {e}'}), 400
+            except Exception as e:
+                logger.error(f"Error searching properties: {e}")
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/api/price_drops')
+        def api_price_drops():
+            """Get listings whose price dropped recently"""
+            try:
+                properties = self.db_manager.get_price_drops(
+                    min_drop_percentage=request.args.get('min_drop', 5.0, type=float),
+                    days=request.args.get('days', 30, type=int),
+                    limit=request.args.get('limit', 100, type=int),
+                    fields=self._parse_list_arg('fields', str.strip)
+                )
+                return jsonify([property_row.to_dict() for property_row in properties])
+            except ValueError as e:
+                return jsonify({'error': f'Invalid parameter: {e}'}), 400
+            except Exception as e:
+                logger.error(f"Error getting price drops: {e}")
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/api/price_grid')
+        def api_price_grid():
+            """Get max purchase price grids (cash flow target x interest rate) for a shortlist"""
+            try:
+                property_ids = self._parse_list_arg('ids', int, PRICE_GRID_LIMITS['ids'])
+                if not property_ids:
+                    return jsonify({'error': 'ids parameter is required'}), 400
+                cash_flow_targets = self._parse_list_arg('targets', self._finite_float, PRICE_GRID_LIMITS['targets'])
+                interest_rates = self._parse_list_arg('rates', self._finite_float, PRICE_GRID_LIMITS['rates'])
+                
+                properties = self.db_manager.get_properties_by_ids(property_ids)
+                grid = self.afh_analyzer.price_grid(
+                    [property_data.get('bedrooms') or 0 for property_data in properties],
+                    cash_flow_targets=cash_flow_targets,
+                    interest_rates=interest_rates
+                )
+                
+                return jsonify({
+                    'cash_flow_targets': grid['cash_flow_targets'].tolist(),
+                    'interest_rates': grid['interest_rates'].tolist(),
+                    'properties': [
+                        {
+                            **property_data,
+                            'cap_rate_price': float(cap_rate_price),
+                            'max_price': max_price.round(2).tolist()  # [target][rate]
+                        }
+                        for property_data, max_price, cap_rate_price in zip(
+                            properties, grid['max_price'], grid['cap_rate_price'])
+                    ]
+                })
+            except ValueError as e:
+                return jsonify({'error': f'Invalid parameter: {e}'}), 400
+            except Exception as e:
+                logger.error(f"Error computing price grid: {e}")
+                return jsonify({'error': str(e)}), 500
+        
         @self.app.route('/api/charts/viability')
         def api_charts_viability():
             """Get viability score distribution chart"""
@@ -119,6 +239,37 @@ class AFHDashboard:
                 logger.error(f"Error getting property detail: {e}")
                 return "Error loading property", 500
     
+    def _encode_cursor(self, after: Optional[tuple]) -> Optional[str]:
+        """Opaque /api/properties cursor for a page key (None at the end)"""
+        if after is None:
+            return None
+        return base64.urlsafe_b64encode(json.dumps(list(after)).encode('utf-8')).decode('ascii')
+    
+    def _decode_cursor(self, cursor: str) -> Optional[tuple]:
+        """Page key from a cursor returned by _encode_cursor (None for the first page)"""
+        if not cursor:
+            return None
+        value, property_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return value, int(property_id)
+    
+    def _parse_list_arg(self, name: str, cast, limit: Optional[int] = None) -> Optional[List[Any]]:
+        """Parse a comma-separated query parameter; None when it is absent"""
+        value = request.args.get(name)
+        if not value:
+            return None
+        items = [item for item in value.split(',') if item.strip()]
+        if limit is not None and len(items) > limit:
+            raise ValueError(f"{name} accepts at most {limit} values")
+        return [cast(item) for item in items]
+    
+    @staticmethod
+    def _finite_float(value: str) -> float:
+        """float() that also rejects nan and inf"""
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(f"{value!r} is not a finite number")
+        return number
+    
     def _create_viability_chart(self) -> Dict[str, Any]:
         """Create viability score distribution chart"""
         try:
@@ -177,10 +328,9 @@ class AFHDashboard:
     def _create_price_chart(self) -> Dict[str, Any]:
         """Create price distribution chart"""
         try:
-            # Get properties with price data
-            properties = self.db_manager.get_top_properties(limit=1000, min_score=0)
-            
-            prices = [p.get('price', 0) for p in properties if p.get('price', 0) > 0]
+            # Stream prices for every listing page by page
+            prices = [property_row['price'] for property_row in self.db_manager.iter_properties(
+                {'min_price': 0.01}, order_by='price', page_size=1000, fields=('price',))]
             
             if not prices:
                 return json.dumps({})
@@ -351,7 +501,7 @@ def create_dashboard_templates():
             </span>
         </div>
     </nav>
-
+    
     <div class="container-fluid mt-4">
         <!-- Summary Cards -->
         <div class="row" id="summaryCards">
@@ -380,7 +530,7 @@ def create_dashboard_templates():
                 </div>
             </div>
         </div>
-
+        
         <!-- Charts Row -->
         <div class="row">
             <div class="col-md-6">
@@ -396,7 +546,7 @@ def create_dashboard_templates():
                 </div>
             </div>
         </div>
-
+        
         <div class="row">
             <div class="col-md-6">
                 <div class="chart-container">
@@ -411,7 +561,7 @@ def create_dashboard_templates():
                 </div>
             </div>
         </div>
-
+        
         <!-- Properties Table -->
         <div class="row">
             <div class="col-12">
@@ -422,7 +572,7 @@ def create_dashboard_templates():
             </div>
         </div>
     </div>
-
+    
     <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
     <script>
         // Load dashboard data
@@ -432,33 +582,33 @@ def create_dashboard_templates():
                 const summaryResponse = await fetch('/api/summary');
                 const summary = await summaryResponse.json();
                 updateSummaryCards(summary);
-
+                
                 // Load charts
                 loadChart('/api/charts/viability', 'viabilityChart');
                 loadChart('/api/charts/county', 'countyChart');
                 loadChart('/api/charts/price', 'priceChart');
                 loadChart('/api/charts/trends', 'trendsChart');
-
+                
                 // Load properties
                 const propertiesResponse = await fetch('/api/properties?limit=20');
                 const properties = await propertiesResponse.json();
                 updatePropertiesTable(properties);
-
+                
                 // Update last updated time
                 document.getElementById('lastUpdated').textContent = new Date().toLocaleString();
-
+            
             } catch (error) {
                 console.error('Error loading dashboard:', error);
             }
         }
-
+        
         function updateSummaryCards(summary) {
             document.getElementById('totalProperties').textContent = summary.total || 0;
             document.getElementById('viableProperties').textContent = summary.viable || 0;
             document.getElementById('newProperties').textContent = summary.new || 0;
             document.getElementById('avgScore').textContent = (summary.average_viability_score || 0) + '%';
         }
-
+        
         async function loadChart(url, containerId) {
             try {
                 const response = await fetch(url);
@@ -470,14 +620,14 @@ def create_dashboard_templates():
                 console.error(`Error loading chart ${containerId}:`, error);
             }
         }
-
+        
         function updatePropertiesTable(properties) {
             const container = document.getElementById('propertiesTable');
             if (!properties || properties.length === 0) {
                 container.innerHTML = '<p>No properties found.</p>';
                 return;
             }
-
+            
             let tableHTML = `
                 <div class="table-responsive">
                     <table class="table table-striped">
@@ -495,7 +645,7 @@ def create_dashboard_templates():
                         </thead>
                         <tbody>
             `;
-
+            
             properties.forEach(prop => {
                 const viabilityClass = prop.viability_score >= 80 ? 'viability-excellent' : 
                                      prop.viability_score >= 70 ? 'viability-good' : 'viability-fair';
@@ -513,14 +663,14 @@ def create_dashboard_templates():
                     </tr>
                 `;
             });
-
+            
             tableHTML += '</tbody></table></div>';
             container.innerHTML = tableHTML;
         }
-
+        
         // Load dashboard on page load
         document.addEventListener('DOMContentLoaded', loadDashboard);
-
+        
         // Refresh dashboard every 5 minutes
         setInterval(loadDashboard, 300000);
     </script>
@@ -551,7 +701,7 @@ def create_dashboard_templates():
             <a href="/" class="btn btn-outline-light">Back to Dashboard</a>
         </div>
     </nav>
-
+    
     <div class="container mt-4">
         <div class="row">
             <div class="col-12">
@@ -7,6 +7,7 @@ Automated search and analysis system for Adult Family Home properties
 import argparse
 import sys
 import os
+from functools import cached_property
 from pathlib import Path
 from loguru import logger
 import yaml
@@ -15,13 +16,6 @@ from dotenv import load_dotenv
 # Add src to path
 sys.path.append(str(Path(__file__).parent))
 
-from scrapers.property_scraper import PropertyScraper
-from analyzers.afh_analyzer import AFHAnalyzer
-from notifications.notification_manager import NotificationManager
-from storage.database import DatabaseManager
-from scheduler.daily_scheduler import DailyScheduler
-from filters.property_filter import PropertyFilter
-
 class AFHPropertyScout:
     """Main application class for AFH Property Scout"""
     
@@ -32,16 +26,71 @@ class AFHPropertyScout:
         self._setup_logging()
         self._load_environment()
         
-        # Initialize components
-        self.db_manager = DatabaseManager(self.config['database'])
-        self.property_filter = PropertyFilter(self.config['property_criteria'])
-        self.afh_analyzer = AFHAnalyzer(self.config['afh_analysis'])
-        self.notification_manager = NotificationManager(self.config['notifications'])
-        self.property_scraper = PropertyScraper(self.config['search_sources'])
-        self.scheduler = DailyScheduler(self.config['schedule'])
-        
+        # Components are imported and constructed on first use so each command only loads what it needs
         logger.info("AFH Property Scout initialized successfully")
     
+    @cached_property
+    def db_manager(self):
+        """Database manager"""
+        from storage.backends import create_database_manager
+        return create_database_manager(self.config['database'])
+    
+    @cached_property
+    def property_filter(self):
+        """Property criteria filter"""
+        from filters.property_filter import PropertyFilter
+        return PropertyFilter(self.config['property_criteria'])
+    
+    @cached_property
+    def comps_engine(self):
+        """Comparable-sales index (refreshed after each store)"""
+        from analyzers.comps_engine import CompsEngine
+        comps_engine = CompsEngine(self.db_manager, self.config['afh_analysis'].get('market_comps', {}))
+        self.db_manager.add_store_listener(comps_engine.refresh)
+        return comps_engine
+    
+    @cached_property
+    def afh_analyzer(self):
+        """AFH viability analyzer"""
+        from analyzers.afh_analyzer import AFHAnalyzer
+        return AFHAnalyzer(self.config['afh_analysis'], comps_engine=self.comps_engine)
+    
+    @cached_property
+    def analysis_cache(self):
+        """Analysis cache keyed by property and config hashes"""
+        from analyzers.analysis_cache import AnalysisCache
+        return AnalysisCache(self.afh_analyzer, self.db_manager)
+    
+    @cached_property
+    def sensitivity_analyzer(self):
+        """Monte Carlo sensitivity analyzer"""
+        from analyzers.sensitivity import SensitivityAnalyzer
+        return SensitivityAnalyzer(self.afh_analyzer, self.config['afh_analysis'].get('sensitivity', {}))
+    
+    @cached_property
+    def portfolio_optimizer(self):
+        """Portfolio selection optimizer"""
+        from analyzers.portfolio import PortfolioOptimizer
+        return PortfolioOptimizer(self.config.get('portfolio', {}))
+    
+    @cached_property
+    def notification_manager(self):
+        """Email and SMS notification manager"""
+        from notifications.notification_manager import NotificationManager
+        return NotificationManager(self.config['notifications'])
+    
+    @cached_property
+    def property_scraper(self):
+        """Property scraper for all configured sources"""
+        from scrapers.property_scraper import PropertyScraper
+        return PropertyScraper(self.config['search_sources'])
+    
+    @cached_property
+    def scheduler(self):
+        """Daily search scheduler"""
+        from scheduler.daily_scheduler import DailyScheduler
+        return DailyScheduler(self.config['schedule'])
+    
     def _load_config(self):
         """Load configuration from YAML file"""
         try:
@@ -102,10 +151,10 @@ class AFHPropertyScout:
             filtered_properties = self.property_filter.filter_properties(properties)
             logger.info(f"Filtered to {len(filtered_properties)} properties matching criteria")
             
-            # Analyze properties for AFH viability
+            # Analyze properties for AFH viability (unchanged listings reuse cached analyses)
             analyzed_properties = []
-            for property_data in filtered_properties:
-                analysis = self.afh_analyzer.analyze_property(property_data)
+            analyses = self.analysis_cache.analyze_properties(filtered_properties)
+            for property_data, analysis in zip(filtered_properties, analyses):
                 if analysis['viable']:
                     analyzed_properties.append({
                         'property': property_data,
@@ -114,15 +163,20 @@ class AFHPropertyScout:
             
             logger.info(f"Found {len(analyzed_properties)} viable AFH properties")
             
-            # Store results in database
-            self.db_manager.store_properties(analyzed_properties)
+            # Store results in database; queued, and committed by the background writer
+            # together with the analysis cache entries
+            self.db_manager.store_properties_async(analyzed_properties)
+            self.db_manager.flush()
             
             # Send notifications for new viable properties
-            new_properties = self.db_manager.get_new_properties()
+            new_properties = self._with_narrative(self.db_manager.get_new_properties())
             if new_properties:
                 self.notification_manager.send_property_alerts(new_properties)
                 logger.info(f"Sent notifications for {len(new_properties)} new properties")
             
+            # Prune history the daily run has made obsolete
+            self.db_manager.compact()
+            
             return analyzed_properties
             
         except Exception as e:
@@ -138,32 +192,97 @@ class AFHPropertyScout:
         """Check and send pending notifications"""
         logger.info("Checking for pending notifications")
         
-        new_properties = self.db_manager.get_new_properties()
+        new_properties = self._with_narrative(self.db_manager.get_new_properties())
         if new_properties:
             self.notification_manager.send_property_alerts(new_properties)
             logger.info(f"Sent notifications for {len(new_properties)} new properties")
         else:
             logger.info("No new properties requiring notifications")
     
+    def _with_narrative(self, properties):
+        """Alert entries for stored rows, filling in recommendations scored without narrative"""
+        # Stored rows carry listing and analysis fields together; alerts expect them paired
+        for property_row in properties:
+            self.afh_analyzer.add_narrative(property_row, property_row)
+        return [{'property': property_row, 'analysis': property_row} for property_row in properties]
+    
     def start_scheduler(self):
         """Start the daily scheduler"""
         logger.info("Starting daily scheduler")
         self.scheduler.start(self.run_daily_search)
     
+    def rescore_analyses(self):
+        """Recompute viability for all stored analyses with the current weights and threshold"""
+        logger.info("Re-scoring stored analyses")
+        self.db_manager.backfill_component_scores(self.afh_analyzer.component_scores_from_analysis)
+        return self.db_manager.rescore_analyses(
+            self.afh_analyzer.viability_weights,
+            self.afh_analyzer.viability_threshold
+        )
+    
+    def optimize_portfolio(self, budget=None):
+        """Choose the stored viable properties that maximize cash flow within the capital budget"""
+        logger.info("Optimizing portfolio over stored viable properties")
+        # Streamed so every viable property is considered; only the sections the optimizer reads are decoded
+        candidates = list(self.db_manager.iter_properties(
+            filters={'min_score': self.afh_analyzer.viability_threshold},
+            order_by='-viability_score',
+            fields=('address', 'financial_analysis', 'wabo_analysis', 'risk_analysis')
+        ))
+        return self.portfolio_optimizer.optimize(candidates, budget=budget)
+    
+    def run_sensitivity(self, limit=20):
+        """Monte Carlo percentiles and target probabilities for the top stored viable properties"""
+        logger.info("Running sensitivity analysis over top stored properties")
+        from analyzers.afh_analyzer import ANALYSIS_FIELDS
+        rows = self.db_manager.get_top_properties(
+            limit=limit, min_score=self.afh_analyzer.viability_threshold, fields=('address',) + ANALYSIS_FIELDS
+        )
+        if not rows:
+            return []
+        
+        # Stored NULLs fall back to the analyzer's defaults, as missing fields do for scraped listings
+        properties = [{field: row[field] for field in ANALYSIS_FIELDS if row[field] is not None} for row in rows]
+        results = self.sensitivity_analyzer.analyze_properties(properties)
+        return [{'address': row['address'], **result} for row, result in zip(rows, results.to_dict('records'))]
+    
+    def compact_database(self):
+        """Apply retention policies to history tables and release the freed space"""
+        logger.info("Compacting database")
+        return self.db_manager.compact()
+    
+    def export_snapshot(self, output_dir=None, export_format=None):
+        """Export stored properties and their current analysis as partitioned columnar files"""
+        logger.info("Exporting property snapshot")
+        return self.db_manager.export_snapshot(output_dir, export_format)
+    
     def get_property_summary(self):
         """Get a summary of all stored properties"""
         return self.db_manager.get_property_summary()
 
-def main():
-    """Main entry point"""
+def build_parser():
+    """Command line arguments shared by main.py and run_scout.py"""
     parser = argparse.ArgumentParser(description="AFH Property Scout - Automated AFH Property Search")
     parser.add_argument('--daily', action='store_true', help='Run daily search')
     parser.add_argument('--search', action='store_true', help='Run one-time search')
     parser.add_argument('--notify', action='store_true', help='Check and send notifications')
     parser.add_argument('--schedule', action='store_true', help='Start daily scheduler')
     parser.add_argument('--summary', action='store_true', help='Show property summary')
+    parser.add_argument('--rescore', action='store_true', help='Re-score stored analyses with current weights')
+    parser.add_argument('--portfolio', action='store_true', help='Select the best set of viable properties within budget')
+    parser.add_argument('--budget', type=float, help='Capital budget for --portfolio (defaults to portfolio.budget)')
+    parser.add_argument('--sensitivity', nargs='?', const=20, type=int, metavar='N',
+                        help='Monte Carlo cash flow and viability ranges for the top N stored properties (default 20)')
+    parser.add_argument('--compact', action='store_true', help='Prune old history and reclaim database space')
+    parser.add_argument('--export', nargs='?', const='', metavar='DIR',
+                        help='Export a partitioned Parquet/Arrow snapshot (defaults to database.export.path)')
+    parser.add_argument('--export-format', choices=['parquet', 'arrow'], help='File format for --export')
     parser.add_argument('--config', default='config/settings.yaml', help='Configuration file path')
-    
+    return parser
+
+def main():
+    """Main entry point"""
+    parser = build_parser()
     args = parser.parse_args()
     
     try:
@@ -184,6 +303,41 @@ def main():
         elif args.schedule:
             scout.start_scheduler()
             
+        elif args.rescore:
+            rescored = scout.rescore_analyses()
+            print(f"Re-scored {rescored} stored analyses.")
+            
+        elif args.portfolio:
+            portfolio = scout.optimize_portfolio(args.budget)
+            print(f"Portfolio ({portfolio['candidates_considered']} candidates, budget ${portfolio['budget']:,.0f}):")
+            for selected in portfolio['selected']:
+                print(f"  {selected['address']}: ${selected['capital_required']:,.0f} capital, "
+                      f"${selected['monthly_cash_flow']:,.0f}/mo, marginal ${selected['marginal_value']:,.0f}/mo")
+            print(f"Total: ${portfolio['total_capital']:,.0f} capital, ${portfolio['total_monthly_cash_flow']:,.0f}/mo cash flow")
+            
+        elif args.sensitivity is not None:
+            results = scout.run_sensitivity(args.sensitivity)
+            percentiles = scout.sensitivity_analyzer.percentiles
+            min_cash_flow = scout.afh_analyzer.min_cash_flow
+            print(f"Sensitivity ({len(results)} properties):")
+            for result in results:
+                cash_flow = ', '.join(f"p{percentile} ${result[f'cash_flow_p{percentile}']:,.0f}" for percentile in percentiles)
+                print(f"  {result['address']}: cash flow {cash_flow}/mo; "
+                      f"P(cash flow >= ${min_cash_flow:,.0f}) {result['prob_min_cash_flow']:.0%}, "
+                      f"P(viable) {result['prob_viable']:.0%}")
+            
+        elif args.compact:
+            result = scout.compact_database()
+            if 'error' in result:
+                print(f"Compaction failed: {result['error']}")
+            else:
+                print(f"Compaction deleted {sum(result['deleted'].values())} rows, "
+                      f"reclaimed {result['bytes_reclaimed'] / (1024 * 1024):.2f} MB.")
+            
+        elif args.export is not None:
+            result = scout.export_snapshot(args.export or None, args.export_format)
+            print(f"Exported {result['rows']} properties in {result['files']} files to {result['path']}.")
+            
         elif args.summary:
             summary = scout.get_property_summary()
             print("Property Summary:")
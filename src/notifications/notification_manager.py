@@ -10,7 +10,6 @@ from email.mime.base import MIMEBase
 from email import encoders
 from typing import List, Dict, Any
 from loguru import logger
-from twilio.rest import Client
 import json
 from datetime import datetime
 
@@ -23,19 +22,26 @@ class NotificationManager:
         self.email_config = notification_config.get('email', {})
         self.sms_config = notification_config.get('sms', {})
         
-        # Initialize Twilio client for SMS
-        if self.sms_config.get('enabled', False):
-            try:
-                self.twilio_client = Client(
-                    os.getenv('TWILIO_ACCOUNT_SID'),
-                    os.getenv('TWILIO_AUTH_TOKEN')
-                )
-                logger.info("Twilio SMS client initialized")
-            except Exception as e:
-                logger.error(f"Failed to initialize Twilio client: {e}")
-                self.twilio_client = None
-        else:
-            self.twilio_client = None
+        # Twilio client for SMS is created on first use
+        self._twilio_client = None
+        self._twilio_initialized = False
+    
+    @property
+    def twilio_client(self):
+        """Twilio client for SMS (imported and constructed on first access)"""
+        if not self._twilio_initialized:
+            self._twilio_initialized = True
+            if self.sms_config.get('enabled', False):
+                try:
+                    from twilio.rest import Client
+                    self._twilio_client = Client(
+                        os.getenv('TWILIO_ACCOUNT_SID'),
+                        os.getenv('TWILIO_AUTH_TOKEN')
+                    )
+                    logger.info("Twilio SMS client initialized")
+                except Exception as e:
+                    logger.error(f"Failed to initialize Twilio client: {e}")
+        return self._twilio_client
     
     def send_property_alerts(self, properties: List[Dict[str, Any]]) -> bool:
         """Send alerts for new AFH properties"""
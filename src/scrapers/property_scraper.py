@@ -9,17 +9,23 @@ import time
 import random
 from typing import List, Dict, Any
 from loguru import logger
-from fake_useragent import UserAgent
 import re
+from functools import lru_cache
 from urllib.parse import urljoin, urlparse
 
+@lru_cache(maxsize=1)
+def shared_user_agent():
+    """Single UserAgent shared by all scrapers (loading its browser data is slow)"""
+    from fake_useragent import UserAgent
+    return UserAgent()
+
 class PropertyScraper:
     """Main property scraper that coordinates searches across multiple sources"""
     
     def __init__(self, search_sources_config: Dict[str, Any]):
         """Initialize the property scraper with source configurations"""
         self.sources_config = search_sources_config
-        self.ua = UserAgent()
+        self.ua = shared_user_agent()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': self.ua.random,
@@ -112,7 +118,11 @@ class BaseScraper:
     
     def __init__(self, session: requests.Session):
         self.session = session
-        self.ua = UserAgent()
+    
+    @property
+    def ua(self):
+        """Shared UserAgent, loaded on first use"""
+        return shared_user_agent()
     
     def search_afh_properties(self) -> List[Dict[str, Any]]:
         """Search for AFH properties - to be implemented by subclasses"""
@@ -0,0 +1,331 @@
+"""
+Analysis Codec - Compact binary encoding for stored AFH analyses
+Fields are struct-packed against a fixed schema with strings in a NUL-separated table
+"""
+
+import json
+import struct
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+CODEC_VERSION = 1
+
+# Kinds: 'n' number, 'b' bool, 's' string, 'l' list of strings
+ANALYSIS_SCHEMA = (
+    (('viable',), 'b'),
+    (('viability_score',), 'n'),
+    (('component_scores', 'basic'), 'n'),
+    (('component_scores', 'financial'), 'n'),
+    (('component_scores', 'market'), 'n'),
+    (('component_scores', 'wabo'), 'n'),
+    (('component_scores', 'risk'), 'n'),
+    (('basic_analysis', 'score'), 'n'),
+    (('basic_analysis', 'max_score'), 'n'),
+    (('basic_analysis', 'percentage'), 'n'),
+    (('basic_analysis', 'issues'), 'l'),
+    (('basic_analysis', 'strengths'), 'l'),
+    (('financial_analysis', 'purchase_price'), 'n'),
+    (('financial_analysis', 'loan_amount'), 'n'),
+    (('financial_analysis', 'monthly_payment'), 'n'),
+    (('financial_analysis', 'monthly_revenue', 'medicaid'), 'n'),
+    (('financial_analysis', 'monthly_revenue', 'private_pay'), 'n'),
+    (('financial_analysis', 'monthly_revenue', 'total'), 'n'),
+    (('financial_analysis', 'monthly_expenses'), 'n'),
+    (('financial_analysis', 'monthly_cash_flow'), 'n'),
+    (('financial_analysis', 'annual_cash_flow'), 'n'),
+    (('financial_analysis', 'cap_rate'), 'n'),
+    (('financial_analysis', 'dscr'), 'n'),
+    (('financial_analysis', 'occupancy_assumption'), 'n'),
+    (('financial_analysis', 'resident_mix', 'medicaid'), 'n'),
+    (('financial_analysis', 'resident_mix', 'private_pay'), 'n'),
+    (('financial_analysis', 'resident_mix', 'total'), 'n'),
+    (('market_analysis', 'price_per_sqft'), 'n'),
+    (('market_analysis', 'market_avg_price_per_sqft'), 'n'),
+    (('market_analysis', 'market_reference'), 's'),
+    (('market_analysis', 'market_comparison'), 's'),
+    (('market_analysis', 'market_demand'), 's'),
+    (('market_analysis', 'competition_level'), 's'),
+    (('market_analysis', 'county'), 's'),
+    (('wabo_analysis', 'wabo_status'), 's'),
+    (('wabo_analysis', 'wabo_score'), 'n'),
+    (('wabo_analysis', 'licensing_timeline'), 's'),
+    (('wabo_analysis', 'estimated_licensing_cost'), 'n'),
+    (('wabo_analysis', 'keyword_bonus'), 'n'),
+    (('risk_analysis', 'total_risk_score'), 'n'),
+    (('risk_analysis', 'risks'), 'l'),
+    (('risk_analysis', 'risk_level'), 's'),
+    (('pricing_analysis', 'current_price'), 'n'),
+    (('pricing_analysis', 'optimal_price'), 'n'),
+    (('pricing_analysis', 'max_price'), 'n'),
+    (('pricing_analysis', 'cap_rate_price'), 'n'),
+    (('pricing_analysis', 'negotiation_target'), 'n'),
+    (('pricing_analysis', 'price_difference'), 'n'),
+    (('pricing_analysis', 'price_difference_percentage'), 'n'),
+    (('pricing_analysis', 'negotiation_strategy'), 'l'),
+    (('analysis_date',), 's'),
+    (('recommendations',), 'l'),
+    (('property_hash',), 's'),
+    (('config_hash',), 's')
+)
+
+# Per-row analysis sections (stored as separate JSON columns before the binary format)
+ANALYSIS_SECTIONS = ('basic_analysis', 'financial_analysis', 'market_analysis', 'wabo_analysis',
+                     'risk_analysis', 'pricing_analysis', 'recommendations')
+
+# Schema as a tree of nested dicts with (slot, kind) leaves, for a single walk over an analysis
+_SCHEMA_TREE = {}
+for _slot, (_path, _kind) in enumerate(ANALYSIS_SCHEMA):
+    _node = _SCHEMA_TREE
+    for _key in _path[:-1]:
+        _node = _node.setdefault(_key, {})
+    _node[_path[-1]] = (_slot, _kind)
+_MASK_BYTES = (len(ANALYSIS_SCHEMA) + 7) // 8
+
+# version, presence mask, integer mask, string table length
+_HEADER = struct.Struct(f'<B{_MASK_BYTES}s{_MASK_BYTES}sI')
+
+def _is_number(value) -> bool:
+    """Floats, and integers that fit the packed int32 slot"""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -2**31 <= value < 2**31
+    return isinstance(value, float)
+
+def _is_text(value) -> bool:
+    """Strings that can be stored NUL-separated in the string table"""
+    return isinstance(value, str) and '\x00' not in value
+
+def _encodable(kind: str, value) -> bool:
+    """Check whether a value fits its schema slot (otherwise it is stored as JSON extras)"""
+    if kind == 'n':
+        return _is_number(value)
+    if kind == 'b':
+        return isinstance(value, bool)
+    if kind == 's':
+        return _is_text(value)
+    return isinstance(value, list) and all(_is_text(item) for item in value)
+
+def _flatten(data: Dict[str, Any], tree: Dict[str, Any], slots: Dict[int, Any],
+             extras: Dict[str, Any]):
+    """Split a nested analysis into schema slot values and a nested dict of everything else"""
+    for key, value in data.items():
+        node = tree.get(key)
+        if node is None:
+            extras[key] = value
+        elif type(node) is dict:
+            if isinstance(value, dict) and value:
+                nested = {}
+                _flatten(value, node, slots, nested)
+                if nested:
+                    extras[key] = nested
+            else:
+                extras[key] = value
+        else:
+            # Exact-type checks cover the common cases without the general validation
+            slot, kind = node
+            value_type = type(value)
+            if (kind == 'n' and (value_type is float or value_type is int and -2**31 <= value < 2**31)) \
+                    or (kind == 's' and value_type is str and '\x00' not in value) \
+                    or _encodable(kind, value):
+                slots[slot] = value
+            else:
+                extras[key] = value
+
+@lru_cache(maxsize=64)
+def _layout(present: int, integers: int) -> Tuple[struct.Struct, Tuple[tuple, ...]]:
+    """Numeric block struct and decode plan for a record's presence and integer masks
+    
+    The plan holds (container, key, kind, index) steps in schema order. container is the
+    position of the dict the value is set in, in the order containers are opened; a 'd' step
+    opens a nested dict. index is the value's position in the unpacked block for numbers
+    and bools, or that of its length for lists.
+    """
+    fields = [(slot, path, kind) for slot, (path, kind) in enumerate(ANALYSIS_SCHEMA) if present >> slot & 1]
+    numbers = [field for field in fields if field[2] in 'nb']
+    lists = [field for field in fields if field[2] == 'l']
+    formats = ''.join('?' if kind == 'b' else 'i' if integers >> slot & 1 else 'd'
+                      for slot, _, kind in numbers)
+    block = struct.Struct(f'<{formats}{len(lists)}H')
+    
+    indexes = {slot: index for index, (slot, _, _) in enumerate(numbers + lists)}
+    containers = {(): 0}
+    plan = []
+    for slot, path, kind in fields:
+        for depth in range(1, len(path)):
+            if path[:depth] not in containers:
+                containers[path[:depth]] = len(containers)
+                plan.append((containers[path[:depth - 1]], path[depth - 1], 'd', None))
+        plan.append((containers[path[:-1]], path[-1], kind, indexes.get(slot)))
+    return block, tuple(plan)
+
+def _build(plan: Tuple[tuple, ...], values: Tuple[Any, ...], strings: List[str]) -> Dict[str, Any]:
+    """Nest a record's unpacked numbers and string table into an analysis dict following its plan"""
+    containers = [{}]
+    offset = 0
+    for container, key, kind, index in plan:
+        if kind == 'd':
+            value = {}
+            containers.append(value)
+        elif kind == 's':
+            value = strings[offset]
+            offset += 1
+        elif kind == 'l':
+            value = strings[offset:offset + values[index]]
+            offset += values[index]
+        else:
+            value = values[index]
+        containers[container][key] = value
+    return containers[0]
+
+def encode_analysis(analysis: Dict[str, Any]) -> bytes:
+    """Encode an analysis dict into the compact binary format"""
+    slots = {}
+    extras = {}
+    _flatten(analysis, _SCHEMA_TREE, slots, extras)
+    
+    present = 0
+    integers = 0
+    numbers = []
+    list_lengths = []
+    strings = []
+    for slot in sorted(slots):
+        value = slots[slot]
+        kind = ANALYSIS_SCHEMA[slot][1]
+        present |= 1 << slot
+        if kind in 'nb':
+            numbers.append(value)
+            if kind == 'n' and isinstance(value, int):
+                integers |= 1 << slot
+        elif kind == 's':
+            strings.append(value)
+        else:
+            list_lengths.append(len(value))
+            strings.extend(value)
+    
+    string_table = '\x00'.join(strings).encode('utf-8')
+    block, _ = _layout(present, integers)
+    return b''.join([
+        _HEADER.pack(CODEC_VERSION, present.to_bytes(_MASK_BYTES, 'little'),
+                     integers.to_bytes(_MASK_BYTES, 'little'), len(string_table)),
+        block.pack(*numbers, *list_lengths),
+        string_table,
+        json.dumps(extras).encode('utf-8') if extras else b''
+    ])
+
+def _merge(target: Dict[str, Any], extras: Dict[str, Any]):
+    """Merge nested extras back into a decoded analysis"""
+    for key, value in extras.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+
+def decode_analysis(blob: bytes) -> Dict[str, Any]:
+    """Decode a binary analysis back into a nested dict"""
+    version, present, integers, string_length = _HEADER.unpack_from(blob)
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported analysis codec version: {version}")
+    
+    block, plan = _layout(int.from_bytes(present, 'little'), int.from_bytes(integers, 'little'))
+    offset = _HEADER.size + block.size
+    strings = blob[offset:offset + string_length].decode('utf-8').split('\x00')
+    extras = blob[offset + string_length:]
+    
+    analysis = _build(plan, block.unpack_from(blob, _HEADER.size), strings)
+    if extras:
+        _merge(analysis, json.loads(extras))
+    return analysis
+
+@lru_cache(maxsize=64)
+def _number_positions(present: int) -> Dict[int, int]:
+    """Position of each present number/bool slot in a record's numeric block"""
+    slots = [slot for slot, (_, kind) in enumerate(ANALYSIS_SCHEMA) if kind in 'nb' and present >> slot & 1]
+    return {slot: position for position, slot in enumerate(slots)}
+
+def decode_numbers(blob: bytes, slots: Sequence[int]) -> Optional[List[Any]]:
+    """Values of number/bool schema slots (None where absent) without building the analysis dict
+    
+    Returns None for records with JSON extras, where a slot's value may have been stored as
+    an extra; decode those with decode_analysis.
+    """
+    version, present, integers, string_length = _HEADER.unpack_from(blob)
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported analysis codec version: {version}")
+    
+    present = int.from_bytes(present, 'little')
+    block, _ = _layout(present, int.from_bytes(integers, 'little'))
+    if len(blob) > _HEADER.size + block.size + string_length:
+        return None
+    
+    values = block.unpack_from(blob, _HEADER.size)
+    positions = _number_positions(present)
+    return [values[positions[slot]] if slot in positions else None for slot in slots]
+
+class AnalysisRecord:
+    """Stored analysis that keeps its binary encoding and decodes on first access"""
+    
+    __slots__ = ('_blob', '_analysis')
+    
+    def __init__(self, blob: bytes):
+        self._blob = blob
+        self._analysis: Optional[Dict[str, Any]] = None
+    
+    @classmethod
+    def from_analysis(cls, analysis: Dict[str, Any]) -> 'AnalysisRecord':
+        """Build a record from an analyzer result"""
+        record = cls(encode_analysis(analysis))
+        record._analysis = analysis
+        return record
+    
+    @property
+    def blob(self) -> bytes:
+        return self._blob
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Full decoded analysis"""
+        if self._analysis is None:
+            self._analysis = decode_analysis(self._blob)
+        return self._analysis
+    
+    def __getitem__(self, key: str):
+        return self.to_dict()[key]
+    
+    def get(self, key: str, default=None):
+        return self.to_dict().get(key, default)
+    
+    @property
+    def viable(self) -> bool:
+        return self.get('viable', False)
+    
+    @property
+    def viability_score(self) -> float:
+        return self.get('viability_score', 0)
+    
+    @property
+    def basic_analysis(self) -> Dict[str, Any]:
+        return self.get('basic_analysis', {})
+    
+    @property
+    def financial_analysis(self) -> Dict[str, Any]:
+        return self.get('financial_analysis', {})
+    
+    @property
+    def market_analysis(self) -> Dict[str, Any]:
+        return self.get('market_analysis', {})
+    
+    @property
+    def wabo_analysis(self) -> Dict[str, Any]:
+        return self.get('wabo_analysis', {})
+    
+    @property
+    def risk_analysis(self) -> Dict[str, Any]:
+        return self.get('risk_analysis', {})
+    
+    @property
+    def pricing_analysis(self) -> Dict[str, Any]:
+        return self.get('pricing_analysis', {})
+    
+    @property
+    def recommendations(self) -> List[str]:
+        return self.get('recommendations', [])
@@ -0,0 +1,22 @@
+"""
+Storage Backends - Creates the database manager for the configured database.type
+"""
+
+from importlib import import_module
+from typing import Dict, Any
+
+# database.type -> (module, manager class); modules are imported on demand, so SQLite
+# installs never need psycopg2
+DATABASE_BACKENDS = {
+    'sqlite': ('storage.database', 'DatabaseManager'),
+    'postgresql': ('storage.postgres', 'PostgresDatabaseManager'),
+    'postgres': ('storage.postgres', 'PostgresDatabaseManager')
+}
+
+def create_database_manager(db_config: Dict[str, Any]):
+    """Database manager for db_config['type'] (SQLite when unset)"""
+    backend = str(db_config.get('type', 'sqlite')).lower()
+    if backend not in DATABASE_BACKENDS:
+        raise ValueError(f"Unsupported database type: {backend} (expected one of {', '.join(DATABASE_BACKENDS)})")
+    module_name, class_name = DATABASE_BACKENDS[backend]
+    return getattr(import_module(module_name), class_name)(db_config)
@@ -0,0 +1,1078 @@
+"""
+Base Database Manager - Storage logic shared by the SQLite and PostgreSQL backends
+Backends supply the connection manager and override the dialect-specific statements
+"""
+
+import json
+import re
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+from loguru import logger
+from storage.analysis_codec import ANALYSIS_SECTIONS, encode_analysis, decode_analysis
+from storage.rows import PropertyRow
+from storage.writer import BackgroundWriter
+
+# Numeric component score columns in property_analysis, keyed by component name
+COMPONENT_SCORE_COLUMNS = {
+    'basic_score': 'basic',
+    'financial_score': 'financial',
+    'market_score': 'market',
+    'wabo_score': 'wabo',
+    'risk_score': 'risk'
+}
+
+# Columns written when a property is inserted; the first three form the UNIQUE listing key
+# (raw_data lives in property_raw_data so scans of properties stay small)
+PROPERTY_COLUMNS = (
+    'source', 'listing_id', 'address', 'city', 'state', 'zip_code', 'county',
+    'price', 'bedrooms', 'bathrooms', 'sqft', 'property_type', 'description',
+    'wabo_status', 'url', 'images', 'date_listed', 'contact_info'
+)
+
+# Columns refreshed when a stored listing is seen again
+PROPERTY_UPDATE_COLUMNS = (
+    'price', 'bedrooms', 'bathrooms', 'sqft', 'property_type', 'description',
+    'wabo_status', 'url', 'images', 'date_listed', 'contact_info'
+)
+
+# Fields the property read APIs can project (fields=); raw_data is only loaded when named
+PROPERTY_READ_COLUMNS = ('id',) + PROPERTY_COLUMNS + ('created_at', 'updated_at')
+CURRENT_ANALYSIS_FIELDS = ('viable', 'viability_score')
+READ_FIELDS = PROPERTY_READ_COLUMNS + CURRENT_ANALYSIS_FIELDS + ANALYSIS_SECTIONS + ('raw_data',)
+
+# Indexed columns iter_properties can order by (prefix '-' for descending); ties break on property id
+SORT_COLUMNS = {
+    'id': 'p.id',
+    'price': 'p.price',
+    'created_at': 'p.created_at',
+    'updated_at': 'p.updated_at',
+    'viability_score': 'ca.viability_score'
+}
+
+# Listing fields whose changes are recorded in property_events
+TRACKED_PROPERTY_FIELDS = ('price', 'bedrooms', 'bathrooms', 'sqft', 'property_type', 'description', 'wabo_status')
+
+# Listing text indexed for full-text search, with its bm25 weight (short fields count more per match)
+SEARCH_COLUMNS = {
+    'description': 1.0,
+    'address': 2.0,
+    'city': 2.0
+}
+
+# Viability score buckets for database stats, highest first: (lower bound, label)
+SCORE_RANGES = (
+    (90, 'Excellent (90-100)'),
+    (80, 'Good (80-89)'),
+    (70, 'Fair (70-79)'),
+    (60, 'Poor (60-69)'),
+    (None, 'Very Poor (<60)')
+)
+
+# iter_properties filters and their SQL conditions
+PROPERTY_FILTERS = {
+    'source': 'p.source = ?',
+    'county': 'p.county = ?',
+    'city': 'p.city = ?',
+    'wabo_status': 'p.wabo_status = ?',
+    'min_price': 'p.price >= ?',
+    'max_price': 'p.price <= ?',
+    'min_bedrooms': 'p.bedrooms >= ?',
+    'created_since': 'p.created_at > ?',
+    'updated_since': 'p.updated_at >= ?',
+    'viable': 'ca.viable = ?',
+    'min_score': 'ca.viability_score >= ?'
+}
+
+def search_terms(query: str) -> List[Tuple[List[str], bool]]:
+    """Required terms of a free-text query as (word tokens, prefix match) pairs
+    
+    Words and "quoted phrases" are all required; a trailing * matches prefixes. Only word
+    characters survive, so punctuation in user input ("3-bed", "O'Brien") is never parsed
+    as query syntax.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"?|(\S+)', query):
+        tokens = re.findall(r'\w+', phrase or word)
+        if tokens:
+            terms.append((tokens, word.endswith('*')))
+    return terms
+
+def property_params(property_data: Dict[str, Any]) -> tuple:
+    """Values for PROPERTY_COLUMNS, in order"""
+    return (
+        property_data.get('source', ''),
+        property_data.get('listing_id', ''),
+        property_data.get('address', ''),
+        property_data.get('city', ''),
+        property_data.get('state', 'WA'),
+        property_data.get('zip_code', ''),
+        property_data.get('county', ''),
+        property_data.get('price', 0),
+        property_data.get('bedrooms', 0),
+        property_data.get('bathrooms', 0),
+        property_data.get('sqft', 0),
+        property_data.get('property_type', ''),
+        property_data.get('description', ''),
+        property_data.get('wabo_status', ''),
+        property_data.get('url', ''),
+        json.dumps(property_data.get('images', [])),
+        property_data.get('date_listed', ''),
+        json.dumps(property_data.get('contact_info', {}))
+    )
+
+def raw_data_param(property_data: Dict[str, Any]) -> Optional[str]:
+    """Serialized raw_data for property_raw_data, or None when there is none"""
+    raw_data = property_data.get('raw_data')
+    return json.dumps(raw_data) if raw_data else None
+
+def _score_range_sql(column: str) -> str:
+    """SCORE_RANGES label for a viability score; unscored analyses fall in the lowest range"""
+    cases = ' '.join(f"WHEN {column} >= {bound} THEN '{label}'" for bound, label in SCORE_RANGES if bound is not None)
+    return f"CASE {cases} ELSE '{SCORE_RANGES[-1][1]}' END"
+
+class BaseDatabaseManager:
+    """Storage operations shared by every backend
+    
+    Statements are written with ? placeholders and pass through _sql, so a backend with
+    another parameter style only rewrites them there. Subclasses open the connections
+    (_connect), create the schema (_init_database) and override the statements their
+    SQL dialect spells differently.
+    """
+    
+    retention_class = None  # RetentionManager (sub)class for the backend
+    exporter_class = None  # SnapshotExporter (sub)class for the backend
+    database_error = Exception  # Driver error a failed bulk statement raises
+    property_filters = PROPERTY_FILTERS
+    analysis_blob_column = None  # Encoded analysis column read with analysis sections, if stored
+    list_chunk_size = 500  # Values bound per IN list, within bound-parameter limits
+    current_time_sql = 'CURRENT_TIMESTAMP'  # Written to updated_at when a listing is re-seen
+    full_text_search = True
+    
+    def __init__(self, db_config: Dict[str, Any]):
+        """Initialize database manager with configuration"""
+        self.db_config = db_config
+        
+        # Callbacks run after each successful store_properties (e.g. comps index refresh)
+        self._store_listeners = []
+        
+        self.connections = self._connect(db_config)
+        self.retention = self.retention_class(self.connections, db_config.get('retention'))
+        self.exporter = self.exporter_class(self.connections, db_config.get('export'))
+        
+        # Write-behind queue for log rows, cache entries and store_properties_async
+        self.writer = BackgroundWriter(self.connections, db_config.get('write_behind'))
+        self._stored_since_flush = False
+        
+        # Initialize database
+        self._init_database()
+    
+    def _connect(self, db_config: Dict[str, Any]):
+        """Connection manager for the configured database - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def _init_database(self):
+        """Create tables, triggers and indexes - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def _sql(self, statement: str) -> str:
+        """A statement written with ? placeholders in the driver's parameter style"""
+        return statement
+    
+    def _in_list(self, column: str, values: Sequence[Any]) -> Tuple[str, List[Any]]:
+        """Condition matching column against any of values, and its parameters"""
+        return f"{column} IN ({', '.join('?' * len(values))})", list(values)
+    
+    def _chunks(self, values: List[Any]) -> Iterator[List[Any]]:
+        """values in runs of at most list_chunk_size (one run when it is None)"""
+        size = self.list_chunk_size or max(len(values), 1)
+        for start in range(0, len(values), size):
+            yield values[start:start + size]
+    
+    def _ago(self, amount: int, unit: str) -> Tuple[str, List[Any]]:
+        """Expression for the time amount hours or days before now, and its parameters - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def _before(self, timestamp: Any, seconds: float) -> Tuple[str, List[Any]]:
+        """Expression for a stored timestamp less seconds, and its parameters - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def _sort_direction(self, descending: bool) -> str:
+        """ORDER BY direction for a nullable column: NULLs first ascending, last descending"""
+        return 'DESC' if descending else 'ASC'
+    
+    def close(self):
+        """Commit queued writes and close all database connections (e.g. on shutdown)"""
+        self.writer.close()
+        self.connections.close()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued writes to commit, then run store listeners if properties were stored"""
+        flushed = self.writer.flush(timeout)
+        if flushed and self._stored_since_flush:
+            self._stored_since_flush = False
+            self._notify_store_listeners()
+        return flushed
+    
+    def compact(self) -> Dict[str, Any]:
+        """Apply retention policies and release freed space; returns rows deleted and bytes reclaimed"""
+        try:
+            return self.retention.run()
+        
+        except Exception as e:
+            logger.error(f"Error compacting database: {e}")
+            return {'error': str(e)}
+    
+    def export_snapshot(self, output_dir: Optional[str] = None, export_format: Optional[str] = None) -> Dict[str, Any]:
+        """Write properties with their current analysis as partitioned Parquet/Arrow files"""
+        try:
+            return self.exporter.export(output_dir, export_format)
+        
+        except Exception as e:
+            logger.error(f"Error exporting snapshot: {e}")
+            raise
+    
+    def store_properties(self, analyzed_properties: List[Dict[str, Any]]) -> int:
+        """Store analyzed properties in database (bulk upsert in chunks)"""
+        try:
+            stored_count = 0
+            skipped_analyses = 0
+            
+            analyzed_properties = self._write_order(analyzed_properties)
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                if getattr(conn, 'in_transaction', None) is False:
+                    cursor.execute('BEGIN')  # Otherwise SQLite commits each chunk as its savepoint is released
+                chunk_size = self._write_chunk_size(conn)
+                
+                for start in range(0, len(analyzed_properties), chunk_size):
+                    chunk = analyzed_properties[start:start + chunk_size]
+                    # A failed statement may abort the transaction; the savepoint undoes just this chunk
+                    cursor.execute('SAVEPOINT store_chunk')
+                    try:
+                        stored, skipped = self._store_chunk(cursor, chunk)
+                        cursor.execute('RELEASE store_chunk')
+                    except self.database_error as e:
+                        cursor.execute('ROLLBACK TO store_chunk')
+                        cursor.execute('RELEASE store_chunk')
+                        logger.warning(f"Bulk store failed, storing chunk row by row: {e}")
+                        stored, skipped = self._store_rows(cursor, chunk)
+                    stored_count += stored
+                    skipped_analyses += skipped
+            
+            logger.info(f"Stored {stored_count} properties with analysis "
+                        f"({skipped_analyses} unchanged analyses skipped)")
+        
+        except Exception as e:
+            logger.error(f"Error storing properties: {e}")
+            raise
+        
+        self._notify_store_listeners()
+        return stored_count
+    
+    def store_properties_async(self, analyzed_properties: List[Dict[str, Any]]):
+        """Queue analyzed properties for the background writer; returns without waiting for the write
+        
+        Call flush() before reading them back; it also runs the store listeners.
+        """
+        for item in analyzed_properties:
+            self.writer.submit(self._store_queued, item)
+        self._stored_since_flush = True
+    
+    def _store_queued(self, cursor, analyzed_properties: List[Dict[str, Any]]):
+        """Background writer handler: bulk upsert a run of queued properties"""
+        analyzed_properties = self._write_order(analyzed_properties)
+        chunk_size = self._write_chunk_size(cursor.connection)
+        for start in range(0, len(analyzed_properties), chunk_size):
+            # A failure rolls the run back and the writer retries it one property at a time
+            self._store_chunk(cursor, analyzed_properties[start:start + chunk_size])
+    
+    def _notify_store_listeners(self):
+        """Run the callbacks registered with add_store_listener"""
+        for listener in self._store_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.warning(f"Store listener failed: {e}")
+    
+    def add_store_listener(self, callback):
+        """Register a callback to run after each store_properties call"""
+        self._store_listeners.append(callback)
+    
+    def _write_order(self, analyzed_properties: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Analyzed properties in the order they are written"""
+        return analyzed_properties
+    
+    def _write_chunk_size(self, conn) -> int:
+        """Rows per bulk statement"""
+        return max(1, self.db_config.get('write_chunk_size', 500))
+    
+    def _store_chunk(self, cursor, chunk: List[Dict[str, Any]]) -> tuple:
+        """Upsert a chunk of properties in one statement and insert their changed analyses"""
+        rows = []
+        individual = []
+        for property_data in chunk:
+            try:
+                params = property_params(property_data['property'])
+                raw_data = raw_data_param(property_data['property'])
+                analysis = property_data['analysis']
+                # Encoded up front so an unserializable analysis drops only its own row
+                analysis_values = self._analysis_values(analysis)
+            except Exception as e:
+                logger.warning(f"Error storing property: {e}")
+                continue
+            # NULL keys never conflict, so such rows cannot be matched back to RETURNING output
+            if None in params[:3]:
+                individual.append(property_data)
+            else:
+                rows.append((params, raw_data, analysis, analysis_values))
+        
+        property_ids = self._upsert_chunk(cursor, [(params, raw_data) for params, raw_data, _, _ in rows]) if rows else []
+        
+        latest = self._latest_analysis_hashes(cursor, property_ids)
+        new_analyses = []
+        skipped = 0
+        for property_id, (_, _, analysis, analysis_values) in zip(property_ids, rows):
+            hashes = (analysis.get('property_hash'), analysis.get('config_hash'))
+            if all(hashes) and latest.get(property_id) == (*hashes, analysis.get('viability_score')):
+                skipped += 1
+                continue
+            latest[property_id] = (*hashes, analysis.get('viability_score'))
+            new_analyses.append((property_id, *analysis_values))
+        if new_analyses:
+            self._insert_analyses(cursor, new_analyses)
+        
+        stored, individual_skipped = self._store_rows(cursor, individual)
+        return len(rows) + stored, skipped + individual_skipped
+    
+    def _upsert_chunk(self, cursor, rows: List[tuple]) -> List[int]:
+        """Upsert (property params, raw_data) rows and return their property ids in order - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def _insert_analyses(self, cursor, rows: List[tuple]):
+        """Insert analysis rows as built by _analysis_params - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def _store_rows(self, cursor, analyzed_properties: List[Dict[str, Any]]) -> tuple:
+        """Store properties one statement at a time (fallback path), each in its own savepoint"""
+        stored_count = 0
+        skipped_analyses = 0
+        for property_data in analyzed_properties:
+            cursor.execute('SAVEPOINT store_row')
+            try:
+                prop = property_data['property']
+                analysis = property_data['analysis']
+                raw_data = raw_data_param(prop)
+                
+                # Insert or update property
+                property_id = self._upsert_property(cursor, prop)
+                self._store_raw_data(cursor, [(property_id, raw_data)])
+                
+                # Insert analysis unless the latest one was computed from identical inputs
+                if self._analysis_unchanged(cursor, property_id, analysis):
+                    skipped_analyses += 1
+                else:
+                    self._insert_analyses(cursor, [self._analysis_params(property_id, analysis)])
+                
+                cursor.execute('RELEASE store_row')
+                stored_count += 1
+            
+            except Exception as e:
+                cursor.execute('ROLLBACK TO store_row')
+                cursor.execute('RELEASE store_row')
+                logger.warning(f"Error storing property: {e}")
+                continue
+        
+        return stored_count, skipped_analyses
+    
+    def _upsert_property(self, cursor, property_data: Dict[str, Any]) -> int:
+        """Insert or update property and return property ID"""
+        cursor.execute(self._sql(f'''
+            INSERT INTO properties ({', '.join(PROPERTY_COLUMNS)})
+            VALUES ({', '.join('?' * len(PROPERTY_COLUMNS))})
+            ON CONFLICT (source, listing_id, address) DO UPDATE SET
+                {', '.join(f'{column} = excluded.{column}' for column in PROPERTY_UPDATE_COLUMNS)},
+                updated_at = {self.current_time_sql}
+            RETURNING id
+        '''), property_params(property_data))
+        return cursor.fetchone()[0]
+    
+    def _store_raw_data(self, cursor, entries: List[tuple]):
+        """Write (property_id, serialized raw_data) pairs; None clears a stored payload"""
+        cursor.executemany(self._sql('''
+            INSERT INTO property_raw_data (property_id, raw_data) VALUES (?, ?)
+            ON CONFLICT (property_id) DO UPDATE SET raw_data = excluded.raw_data
+            WHERE property_raw_data.raw_data != excluded.raw_data
+        '''), [entry for entry in entries if entry[1] is not None])
+        cursor.executemany(self._sql('DELETE FROM property_raw_data WHERE property_id = ?'),
+                           [(entry[0],) for entry in entries if entry[1] is None])
+    
+    def _latest_analysis_hashes(self, cursor, property_ids: List[int]) -> Dict[int, tuple]:
+        """(property_hash, config_hash, viability_score) of the latest analysis for each property"""
+        if not property_ids:
+            return {}
+        condition, params = self._in_list('property_id', property_ids)
+        cursor.execute(self._sql(f'''
+            SELECT property_id, property_hash, config_hash, viability_score FROM current_analysis
+            WHERE {condition}
+        '''), params)
+        return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+    
+    def _analysis_unchanged(self, cursor, property_id: int, analysis: Dict[str, Any]) -> bool:
+        """Check whether the latest stored analysis has the same hashes and viability score
+        
+        The score is compared too: viability weights are not part of config_hash, so a cached
+        analysis re-scored under new weights is stored even though its hashes match.
+        """
+        hashes = (analysis.get('property_hash'), analysis.get('config_hash'))
+        return all(hashes) and self._latest_analysis_hashes(cursor, [property_id]).get(property_id) == \
+            (*hashes, analysis.get('viability_score'))
+    
+    def _analysis_params(self, property_id: int, analysis: Dict[str, Any]) -> tuple:
+        """Values of a property_analysis row, starting with property_id"""
+        return (property_id, *self._analysis_values(analysis))
+    
+    def _analysis_values(self, analysis: Dict[str, Any]) -> tuple:
+        """property_analysis values after property_id - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def _insert_rows(self, cursor, table: str, columns: Sequence[str], rows: List[tuple], conflict: str = ''):
+        """Insert rows into table, with an optional ON CONFLICT clause"""
+        cursor.executemany(self._sql(f'''
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({', '.join('?' * len(columns))})
+            {conflict}
+        '''), rows)
+    
+    def get_raw_data(self, property_id: int) -> Dict[str, Any]:
+        """Get the raw scraped payload stored for a property"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._sql('SELECT raw_data FROM property_raw_data WHERE property_id = ?'), (property_id,))
+                row = cursor.fetchone()
+                return json.loads(row[0]) if row else {}
+        
+        except Exception as e:
+            logger.error(f"Error getting raw data: {e}")
+            return {}
+    
+    def _read_projection(self, fields: Optional[Sequence[str]]) -> Tuple[str, str]:
+        """SELECT list and analysis join for a read API field projection (None for all but raw_data)"""
+        if fields is None:
+            wanted = set(READ_FIELDS) - {'raw_data'}
+        else:
+            unknown = [field for field in fields if field not in READ_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown property fields: {', '.join(unknown)}")
+            wanted = set(fields) | {'id'}
+        
+        columns = [f'p.{column}' for column in PROPERTY_READ_COLUMNS if column in wanted]
+        columns += [f'ca.{column}' for column in CURRENT_ANALYSIS_FIELDS if column in wanted]
+        if 'raw_data' in wanted:
+            columns.append('(SELECT raw_data FROM property_raw_data r WHERE r.property_id = p.id) AS raw_data')
+        
+        # The history row is only joined when analysis sections are requested
+        sections = [section for section in ANALYSIS_SECTIONS if section in wanted]
+        if not sections:
+            return ', '.join(columns), ''
+        if self.analysis_blob_column:
+            columns.append(self.analysis_blob_column)
+        columns += [f'pa.{section}' for section in sections]
+        return ', '.join(columns), 'LEFT JOIN property_analysis pa ON pa.id = ca.analysis_id'
+    
+    def get_cached_analyses(self, listing_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get cached analyses for listing keys, with the hashes they were computed from"""
+        cached = {}
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                for chunk in self._chunks(list(listing_keys)):
+                    condition, params = self._in_list('listing_key', chunk)
+                    cursor.execute(self._sql(f'''
+                        SELECT listing_key, property_hash, config_hash, analysis
+                        FROM analysis_cache
+                        WHERE {condition}
+                    '''), params)
+                    
+                    for key, property_hash, config_hash, analysis in cursor.fetchall():
+                        # Entries written before the binary codec hold JSON text
+                        cached[key] = {
+                            'property_hash': property_hash,
+                            'config_hash': config_hash,
+                            'analysis': json.loads(analysis) if isinstance(analysis, str) else decode_analysis(bytes(analysis))
+                        }
+        
+        except Exception as e:
+            logger.error(f"Error reading analysis cache: {e}")
+        
+        return cached
+    
+    def store_cached_analyses(self, entries: List[tuple]):
+        """Store (listing_key, analysis) pairs, replacing any stale entry for the listing"""
+        try:
+            # Queued: a cache entry lost in a crash only costs a re-analysis
+            for key, analysis in entries:
+                self.writer.submit(
+                    self._insert_cached_analyses,
+                    (key, analysis['property_hash'], analysis['config_hash'], encode_analysis(analysis))
+                )
+        
+        except Exception as e:
+            logger.error(f"Error storing analysis cache: {e}")
+    
+    def _insert_cached_analyses(self, cursor, rows: List[tuple]):
+        """Background writer handler for analysis cache entries"""
+        # One entry per key, since an upsert statement cannot update a row twice
+        rows = list({row[0]: row for row in rows}.values())
+        self._insert_rows(cursor, 'analysis_cache', ('listing_key', 'property_hash', 'config_hash', 'analysis'), rows, '''
+            ON CONFLICT (listing_key) DO UPDATE SET
+                property_hash = excluded.property_hash,
+                config_hash = excluded.config_hash,
+                analysis = excluded.analysis,
+                updated_at = CURRENT_TIMESTAMP
+        ''')
+    
+    def evict_stale_analysis_cache(self, config_hash: str) -> int:
+        """Remove cached analyses computed under a different analyzer configuration"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._sql('DELETE FROM analysis_cache WHERE config_hash != ?'), (config_hash,))
+                return cursor.rowcount
+        
+        except Exception as e:
+            logger.error(f"Error evicting analysis cache: {e}")
+            return 0
+    
+    def rescore_analyses(self, weights: Dict[str, float], threshold: float) -> int:
+        """Recompute viability_score and viable for every analysis from its component scores"""
+        # Same summation order as weighted_viability_score in the analyzer
+        score_sql = '''(
+            basic_score * ? + financial_score * ? + market_score * ? +
+            wabo_score * ? + (100 - risk_score) * ?
+        )'''
+        weight_params = [weights['basic'], weights['financial'], weights['market'],
+                         weights['wabo'], weights['risk']]
+        
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(self._sql(f'''
+                    UPDATE property_analysis SET
+                        viability_score = {score_sql},
+                        viable = {score_sql} >= ?
+                    WHERE basic_score IS NOT NULL
+                '''), weight_params + weight_params + [threshold])
+                
+                logger.info(f"Re-scored {cursor.rowcount} analyses")
+                return cursor.rowcount
+        
+        except Exception as e:
+            logger.error(f"Error re-scoring analyses: {e}")
+            raise
+    
+    def backfill_component_scores(self, score_function) -> int:
+        """Fill component score columns for analyses stored without them"""
+        # score_function maps decoded analysis sections to component scores by name
+        sections = ['basic_analysis', 'financial_analysis', 'market_analysis',
+                    'wabo_analysis', 'risk_analysis']
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT pa.id, {self.analysis_blob_column or 'NULL'}, {', '.join(f'pa.{section}' for section in sections)}
+                    FROM property_analysis pa
+                    WHERE pa.basic_score IS NULL
+                ''')
+                
+                updates = []
+                for row in cursor.fetchall():
+                    try:
+                        if row[1] is not None:
+                            analysis = decode_analysis(bytes(row[1]))
+                        else:
+                            analysis = {section: json.loads(value or '{}') for section, value in zip(sections, row[2:])}
+                        component_scores = score_function(analysis)
+                    except Exception as e:
+                        logger.warning(f"Cannot backfill component scores for analysis {row[0]}: {e}")
+                        continue
+                    updates.append((row[0], *[component_scores[component] for component in COMPONENT_SCORE_COLUMNS.values()]))
+                
+                self._update_component_scores(cursor, updates)
+                
+                logger.info(f"Backfilled component scores for {len(updates)} analyses")
+                return len(updates)
+        
+        except Exception as e:
+            logger.error(f"Error backfilling component scores: {e}")
+            raise
+    
+    def _update_component_scores(self, cursor, updates: List[tuple]):
+        """Write (analysis id, *component scores) rows"""
+        cursor.executemany(self._sql(f'''
+            UPDATE property_analysis SET
+                {', '.join(f'{column} = ?' for column in COMPONENT_SCORE_COLUMNS)}
+            WHERE id = ?
+        '''), [update[1:] + update[:1] for update in updates])
+    
+    def get_comparable_properties(self, updated_since: Optional[Any] = None,
+                                  overlap_seconds: float = 0) -> List[tuple]:
+        """Get (id, source, listing_id, address, county, bedrooms, bathrooms, sqft, price, updated_at) comps rows
+        
+        With updated_since, only rows updated at or after it less overlap_seconds: a write
+        stamped before the caller's last read can commit after it, so callers re-read a window.
+        """
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                if updated_since:
+                    since, since_params = self._before(updated_since, overlap_seconds)
+                    cursor.execute(self._sql(f'''
+                        SELECT id, source, listing_id, address, county, bedrooms, bathrooms, sqft, price, updated_at
+                        FROM properties
+                        WHERE updated_at >= {since}
+                    '''), since_params)
+                else:
+                    cursor.execute('''
+                        SELECT id, source, listing_id, address, county, bedrooms, bathrooms, sqft, price, updated_at
+                        FROM properties
+                    ''')
+                
+                return cursor.fetchall()
+        
+        except Exception as e:
+            logger.error(f"Error getting comparable properties: {e}")
+            return []
+    
+    def get_properties_by_ids(self, property_ids: List[int]) -> List[Dict[str, Any]]:
+        """Get basic listing fields for specific property IDs, in the order requested"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                rows = {}
+                for chunk in self._chunks(list(property_ids)):
+                    condition, params = self._in_list('id', chunk)
+                    cursor.execute(self._sql(f'''
+                        SELECT id, address, city, county, price, bedrooms, bathrooms, sqft
+                        FROM properties
+                        WHERE {condition}
+                    '''), params)
+                    columns = [description[0] for description in cursor.description]
+                    for row in cursor.fetchall():
+                        rows[row[0]] = dict(zip(columns, row))
+                
+                return [rows[property_id] for property_id in property_ids if property_id in rows]
+        
+        except Exception as e:
+            logger.error(f"Error getting properties by id: {e}")
+            return []
+    
+    def get_new_properties(self, hours: int = 24, fields: Optional[Sequence[str]] = None) -> List[PropertyRow]:
+        """Get properties that are new within the specified hours (fields= limits the columns read)"""
+        select_list, analysis_join = self._read_projection(fields)
+        try:
+            cutoff, cutoff_params = self._ago(hours, 'hours')
+            
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(self._sql(f'''
+                    SELECT {select_list}
+                    FROM properties p
+                    JOIN current_analysis ca ON ca.property_id = p.id
+                    {analysis_join}
+                    WHERE p.created_at > {cutoff} AND ca.viable = TRUE
+                    ORDER BY ca.viability_score {self._sort_direction(True)}
+                '''), cutoff_params)
+                
+                rows = cursor.fetchall()
+                columns = [description[0] for description in cursor.description]
+                
+                # JSON fields and analysis sections are decoded on first access
+                properties = [PropertyRow(columns, row) for row in rows]
+                
+                logger.info(f"Found {len(properties)} new viable properties")
+                return properties
+        
+        except Exception as e:
+            logger.error(f"Error getting new properties: {e}")
+            return []
+    
+    def get_property_summary(self) -> Dict[str, Any]:
+        """Get summary of all properties in database"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Properties by county and by WABO status; NULL and empty values share the '' key
+                county_distribution = self._distribution(cursor, 'county')
+                wabo_distribution = self._distribution(cursor, 'wabo_status')
+                
+                # Viable count and average viability score of current analyses
+                viable, avg_score = self._viability_summary(cursor)
+                
+                # New properties (last 24 hours; range scan of idx_properties_created_at)
+                cutoff, cutoff_params = self._ago(24, 'hours')
+                cursor.execute(self._sql(f'SELECT COUNT(*) FROM properties WHERE created_at > {cutoff}'), cutoff_params)
+                new = cursor.fetchone()[0]
+                
+                return {
+                    'total': sum(county_distribution.values()),
+                    'viable': viable,
+                    'new': new,
+                    'county_distribution': county_distribution,
+                    'wabo_distribution': wabo_distribution,
+                    'average_viability_score': round(avg_score or 0, 1),
+                    'last_updated': datetime.now().isoformat()
+                }
+        
+        except Exception as e:
+            logger.error(f"Error getting property summary: {e}")
+            return {
+                'total': 0,
+                'viable': 0,
+                'new': 0,
+                'error': str(e)
+            }
+    
+    def _distribution(self, cursor, column: str) -> Dict[str, int]:
+        """Property count per value of a listing column, largest first"""
+        cursor.execute(f'''
+            SELECT COALESCE({column}, ''), COUNT(*) FROM properties
+            GROUP BY 1 ORDER BY 2 DESC
+        ''')
+        return dict(cursor.fetchall())
+    
+    def _viability_summary(self, cursor) -> Tuple[int, Optional[float]]:
+        """Viable count and average viability score of current analyses"""
+        cursor.execute('SELECT COUNT(CASE WHEN viable = TRUE THEN 1 END), AVG(viability_score) FROM current_analysis')
+        return cursor.fetchone()
+    
+    def get_top_properties(self, limit: int = 10, min_score: float = 70.0,
+                           fields: Optional[Sequence[str]] = None) -> List[PropertyRow]:
+        """Get top properties by viability score (fields= limits the columns read)"""
+        select_list, analysis_join = self._read_projection(fields)
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(self._sql(f'''
+                    SELECT {select_list}
+                    FROM current_analysis ca
+                    JOIN properties p ON p.id = ca.property_id
+                    {analysis_join}
+                    WHERE ca.viability_score >= ?
+                    ORDER BY ca.viability_score DESC
+                    LIMIT ?
+                '''), (min_score, limit))
+                
+                rows = cursor.fetchall()
+                columns = [description[0] for description in cursor.description]
+                
+                # JSON fields and analysis sections are decoded on first access
+                return [PropertyRow(columns, row) for row in rows]
+        
+        except Exception as e:
+            logger.error(f"Error getting top properties: {e}")
+            return []
+    
+    def search_properties(self, query: str, limit: int = 20, filters: Optional[Dict[str, Any]] = None,
+                          fields: Optional[Sequence[str]] = None) -> List[PropertyRow]:
+        """Properties whose description, address or city match a keyword query, best match first
+        
+        Rows carry search_rank (higher is better) and a description snippet with matches in
+        [brackets]. filters takes the same names as iter_properties.
+        """
+        if not self.full_text_search:
+            raise RuntimeError("Full-text search is unavailable (SQLite needs FTS5)")
+        match = self._search_match(query)
+        if not match:
+            return []
+        
+        select_list, analysis_join = self._read_projection(fields)
+        conditions, params = self._filter_conditions(filters or {})
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(self._sql(self._search_sql(select_list, analysis_join, conditions)),
+                               [match] + params + [limit])
+                
+                rows = cursor.fetchall()
+                columns = [description[0] for description in cursor.description]
+                return [PropertyRow(columns, row) for row in rows]
+        
+        except Exception as e:
+            logger.error(f"Error searching properties: {e}")
+            raise
+    
+    def _search_match(self, query: str) -> str:
+        """Full-text query parameter for a free-text query ('' when it has no terms) - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def _search_sql(self, select_list: str, analysis_join: str, conditions: List[str]) -> str:
+        """Search statement taking the match, filter parameters and limit - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def get_property_events(self, property_id: int, field: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get recorded changes for a property, oldest first"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(self._sql(f'''
+                    SELECT ts, field, old_value, new_value FROM property_events
+                    WHERE property_id = ? {'AND field = ?' if field else ''}
+                    ORDER BY ts, id
+                '''), (property_id, field) if field else (property_id,))
+                
+                return [
+                    {'ts': ts, 'field': name, 'old_value': self._event_value(old_value),
+                     'new_value': self._event_value(new_value)}
+                    for ts, name, old_value, new_value in cursor.fetchall()
+                ]
+        
+        except Exception as e:
+            logger.error(f"Error getting property events: {e}")
+            return []
+    
+    def _event_value(self, value: Any) -> Any:
+        """A property_events value as it was stored in the listing"""
+        return value
+    
+    def get_price_drops(self, min_drop_percentage: float = 5.0, days: int = 30, limit: int = 100,
+                        fields: Optional[Sequence[str]] = None) -> List[PropertyRow]:
+        """Get properties whose price fell at least min_drop_percentage over the last days, largest drop first
+        
+        The drop compares the current price with the price before the first change in the
+        window; rows carry previous_price, price_drop_percentage and first_change_at.
+        """
+        select_list, analysis_join = self._read_projection(fields)
+        try:
+            since, since_params = self._ago(days, 'days')
+            
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(self._sql(f'''
+                    WITH first_change AS ({self._first_price_change_sql(since)})
+                    SELECT {select_list}, fc.previous_price, fc.first_change_at,
+                           (fc.previous_price - p.price) * 100.0 / fc.previous_price AS price_drop_percentage
+                    FROM first_change fc
+                    JOIN properties p ON p.id = fc.property_id
+                    LEFT JOIN current_analysis ca ON ca.property_id = p.id
+                    {analysis_join}
+                    WHERE fc.previous_price > 0
+                      AND (fc.previous_price - p.price) * 100.0 / fc.previous_price >= ?
+                    ORDER BY price_drop_percentage DESC
+                    LIMIT ?
+                '''), since_params + [min_drop_percentage, limit])
+                
+                columns = [description[0] for description in cursor.description]
+                return [PropertyRow(columns, row) for row in cursor.fetchall()]
+        
+        except Exception as e:
+            logger.error(f"Error getting price drops: {e}")
+            return []
+    
+    def _first_price_change_sql(self, since: str) -> str:
+        """(property_id, previous_price, first_change_at) of each property's first price change at or after since - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def iter_properties(self, filters: Optional[Dict[str, Any]] = None, order_by: str = 'id',
+                        page_size: int = 500, fields: Optional[Sequence[str]] = None) -> Iterator[PropertyRow]:
+        """Stream all matching properties page by page, holding one page in memory at a time"""
+        after = None
+        while True:
+            rows, after = self.get_properties_page(filters, order_by, page_size, after, fields)
+            yield from rows
+            if after is None:
+                return
+    
+    def get_properties_page(self, filters: Optional[Dict[str, Any]] = None, order_by: str = 'id',
+                            page_size: int = 500, after: Optional[tuple] = None,
+                            fields: Optional[Sequence[str]] = None) -> Tuple[List[PropertyRow], Optional[tuple]]:
+        """One keyset page of properties and the key to pass as after= for the next page (None at the end)
+        
+        Pages seek past the last (sort value, id) seen instead of using OFFSET, so every page
+        is an index range scan regardless of how deep into the table it is. NULLs sort first
+        ascending and last descending on every backend, so they all page identically.
+        """
+        descending = order_by.startswith('-')
+        sort_field = order_by.lstrip('-')
+        if sort_field not in SORT_COLUMNS:
+            raise ValueError(f"Cannot order properties by {sort_field}")
+        if page_size < 1:
+            raise ValueError("page_size must be positive")
+        
+        select_list, analysis_join = self._read_projection(fields)
+        conditions, params = self._filter_conditions(filters or {})
+        
+        if sort_field == 'viability_score':
+            # Driven by idx_current_score; unanalyzed properties have no score
+            source = 'current_analysis ca JOIN properties p ON p.id = ca.property_id'
+            id_column = 'ca.property_id'
+        else:
+            source = 'properties p LEFT JOIN current_analysis ca ON ca.property_id = p.id'
+            id_column = 'p.id'
+        sort_column = SORT_COLUMNS[sort_field]
+        direction = 'DESC' if descending else 'ASC'
+        
+        ranges = [(None, [])] if after is None else \
+            self._seek_ranges(sort_field, sort_column, id_column, descending, after)
+        order = f'{id_column} {direction}' if sort_field == 'id' else \
+            f'{sort_column} {self._sort_direction(descending)}, {id_column} {direction}'
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                rows = []
+                for seek, seek_params in ranges:
+                    where = conditions + [seek] if seek else conditions
+                    cursor.execute(self._sql(f'''
+                        SELECT {select_list}, {sort_column}
+                        FROM {source}
+                        {analysis_join}
+                        {'WHERE ' + ' AND '.join(where) if where else ''}
+                        ORDER BY {order}
+                        LIMIT ?
+                    '''), params + seek_params + [page_size - len(rows)])
+                    rows.extend(cursor.fetchall())
+                    if len(rows) == page_size:
+                        break
+                
+                # The trailing sort value only feeds the next page key; id is always the first column
+                columns = [description[0] for description in cursor.description][:-1]
+                next_after = (rows[-1][-1], rows[-1][0]) if len(rows) == page_size else None
+                return [PropertyRow(columns, row[:-1]) for row in rows], next_after
+        
+        except Exception as e:
+            logger.error(f"Error paging properties: {e}")
+            raise
+    
+    def _filter_conditions(self, filters: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+        """WHERE conditions and parameters for iter_properties filters"""
+        unknown = [name for name in filters if name not in self.property_filters]
+        if unknown:
+            raise ValueError(f"Unknown property filters: {', '.join(unknown)}")
+        names = [name for name, value in filters.items() if value is not None]
+        return [self.property_filters[name] for name in names], [filters[name] for name in names]
+    
+    def _seek_ranges(self, sort_field: str, sort_column: str, id_column: str, descending: bool,
+                     after: tuple) -> List[Tuple[str, List[Any]]]:
+        """Index ranges, in page order, covering the rows past the (sort value, id) key"""
+        value, last_id = after
+        if sort_field == 'id':
+            return [(f'{id_column} {"<" if descending else ">"} ?', [last_id])]
+        
+        # NULLs sort first ascending and last descending. A row-value comparison with NULL is
+        # never true, and OR-ing the NULL run in would turn the seek into a scan, so the NULL
+        # run is its own range
+        if descending:
+            if value is None:
+                return [(f'{sort_column} IS NULL AND {id_column} < ?', [last_id])]
+            return [(f'({sort_column}, {id_column}) < (?, ?)', [value, last_id]), (f'{sort_column} IS NULL', [])]
+        if value is None:
+            return [(f'{sort_column} IS NULL AND {id_column} > ?', [last_id]), (f'{sort_column} IS NOT NULL', [])]
+        return [(f'({sort_column}, {id_column}) > (?, ?)', [value, last_id])]
+    
+    def record_search_history(self, search_data: Dict[str, Any]):
+        """Record search history (queued for the background writer)"""
+        try:
+            self.writer.submit(self._insert_search_history, (
+                search_data.get('total_properties', 0),
+                search_data.get('viable_properties', 0),
+                search_data.get('new_properties', 0),
+                json.dumps(search_data.get('sources_searched', [])),
+                search_data.get('duration_seconds', 0),
+                search_data.get('status', 'completed')
+            ))
+            logger.info("Search history recorded")
+        
+        except Exception as e:
+            logger.error(f"Error recording search history: {e}")
+    
+    def _insert_search_history(self, cursor, rows: List[tuple]):
+        """Background writer handler for search history rows"""
+        self._insert_rows(cursor, 'search_history', (
+            'total_properties_found', 'viable_properties_found', 'new_properties_found',
+            'sources_searched', 'search_duration_seconds', 'status'
+        ), rows)
+    
+    def record_notification(self, property_id: int, notification_type: str,
+                            status: str = 'sent', error_message: str = None):
+        """Record notification sent (queued for the background writer)"""
+        try:
+            self.writer.submit(self._insert_notifications, (property_id, notification_type, status, error_message))
+        
+        except Exception as e:
+            logger.error(f"Error recording notification: {e}")
+    
+    def _insert_notifications(self, cursor, rows: List[tuple]):
+        """Background writer handler for notification rows"""
+        self._insert_rows(cursor, 'notifications', ('property_id', 'notification_type', 'status', 'error_message'), rows)
+    
+    def get_database_stats(self) -> Dict[str, Any]:
+        """Get comprehensive database statistics"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Table counts
+                stats = self._table_counts(cursor)
+                
+                # Recent activity
+                cutoff, cutoff_params = self._ago(7, 'days')
+                cursor.execute(self._sql(f'SELECT COUNT(*) FROM properties WHERE created_at > {cutoff}'), cutoff_params)
+                stats['properties_last_7_days'] = cursor.fetchone()[0]
+                
+                # Viability distribution, best range first
+                ranges = self._score_ranges(cursor)
+                stats['viability_distribution'] = {
+                    label: ranges[label] for _, label in SCORE_RANGES if label in ranges
+                }
+                
+                # Database size, plus backend-specific space figures
+                db_size = self._database_size(cursor)
+                stats['database_size_bytes'] = db_size
+                stats['database_size_mb'] = round(db_size / (1024 * 1024), 2)
+                stats.update(self._space_stats(cursor))
+                
+                # What compaction has released so far
+                cursor.execute("SELECT key, total FROM counters WHERE scope = 'compaction'")
+                compaction = dict(cursor.fetchall())
+                stats['rows_compacted'] = int(compaction.get('rows_deleted', 0))
+                stats['bytes_reclaimed'] = int(compaction.get('bytes_reclaimed', 0))
+                stats['pending_writes'] = self.writer.pending()
+                
+                return stats
+        
+        except Exception as e:
+            logger.error(f"Error getting database stats: {e}")
+            return {'error': str(e)}
+    
+    def _table_counts(self, cursor) -> Dict[str, int]:
+        """Row count of each table, keyed '<table>_count'"""
+        counts = {}
+        for table in ('properties', 'property_analysis', 'current_analysis', 'notifications', 'search_history'):
+            cursor.execute(f'SELECT COUNT(*) FROM {table}')
+            counts[f'{table}_count'] = cursor.fetchone()[0]
+        return counts
+    
+    def _score_ranges(self, cursor) -> Dict[str, int]:
+        """Current analyses per SCORE_RANGES label"""
+        cursor.execute(f'SELECT {_score_range_sql("viability_score")}, COUNT(*) FROM current_analysis GROUP BY 1')
+        return dict(cursor.fetchall())
+    
+    def _database_size(self, cursor) -> int:
+        """Bytes the database occupies - to be implemented by subclasses"""
+        raise NotImplementedError
+    
+    def _space_stats(self, cursor) -> Dict[str, Any]:
+        """Backend-specific reclaimable space figures for database stats"""
+        return {}
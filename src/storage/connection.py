@@ -0,0 +1,108 @@
+"""
+Connection Manager - Reusable per-thread SQLite connections
+Each thread keeps one connection configured with WAL journaling and tuned pragmas
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Any, Optional
+from loguru import logger
+
+# Applied to every new connection; WAL lets readers (dashboard) run while a writer (scrape) commits
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # Durable at checkpoints under WAL, no fsync per commit
+    'cache_size': -20000,     # Negative values are KiB (~20 MB page cache)
+    'mmap_size': 268435456,   # 256 MB memory-mapped reads
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000      # Milliseconds to wait on a locked database
+}
+
+# Pragmas accepted from configuration, with the values each may take (None for integers)
+PRAGMA_VALUES = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'cache_size': None,
+    'mmap_size': None,
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+    'busy_timeout': None,
+    'wal_autocheckpoint': None
+}
+
+class ConnectionManager:
+    """Hands out one persistent connection per thread for a database file"""
+    
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, Any]] = None):
+        """Initialize with the database path and pragma overrides from configuration"""
+        self.db_path = db_path
+        self.pragmas = self._validate_pragmas({**DEFAULT_PRAGMAS, **(pragmas or {})})
+        
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # Thread -> connection, so they can be closed together
+        self._pid = os.getpid()
+    
+    @staticmethod
+    def _validate_pragmas(pragmas: Dict[str, Any]) -> Dict[str, Any]:
+        """Check pragma names and values (they are formatted into SQL, not bound)"""
+        validated = {}
+        for name, value in pragmas.items():
+            if name not in PRAGMA_VALUES:
+                raise ValueError(f"Unsupported database pragma: {name}")
+            allowed = PRAGMA_VALUES[name]
+            if allowed is None:
+                if isinstance(value, bool) or not isinstance(value, int):
+                    raise ValueError(f"Pragma {name} must be an integer, got {value!r}")
+            else:
+                value = str(value).upper()
+                if value not in allowed:
+                    raise ValueError(f"Pragma {name} must be one of {', '.join(allowed)}, got {value!r}")
+            validated[name] = value
+        return validated
+    
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use
+        
+        Use it as a context manager (`with manager.connection() as conn:`) to commit on success
+        and roll back on error; the connection stays open for the next call.
+        """
+        if os.getpid() != self._pid:
+            # Connections must not cross a fork; the child starts with its own
+            self._local = threading.local()
+            self._connections = {}
+            self._pid = os.getpid()
+        
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+    
+    def _open(self) -> sqlite3.Connection:
+        """Open and configure a connection for the current thread"""
+        # Only the owning thread uses a connection; other threads may close it once that thread exits
+        conn = sqlite3.connect(self.db_path, timeout=self.pragmas.get('busy_timeout', 5000) / 1000,
+                               check_same_thread=False)
+        for name, value in self.pragmas.items():
+            result = conn.execute(f'PRAGMA {name} = {value}').fetchone()
+            if name == 'journal_mode' and result and str(result[0]).upper() != value:
+                # e.g. in-memory databases cannot use WAL
+                logger.debug(f"Database journal mode is {result[0]} (requested {value})")
+        
+        with self._lock:
+            # Threads that have exited leave their connection behind; close those here. Keyed by
+            # Thread object rather than ident, since idents are reused once a thread exits
+            for thread in [thread for thread in self._connections if not thread.is_alive()]:
+                self._connections.pop(thread).close()
+            self._connections[threading.current_thread()] = conn
+        
+        return conn
+    
+    def close(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            connections, self._connections = list(self._connections.values()), {}
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -3,34 +3,86 @@ Database Manager - Handles data storage and retrieval for AFH properties
 """
 
 import sqlite3
-import json
-import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
 from loguru import logger
-import pandas as pd
 from pathlib import Path
+from storage.analysis_codec import encode_analysis
+from storage.base import (  # Shared names stay importable from here
+    COMPONENT_SCORE_COLUMNS, CURRENT_ANALYSIS_FIELDS, PROPERTY_COLUMNS, PROPERTY_FILTERS,
+    PROPERTY_READ_COLUMNS, PROPERTY_UPDATE_COLUMNS, READ_FIELDS, SCORE_RANGES, SEARCH_COLUMNS,
+    SORT_COLUMNS, TRACKED_PROPERTY_FIELDS, BaseDatabaseManager, property_params, raw_data_param,
+    search_terms
+)
+from storage.connection import ConnectionManager
+from storage.export import SnapshotExporter
+from storage.retention import RetentionManager
 
-class DatabaseManager:
+# Tables whose row counts are kept in the counters table (properties and current_analysis
+# totals are the sums of their distribution counters)
+COUNTED_TABLES = ('property_analysis', 'notifications', 'search_history')
+
+def _viability_key_sql(row: str) -> str:
+    """Counter key for a current_analysis row: score range label ('' when unscored) and viable flag"""
+    cases = ' '.join(f"WHEN {row}viability_score >= {bound} THEN '{label}'"
+                     for bound, label in SCORE_RANGES if bound is not None)
+    return (f"CASE WHEN {row}viability_score IS NULL THEN '' {cases} ELSE '{SCORE_RANGES[-1][1]}' END "
+            f"|| '|' || IFNULL({row}viable = 1, 0)")
+
+def _counter_sql(scope: str, key: str, count: str, total: str = '0') -> str:
+    """Statement adding count (and total) to one counters row, creating it if needed"""
+    return f'''
+        INSERT INTO counters (scope, key, count, total) VALUES ('{scope}', {key}, {count}, {total})
+        ON CONFLICT(scope, key) DO UPDATE SET
+            count = count + excluded.count,
+            total = total + excluded.total;
+    '''
+
+def _match_expression(query: str) -> str:
+    """FTS5 MATCH expression for a free-text query (see search_terms)"""
+    return ' '.join('"' + ' '.join(tokens) + '"' + ('*' if prefix else '') for tokens, prefix in search_terms(query))
+
+INSERT_ANALYSIS_SQL = f'''
+    INSERT INTO property_analysis (
+        property_id, viable, viability_score, analysis_blob, analysis_date,
+        {', '.join(COMPONENT_SCORE_COLUMNS)},
+        property_hash, config_hash
+    ) VALUES ({', '.join('?' * (7 + len(COMPONENT_SCORE_COLUMNS)))})
+'''
+
+class DatabaseManager(BaseDatabaseManager):
     """Manages database operations for AFH property data"""
     
-    def __init__(self, db_config: Dict[str, Any]):
-        """Initialize database manager with configuration"""
-        self.db_config = db_config
+    retention_class = RetentionManager
+    exporter_class = SnapshotExporter
+    database_error = sqlite3.Error
+    analysis_blob_column = 'pa.analysis_blob'
+    
+    def _connect(self, db_config: Dict[str, Any]) -> ConnectionManager:
+        """Per-thread connections to the configured database file"""
         self.db_path = db_config.get('path', 'data/afh_properties.db')
         
         # Create database directory if it doesn't exist
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        # Initialize database
-        self._init_database()
+        # Persistent per-thread connections (WAL, so dashboard reads proceed during a scrape's writes)
+        return ConnectionManager(self.db_path, db_config.get('pragmas'))
     
     def _init_database(self):
         """Initialize database tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.connection() as conn:
                 cursor = conn.cursor()
                 
+                # Incremental auto-vacuum lets compaction hand freed pages back to the filesystem;
+                # it applies to new files at once, existing ones pick it up at the VACUUM below
+                cursor.execute('PRAGMA auto_vacuum')
+                needs_vacuum = cursor.fetchone()[0] != 2
+                if needs_vacuum:
+                    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                    cursor.execute('PRAGMA page_count')
+                    needs_vacuum = cursor.fetchone()[0] > 0
+                
                 # Properties table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS properties (
@@ -53,13 +105,22 @@ class DatabaseManager:
                         images TEXT,  -- JSON array
                         date_listed TEXT,
                         contact_info TEXT,  -- JSON object
-                        raw_data TEXT,  -- JSON object
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         UNIQUE(source, listing_id, address)
                     )
                 ''')
                 
+                # Raw scraped payloads, read only on demand
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS property_raw_data (
+                        property_id INTEGER PRIMARY KEY,
+                        raw_data TEXT NOT NULL,  -- JSON object
+                        FOREIGN KEY (property_id) REFERENCES properties (id)
+                    )
+                ''')
+                raw_data_migrated = self._migrate_raw_data(cursor)
+                
                 # Property analysis table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS property_analysis (
@@ -67,18 +128,57 @@ class DatabaseManager:
                         property_id INTEGER,
                         viable BOOLEAN,
                         viability_score REAL,
-                        basic_analysis TEXT,  -- JSON object
-                        financial_analysis TEXT,  -- JSON object
-                        market_analysis TEXT,  -- JSON object
-                        wabo_analysis TEXT,  -- JSON object
-                        risk_analysis TEXT,  -- JSON object
-                        pricing_analysis TEXT,  -- JSON object
-                        recommendations TEXT,  -- JSON array
+                        basic_analysis TEXT,  -- Legacy JSON sections (superseded by analysis_blob)
+                        financial_analysis TEXT,
+                        market_analysis TEXT,
+                        wabo_analysis TEXT,
+                        risk_analysis TEXT,
+                        pricing_analysis TEXT,
+                        recommendations TEXT,
                         analysis_date TIMESTAMP,
+                        analysis_blob BLOB,  -- Full analysis in the compact binary format
+                        basic_score REAL,  -- Component scores used for re-scoring
+                        financial_score REAL,
+                        market_score REAL,
+                        wabo_score REAL,
+                        risk_score REAL,  -- Total risk score (not inverted)
+                        property_hash TEXT,  -- Hash of analysis-relevant property fields
+                        config_hash TEXT,  -- Hash of the analyzer configuration
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         FOREIGN KEY (property_id) REFERENCES properties (id)
                     )
                 ''')
+                self._ensure_column(cursor, 'property_analysis', 'analysis_blob', 'BLOB')
+                self._ensure_column(cursor, 'property_analysis', 'property_hash', 'TEXT')
+                self._ensure_column(cursor, 'property_analysis', 'config_hash', 'TEXT')
+                for component in COMPONENT_SCORE_COLUMNS:
+                    self._ensure_column(cursor, 'property_analysis', component, 'REAL')
+                
+                # Current analysis per property (property_analysis keeps the full history)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS current_analysis (
+                        property_id INTEGER PRIMARY KEY,
+                        analysis_id INTEGER NOT NULL,  -- Latest property_analysis row
+                        viable BOOLEAN,
+                        viability_score REAL,
+                        property_hash TEXT,
+                        config_hash TEXT,
+                        FOREIGN KEY (property_id) REFERENCES properties (id),
+                        FOREIGN KEY (analysis_id) REFERENCES property_analysis (id)
+                    )
+                ''')
+                self._init_current_analysis(cursor)
+                
+                # Analysis cache table (latest analysis per listing, keyed by content and config hash)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS analysis_cache (
+                        listing_key TEXT PRIMARY KEY,  -- source|listing_id|address
+                        property_hash TEXT NOT NULL,
+                        config_hash TEXT NOT NULL,
+                        analysis BLOB,  -- Encoded analysis (see storage.analysis_codec)
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
                 
                 # Notifications table
                 cursor.execute('''
@@ -107,388 +207,397 @@ class DatabaseManager:
                     )
                 ''')
                 
+                # Aggregates for summaries and stats, maintained by triggers
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS counters (
+                        scope TEXT NOT NULL,  -- 'rows', 'county', 'wabo_status', 'viability' or 'compaction'
+                        key TEXT NOT NULL,  -- Table, column value, or 'score range|viable' (see _viability_key_sql)
+                        count INTEGER NOT NULL DEFAULT 0,
+                        total REAL NOT NULL DEFAULT 0,  -- Sum of viability scores for scope 'viability'
+                        PRIMARY KEY (scope, key)
+                    ) WITHOUT ROWID
+                ''')
+                self._init_counters(cursor)
+                
+                # Listing changes: one row per changed field per update, so storage follows changes, not runs
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS property_events (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        property_id INTEGER NOT NULL,
+                        ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        field TEXT NOT NULL,
+                        old_value,  -- Untyped so prices stay numeric and text stays text
+                        new_value,
+                        FOREIGN KEY (property_id) REFERENCES properties (id)
+                    )
+                ''')
+                for field in TRACKED_PROPERTY_FIELDS:
+                    cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS trg_property_events_{field}
+                        AFTER UPDATE OF {field} ON properties
+                        WHEN OLD.{field} IS NOT NEW.{field}
+                        BEGIN
+                            INSERT INTO property_events (property_id, field, old_value, new_value)
+                            VALUES (NEW.id, '{field}', OLD.{field}, NEW.{field});
+                        END
+                    ''')
+                
+                # Keyword search over listing text
+                self.full_text_search = self._init_search_index(cursor)
+                
                 # Create indexes for better performance
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_address ON properties(address)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_county ON properties(county)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_price ON properties(price)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_created_at ON properties(created_at)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_viable ON property_analysis(viable)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_score ON property_analysis(viability_score)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_updated_at ON properties(updated_at)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_property ON property_analysis(property_id, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_current_score ON current_analysis(viability_score)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_current_viable_score ON current_analysis(viable, viability_score)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_property ON property_events(property_id, ts)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_field ON property_events(field, ts)')
+                # Score lookups moved to current_analysis; history only needs the property index
+                cursor.execute('DROP INDEX IF EXISTS idx_analysis_viable')
+                cursor.execute('DROP INDEX IF EXISTS idx_analysis_score')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_config ON analysis_cache(config_hash)')
                 
                 conn.commit()
+                if raw_data_migrated or needs_vacuum:
+                    # Dropping raw_data leaves pages half empty and auto_vacuum only changes on a
+                    # rebuild; one VACUUM covers both
+                    conn.execute('VACUUM')
                 logger.info("Database initialized successfully")
                 
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
             raise
     
-    def store_properties(self, analyzed_properties: List[Dict[str, Any]]) -> int:
-        """Store analyzed properties in database"""
-        try:
-            stored_count = 0
-            
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                for property_data in analyzed_properties:
-                    try:
-                        prop = property_data['property']
-                        analysis = property_data['analysis']
-                        
-                        # Insert or update property
-                        property_id = self._upsert_property(cursor, prop)
-                        
-                        # Insert analysis
-                        self._insert_analysis(cursor, property_id, analysis)
-                        
-                        stored_count += 1
-                        
-                    except Exception as e:
-                        logger.warning(f"Error storing property: {e}")
-                        continue
-                
-                conn.commit()
-                logger.info(f"Stored {stored_count} properties with analysis")
-                
-        except Exception as e:
-            logger.error(f"Error storing properties: {e}")
-            raise
+    def _init_search_index(self, cursor) -> bool:
+        """Create the full-text index over listing text and the triggers that keep it in sync
         
-        return stored_count
+        The index is external-content: it stores only tokens and reads the text back from
+        properties. Returns False when SQLite was built without FTS5.
+        """
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'properties_fts')")
+        created = not cursor.fetchone()[0]
+        if created:
+            try:
+                cursor.execute(f'''
+                    CREATE VIRTUAL TABLE properties_fts USING fts5(
+                        {', '.join(SEARCH_COLUMNS)},
+                        content='properties', content_rowid='id',
+                        tokenize='porter unicode61 remove_diacritics 2'
+                    )
+                ''')
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Full-text search disabled: {e}")
+                return False
+            # Stored with the index, so ORDER BY rank applies the column weights
+            weights = ', '.join(str(weight) for weight in SEARCH_COLUMNS.values())
+            cursor.execute(f"INSERT INTO properties_fts (properties_fts, rank) VALUES ('rank', 'bm25({weights})')")
+        
+        columns = ', '.join(SEARCH_COLUMNS)
+        old_values = ', '.join(f'OLD.{column}' for column in SEARCH_COLUMNS)
+        new_values = ', '.join(f'NEW.{column}' for column in SEARCH_COLUMNS)
+        add_new = f'INSERT INTO properties_fts (rowid, {columns}) VALUES (NEW.id, {new_values});'
+        remove_old = (f"INSERT INTO properties_fts (properties_fts, rowid, {columns}) "
+                      f"VALUES ('delete', OLD.id, {old_values});")
+        # Re-seen listings rewrite description with the same text; only real changes reindex
+        changed = ' OR '.join(f'OLD.{column} IS NOT NEW.{column}' for column in SEARCH_COLUMNS)
+        triggers = {
+            'trg_properties_fts_insert': ('AFTER INSERT ON properties', add_new),
+            'trg_properties_fts_delete': ('AFTER DELETE ON properties', remove_old),
+            'trg_properties_fts_update': (f'AFTER UPDATE OF {columns} ON properties WHEN {changed}', remove_old + add_new)
+        }
+        for name, (event, body) in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END')
+        
+        if created:
+            # Index listings stored before full-text search existed
+            cursor.execute("INSERT INTO properties_fts (properties_fts) VALUES ('rebuild')")
+        return True
     
-    def _upsert_property(self, cursor, property_data: Dict[str, Any]) -> int:
-        """Insert or update property and return property ID"""
-        # Check if property already exists
-        cursor.execute('''
-            SELECT id FROM properties 
-            WHERE source = ? AND listing_id = ? AND address = ?
-        ''', (
-            property_data.get('source', ''),
-            property_data.get('listing_id', ''),
-            property_data.get('address', '')
-        ))
+    def _migrate_raw_data(self, cursor) -> bool:
+        """Move raw_data out of properties in databases created before property_raw_data"""
+        cursor.execute('PRAGMA table_info(properties)')
+        if 'raw_data' not in [row[1] for row in cursor.fetchall()]:
+            return False
         
-        existing = cursor.fetchone()
+        cursor.execute('''
+            INSERT OR IGNORE INTO property_raw_data (property_id, raw_data)
+            SELECT id, raw_data FROM properties
+            WHERE raw_data IS NOT NULL AND raw_data NOT IN ('', '{}')
+        ''')
+        moved = cursor.rowcount
+        try:
+            cursor.execute('ALTER TABLE properties DROP COLUMN raw_data')
+        except sqlite3.OperationalError:
+            # SQLite before 3.35 cannot drop columns; leave it empty instead
+            cursor.execute('UPDATE properties SET raw_data = NULL')
+        logger.info(f"Moved raw_data for {moved} properties to property_raw_data")
+        return True
+    
+    def _init_current_analysis(self, cursor):
+        """Keep current_analysis in step with property_analysis and fill it for existing history"""
+        # Every write path (bulk, per-row, re-scoring) goes through property_analysis
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_current_analysis_insert
+            AFTER INSERT ON property_analysis
+            BEGIN
+                INSERT INTO current_analysis (
+                    property_id, analysis_id, viable, viability_score, property_hash, config_hash
+                ) VALUES (
+                    NEW.property_id, NEW.id, NEW.viable, NEW.viability_score, NEW.property_hash, NEW.config_hash
+                )
+                ON CONFLICT(property_id) DO UPDATE SET
+                    analysis_id = excluded.analysis_id,
+                    viable = excluded.viable,
+                    viability_score = excluded.viability_score,
+                    property_hash = excluded.property_hash,
+                    config_hash = excluded.config_hash
+                WHERE excluded.analysis_id > current_analysis.analysis_id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_current_analysis_rescore
+            AFTER UPDATE OF viable, viability_score ON property_analysis
+            BEGIN
+                UPDATE current_analysis SET
+                    viable = NEW.viable,
+                    viability_score = NEW.viability_score
+                WHERE property_id = NEW.property_id AND analysis_id = NEW.id;
+            END
+        ''')
         
-        if existing:
-            # Update existing property
-            property_id = existing[0]
-            cursor.execute('''
-                UPDATE properties SET
-                    price = ?, bedrooms = ?, bathrooms = ?, sqft = ?,
-                    property_type = ?, description = ?, wabo_status = ?,
-                    url = ?, images = ?, date_listed = ?, contact_info = ?,
-                    raw_data = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (
-                property_data.get('price', 0),
-                property_data.get('bedrooms', 0),
-                property_data.get('bathrooms', 0),
-                property_data.get('sqft', 0),
-                property_data.get('property_type', ''),
-                property_data.get('description', ''),
-                property_data.get('wabo_status', ''),
-                property_data.get('url', ''),
-                json.dumps(property_data.get('images', [])),
-                property_data.get('date_listed', ''),
-                json.dumps(property_data.get('contact_info', {})),
-                json.dumps(property_data.get('raw_data', {})),
-                property_id
-            ))
-        else:
-            # Insert new property
+        # Databases created before current_analysis existed
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM current_analysis)')
+        if not cursor.fetchone()[0]:
             cursor.execute('''
-                INSERT INTO properties (
-                    source, listing_id, address, city, state, zip_code, county,
-                    price, bedrooms, bathrooms, sqft, property_type, description,
-                    wabo_status, url, images, date_listed, contact_info, raw_data
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                property_data.get('source', ''),
-                property_data.get('listing_id', ''),
-                property_data.get('address', ''),
-                property_data.get('city', ''),
-                property_data.get('state', 'WA'),
-                property_data.get('zip_code', ''),
-                property_data.get('county', ''),
-                property_data.get('price', 0),
-                property_data.get('bedrooms', 0),
-                property_data.get('bathrooms', 0),
-                property_data.get('sqft', 0),
-                property_data.get('property_type', ''),
-                property_data.get('description', ''),
-                property_data.get('wabo_status', ''),
-                property_data.get('url', ''),
-                json.dumps(property_data.get('images', [])),
-                property_data.get('date_listed', ''),
-                json.dumps(property_data.get('contact_info', {})),
-                json.dumps(property_data.get('raw_data', {}))
-            ))
-            property_id = cursor.lastrowid
+                INSERT INTO current_analysis (
+                    property_id, analysis_id, viable, viability_score, property_hash, config_hash
+                )
+                SELECT property_id, id, viable, viability_score, property_hash, config_hash
+                FROM property_analysis
+                WHERE id IN (SELECT MAX(id) FROM property_analysis GROUP BY property_id)
+            ''')
+            if cursor.rowcount > 0:
+                logger.info(f"Built current_analysis for {cursor.rowcount} properties")
+    
+    def _init_counters(self, cursor):
+        """Create the triggers that keep counters current, and fill it for existing data"""
+        # Each counter statement costs a few microseconds per written row, so every row
+        # touches as few counters as possible
+        triggers = {}
+        for table in COUNTED_TABLES:
+            triggers[f'trg_counters_{table}_insert'] = (f'AFTER INSERT ON {table}', _counter_sql('rows', f"'{table}'", '1'))
+            triggers[f'trg_counters_{table}_delete'] = (f'AFTER DELETE ON {table}', _counter_sql('rows', f"'{table}'", '-1'))
+        
+        # Listing distributions; NULL and empty values share the '' key
+        for column in ('county', 'wabo_status'):
+            triggers[f'trg_counters_properties_{column}_insert'] = (
+                'AFTER INSERT ON properties',
+                _counter_sql(column, f"IFNULL(NEW.{column}, '')", '1')
+            )
+            triggers[f'trg_counters_properties_{column}_delete'] = (
+                'AFTER DELETE ON properties',
+                _counter_sql(column, f"IFNULL(OLD.{column}, '')", '-1')
+            )
+            triggers[f'trg_counters_properties_{column}_update'] = (
+                f'AFTER UPDATE OF {column} ON properties WHEN OLD.{column} IS NOT NEW.{column}',
+                _counter_sql(column, f"IFNULL(OLD.{column}, '')", '-1') +
+                _counter_sql(column, f"IFNULL(NEW.{column}, '')", '1')
+            )
         
-        return property_id
+        # Current analyses by score range and viability, with the score sum for the average
+        triggers['trg_counters_current_analysis_insert'] = (
+            'AFTER INSERT ON current_analysis',
+            _counter_sql('viability', _viability_key_sql('NEW.'), '1', 'IFNULL(NEW.viability_score, 0)')
+        )
+        triggers['trg_counters_current_analysis_delete'] = (
+            'AFTER DELETE ON current_analysis',
+            _counter_sql('viability', _viability_key_sql('OLD.'), '-1', '-IFNULL(OLD.viability_score, 0)')
+        )
+        triggers['trg_counters_current_analysis_update'] = (
+            'AFTER UPDATE OF viable, viability_score ON current_analysis '
+            'WHEN OLD.viable IS NOT NEW.viable OR OLD.viability_score IS NOT NEW.viability_score',
+            _counter_sql('viability', _viability_key_sql('OLD.'), '-1', '-IFNULL(OLD.viability_score, 0)') +
+            _counter_sql('viability', _viability_key_sql('NEW.'), '1', 'IFNULL(NEW.viability_score, 0)')
+        )
+        
+        for name, (event, body) in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END')
+        
+        # Databases created before counters existed (a filled table always has 'rows' entries)
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM counters)')
+        if not cursor.fetchone()[0]:
+            self._rebuild_counters(cursor)
     
-    def _insert_analysis(self, cursor, property_id: int, analysis: Dict[str, Any]):
-        """Insert property analysis"""
-        cursor.execute('''
-            INSERT INTO property_analysis (
-                property_id, viable, viability_score, basic_analysis,
-                financial_analysis, market_analysis, wabo_analysis,
-                risk_analysis, pricing_analysis, recommendations, analysis_date
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            property_id,
-            analysis.get('viable', False),
-            analysis.get('viability_score', 0),
-            json.dumps(analysis.get('basic_analysis', {})),
-            json.dumps(analysis.get('financial_analysis', {})),
-            json.dumps(analysis.get('market_analysis', {})),
-            json.dumps(analysis.get('wabo_analysis', {})),
-            json.dumps(analysis.get('risk_analysis', {})),
-            json.dumps(analysis.get('pricing_analysis', {})),
-            json.dumps(analysis.get('recommendations', [])),
-            analysis.get('analysis_date', datetime.now().isoformat())
-        ))
+    def _rebuild_counters(self, cursor):
+        """Recompute every counter from the underlying tables"""
+        # Compaction totals are a running history, not derived from current rows
+        cursor.execute("DELETE FROM counters WHERE scope != 'compaction'")
+        for table in COUNTED_TABLES:
+            cursor.execute(f"INSERT INTO counters (scope, key, count) SELECT 'rows', '{table}', COUNT(*) FROM {table}")
+        for column in ('county', 'wabo_status'):
+            cursor.execute(f'''
+                INSERT INTO counters (scope, key, count)
+                SELECT '{column}', IFNULL({column}, ''), COUNT(*) FROM properties GROUP BY 2
+            ''')
+        cursor.execute(f'''
+            INSERT INTO counters (scope, key, count, total)
+            SELECT 'viability', {_viability_key_sql('')}, COUNT(*), IFNULL(SUM(viability_score), 0)
+            FROM current_analysis GROUP BY 2
+        ''')
     
-    def get_new_properties(self, hours: int = 24) -> List[Dict[str, Any]]:
-        """Get properties that are new within the specified hours"""
+    def rebuild_counters(self):
+        """Recompute summary counters from scratch (e.g. after editing the database by hand)"""
         try:
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT p.*, pa.viable, pa.viability_score, pa.basic_analysis,
-                           pa.financial_analysis, pa.market_analysis, pa.wabo_analysis,
-                           pa.risk_analysis, pa.pricing_analysis, pa.recommendations
-                    FROM properties p
-                    JOIN property_analysis pa ON p.id = pa.property_id
-                    WHERE p.created_at > ? AND pa.viable = 1
-                    ORDER BY pa.viability_score DESC
-                ''', (cutoff_time.isoformat(),))
-                
-                rows = cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                
-                properties = []
-                for row in rows:
-                    property_dict = dict(zip(columns, row))
-                    
-                    # Parse JSON fields
-                    property_dict['images'] = json.loads(property_dict.get('images', '[]'))
-                    property_dict['contact_info'] = json.loads(property_dict.get('contact_info', '{}'))
-                    property_dict['raw_data'] = json.loads(property_dict.get('raw_data', '{}'))
-                    property_dict['basic_analysis'] = json.loads(property_dict.get('basic_analysis', '{}'))
-                    property_dict['financial_analysis'] = json.loads(property_dict.get('financial_analysis', '{}'))
-                    property_dict['market_analysis'] = json.loads(property_dict.get('market_analysis', '{}'))
-                    property_dict['wabo_analysis'] = json.loads(property_dict.get('wabo_analysis', '{}'))
-                    property_dict['risk_analysis'] = json.loads(property_dict.get('risk_analysis', '{}'))
-                    property_dict['pricing_analysis'] = json.loads(property_dict.get('pricing_analysis', '{}'))
-                    property_dict['recommendations'] = json.loads(property_dict.get('recommendations', '[]'))
-                    
-                    properties.append(property_dict)
-                
-                logger.info(f"Found {len(properties)} new viable properties")
-                return properties
+            with self.connections.connection() as conn:
+                self._rebuild_counters(conn.cursor())
+                conn.commit()
+                logger.info("Summary counters rebuilt")
                 
         except Exception as e:
-            logger.error(f"Error getting new properties: {e}")
-            return []
+            logger.error(f"Error rebuilding counters: {e}")
+            raise
     
-    def get_property_summary(self) -> Dict[str, Any]:
-        """Get summary of all properties in database"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Total properties
-                cursor.execute('SELECT COUNT(*) FROM properties')
-                total = cursor.fetchone()[0]
-                
-                # Viable properties
-                cursor.execute('SELECT COUNT(*) FROM property_analysis WHERE viable = 1')
-                viable = cursor.fetchone()[0]
-                
-                # New properties (last 24 hours)
-                cutoff_time = datetime.now() - timedelta(hours=24)
-                cursor.execute('''
-                    SELECT COUNT(*) FROM properties 
-                    WHERE created_at > ?
-                ''', (cutoff_time.isoformat(),))
-                new = cursor.fetchone()[0]
-                
-                # Properties by county
-                cursor.execute('''
-                    SELECT county, COUNT(*) 
-                    FROM properties 
-                    GROUP BY county 
-                    ORDER BY COUNT(*) DESC
-                ''')
-                county_distribution = dict(cursor.fetchall())
-                
-                # Properties by WABO status
-                cursor.execute('''
-                    SELECT wabo_status, COUNT(*) 
-                    FROM properties 
-                    GROUP BY wabo_status 
-                    ORDER BY COUNT(*) DESC
-                ''')
-                wabo_distribution = dict(cursor.fetchall())
-                
-                # Average viability score
-                cursor.execute('SELECT AVG(viability_score) FROM property_analysis')
-                avg_score = cursor.fetchone()[0] or 0
-                
-                return {
-                    'total': total,
-                    'viable': viable,
-                    'new': new,
-                    'county_distribution': county_distribution,
-                    'wabo_distribution': wabo_distribution,
-                    'average_viability_score': round(avg_score, 1),
-                    'last_updated': datetime.now().isoformat()
-                }
-                
-        except Exception as e:
-            logger.error(f"Error getting property summary: {e}")
-            return {
-                'total': 0,
-                'viable': 0,
-                'new': 0,
-                'error': str(e)
-            }
+    def _counters(self, cursor, scope: str) -> Dict[str, tuple]:
+        """Non-zero (count, total) per key for one counters scope, largest count first"""
+        cursor.execute('''
+            SELECT key, count, total FROM counters
+            WHERE scope = ? AND count != 0
+            ORDER BY count DESC
+        ''', (scope,))
+        return {key: (count, total) for key, count, total in cursor.fetchall()}
     
-    def get_top_properties(self, limit: int = 10, min_score: float = 70.0) -> List[Dict[str, Any]]:
-        """Get top properties by viability score"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT p.*, pa.viable, pa.viability_score, pa.basic_analysis,
-                           pa.financial_analysis, pa.market_analysis, pa.wabo_analysis,
-                           pa.risk_analysis, pa.pricing_analysis, pa.recommendations
-                    FROM properties p
-                    JOIN property_analysis pa ON p.id = pa.property_id
-                    WHERE pa.viability_score >= ?
-                    ORDER BY pa.viability_score DESC
-                    LIMIT ?
-                ''', (min_score, limit))
-                
-                rows = cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                
-                properties = []
-                for row in rows:
-                    property_dict = dict(zip(columns, row))
-                    
-                    # Parse JSON fields
-                    for json_field in ['images', 'contact_info', 'raw_data', 'basic_analysis',
-                                     'financial_analysis', 'market_analysis', 'wabo_analysis',
-                                     'risk_analysis', 'pricing_analysis', 'recommendations']:
-                        if property_dict.get(json_field):
-                            property_dict[json_field] = json.loads(property_dict[json_field])
-                    
-                    properties.append(property_dict)
-                
-                return properties
-                
-        except Exception as e:
-            logger.error(f"Error getting top properties: {e}")
-            return []
+    def _viability_counters(self, cursor) -> Dict[str, Any]:
+        """Current-analysis totals from the viability counters"""
+        totals = {'count': 0, 'viable': 0, 'scored': 0, 'score_sum': 0.0, 'ranges': {}}
+        for key, (count, total) in self._counters(cursor, 'viability').items():
+            label, viable = key.rsplit('|', 1)
+            totals['count'] += count
+            totals['viable'] += count if viable == '1' else 0
+            totals['scored'] += count if label else 0
+            totals['score_sum'] += total
+            # Unscored analyses fall in the lowest range, as they do in a SQL CASE
+            label = label or SCORE_RANGES[-1][1]
+            totals['ranges'][label] = totals['ranges'].get(label, 0) + count
+        return totals
     
-    def record_search_history(self, search_data: Dict[str, Any]):
-        """Record search history"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    INSERT INTO search_history (
-                        total_properties_found, viable_properties_found,
-                        new_properties_found, sources_searched,
-                        search_duration_seconds, status
-                    ) VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    search_data.get('total_properties', 0),
-                    search_data.get('viable_properties', 0),
-                    search_data.get('new_properties', 0),
-                    json.dumps(search_data.get('sources_searched', [])),
-                    search_data.get('duration_seconds', 0),
-                    search_data.get('status', 'completed')
-                ))
-                
-                conn.commit()
-                logger.info("Search history recorded")
-                
-        except Exception as e:
-            logger.error(f"Error recording search history: {e}")
+    def _distribution(self, cursor, column: str) -> Dict[str, int]:
+        """Property count per value of a listing column, from the trigger-maintained counters"""
+        return {key: count for key, (count, _) in self._counters(cursor, column).items()}
     
-    def record_notification(self, property_id: int, notification_type: str, 
-                          status: str = 'sent', error_message: str = None):
-        """Record notification sent"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    INSERT INTO notifications (
-                        property_id, notification_type, status, error_message
-                    ) VALUES (?, ?, ?, ?)
-                ''', (property_id, notification_type, status, error_message))
-                
-                conn.commit()
-                
-        except Exception as e:
-            logger.error(f"Error recording notification: {e}")
+    def _viability_summary(self, cursor) -> Tuple[int, Optional[float]]:
+        """Viable count and average viability score, from the viability counters"""
+        viability = self._viability_counters(cursor)
+        return viability['viable'], viability['score_sum'] / viability['scored'] if viability['scored'] else 0
     
-    def get_database_stats(self) -> Dict[str, Any]:
-        """Get comprehensive database statistics"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                stats = {}
-                
-                # Table counts
-                tables = ['properties', 'property_analysis', 'notifications', 'search_history']
-                for table in tables:
-                    cursor.execute(f'SELECT COUNT(*) FROM {table}')
-                    stats[f'{table}_count'] = cursor.fetchone()[0]
-                
-                # Recent activity
-                cursor.execute('''
-                    SELECT COUNT(*) FROM properties 
-                    WHERE created_at > datetime('now', '-7 days')
-                ''')
-                stats['properties_last_7_days'] = cursor.fetchone()[0]
-                
-                # Viability distribution
-                cursor.execute('''
-                    SELECT 
-                        CASE 
-                            WHEN viability_score >= 90 THEN 'Excellent (90-100)'
-                            WHEN viability_score >= 80 THEN 'Good (80-89)'
-                            WHEN viability_score >= 70 THEN 'Fair (70-79)'
-                            WHEN viability_score >= 60 THEN 'Poor (60-69)'
-                            ELSE 'Very Poor (<60)'
-                        END as score_range,
-                        COUNT(*) as count
-                    FROM property_analysis
-                    GROUP BY score_range
-                    ORDER BY MIN(viability_score) DESC
-                ''')
-                stats['viability_distribution'] = dict(cursor.fetchall())
-                
-                # Database size
-                cursor.execute("SELECT page_count * page_size as size FROM pragma_page_count(), pragma_page_size()")
-                db_size = cursor.fetchone()[0]
-                stats['database_size_bytes'] = db_size
-                stats['database_size_mb'] = round(db_size / (1024 * 1024), 2)
-                
-                return stats
-                
-        except Exception as e:
-            logger.error(f"Error getting database stats: {e}")
-            return {'error': str(e)}
+    def _table_counts(self, cursor) -> Dict[str, int]:
+        """Row count of each table, from the counters instead of full scans"""
+        rows = self._counters(cursor, 'rows')
+        return {
+            'properties_count': sum(count for count, _ in self._counters(cursor, 'county').values()),
+            'property_analysis_count': rows.get('property_analysis', (0, 0))[0],
+            'current_analysis_count': self._viability_counters(cursor)['count'],
+            'notifications_count': rows.get('notifications', (0, 0))[0],
+            'search_history_count': rows.get('search_history', (0, 0))[0]
+        }
+    
+    def _score_ranges(self, cursor) -> Dict[str, int]:
+        """Current analyses per SCORE_RANGES label, from the viability counters"""
+        return self._viability_counters(cursor)['ranges']
+    
+    def _database_size(self, cursor) -> int:
+        """Bytes in the database file"""
+        cursor.execute("SELECT page_count * page_size as size FROM pragma_page_count(), pragma_page_size()")
+        return cursor.fetchone()[0]
+    
+    def _space_stats(self, cursor) -> Dict[str, Any]:
+        """Space held for reuse in the file's freelist"""
+        cursor.execute("SELECT freelist_count * page_size FROM pragma_freelist_count(), pragma_page_size()")
+        return {'freelist_bytes': cursor.fetchone()[0]}
+    
+    def _ensure_column(self, cursor, table: str, column: str, definition: str):
+        """Add a column to an existing table if it is missing (lightweight migration)"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    
+    def _ago(self, amount: int, unit: str) -> Tuple[str, List[Any]]:
+        """datetime() of amount hours or days ago, in the format of CURRENT_TIMESTAMP columns"""
+        return "datetime('now', ?)", [f'-{int(amount)} {unit}']
+    
+    def _before(self, timestamp: Any, seconds: float) -> Tuple[str, List[Any]]:
+        """datetime() of a CURRENT_TIMESTAMP value less seconds, in the same format"""
+        return 'datetime(?, ?)', [timestamp, f'-{float(seconds)} seconds']
+    
+    def _write_chunk_size(self, conn) -> int:
+        """Rows per bulk statement, capped by SQLite's bound-parameter limit"""
+        chunk_size = self.db_config.get('write_chunk_size', 500)
+        max_variables = conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER) if hasattr(conn, 'getlimit') else 999
+        return max(1, min(chunk_size, max_variables // len(PROPERTY_COLUMNS)))
+    
+    def _upsert_chunk(self, cursor, rows: List[tuple]) -> List[int]:
+        """Upsert (property params, raw_data) rows in one multi-row statement and return their ids in order"""
+        values = ', '.join(['(' + ', '.join('?' * len(PROPERTY_COLUMNS)) + ')'] * len(rows))
+        cursor.execute(f'''
+            INSERT INTO properties ({', '.join(PROPERTY_COLUMNS)})
+            VALUES {values}
+            ON CONFLICT(source, listing_id, address) DO UPDATE SET
+                {', '.join(f'{column} = excluded.{column}' for column in PROPERTY_UPDATE_COLUMNS)},
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING id, source, listing_id, address
+        ''', [value for params, _ in rows for value in params])
+        
+        # Key columns have TEXT affinity, so compare them as text
+        ids = {tuple(str(value) for value in row[1:]): row[0] for row in cursor.fetchall()}
+        property_ids = [ids[tuple(str(value) for value in params[:3])] for params, _ in rows]
+        self._store_raw_data(cursor, [(property_id, raw_data) for property_id, (_, raw_data) in zip(property_ids, rows)])
+        return property_ids
+    
+    def _insert_analyses(self, cursor, rows: List[tuple]):
+        """Insert analysis rows as built by _analysis_params"""
+        cursor.executemany(INSERT_ANALYSIS_SQL, rows)
+    
+    def _analysis_values(self, analysis: Dict[str, Any]) -> tuple:
+        """INSERT_ANALYSIS_SQL parameters after property_id"""
+        component_scores = analysis.get('component_scores', {})
+        return (
+            analysis.get('viable', False),
+            analysis.get('viability_score', 0),
+            encode_analysis(analysis),
+            analysis.get('analysis_date', datetime.now().isoformat()),
+            *[component_scores.get(component) for component in COMPONENT_SCORE_COLUMNS.values()],
+            analysis.get('property_hash'),
+            analysis.get('config_hash')
+        )
+    
+    def _search_match(self, query: str) -> str:
+        """FTS5 MATCH expression for a free-text query"""
+        return _match_expression(query)
+    
+    def _search_sql(self, select_list: str, analysis_join: str, conditions: List[str]) -> str:
+        """Search through the FTS5 index, ranked by its weighted bm25"""
+        where = ' AND '.join(['properties_fts MATCH ?'] + conditions)
+        return f'''
+            SELECT {select_list}, -properties_fts.rank AS search_rank,
+                   snippet(properties_fts, 0, '[', ']', '...', 16) AS snippet
+            FROM properties_fts
+            JOIN properties p ON p.id = properties_fts.rowid
+            LEFT JOIN current_analysis ca ON ca.property_id = p.id
+            {analysis_join}
+            WHERE {where}
+            ORDER BY properties_fts.rank
+            LIMIT ?
+        '''
+    
+    def _first_price_change_sql(self, since: str) -> str:
+        """First price change per property at or after since"""
+        # Bare old_value/ts take their values from the MIN(id) row, i.e. the window's first change
+        return f'''
+            SELECT property_id, old_value AS previous_price, ts AS first_change_at, MIN(id)
+            FROM property_events
+            WHERE field = 'price' AND ts >= {since}
+            GROUP BY property_id
+        '''
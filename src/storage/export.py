@@ -0,0 +1,224 @@
+"""
+Snapshot Exporter - Streams properties and their current analysis to partitioned columnar files
+Output is Hive-partitioned by county and month, in Parquet or the Arrow IPC file format
+"""
+
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import quote
+from loguru import logger
+from storage.analysis_codec import ANALYSIS_SCHEMA, decode_numbers
+from storage.rows import PropertyRow
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed for exports
+    pa = None
+    pq = None
+
+# Exported listing and current-analysis columns: (name, Arrow type, SQL expression).
+# Casts pin each column to one type, since SQLite columns may hold mixed storage classes.
+EXPORT_COLUMNS = (
+    ('id', 'int64', 'p.id'),
+    ('source', 'string', 'p.source'),
+    ('listing_id', 'string', 'CAST(p.listing_id AS TEXT)'),
+    ('address', 'string', 'p.address'),
+    ('city', 'string', 'p.city'),
+    ('state', 'string', 'p.state'),
+    ('zip_code', 'string', 'CAST(p.zip_code AS TEXT)'),
+    ('price', 'float64', 'CAST(p.price AS REAL)'),
+    ('bedrooms', 'int64', 'CAST(p.bedrooms AS INTEGER)'),
+    ('bathrooms', 'float64', 'CAST(p.bathrooms AS REAL)'),
+    ('sqft', 'int64', 'CAST(p.sqft AS INTEGER)'),
+    ('property_type', 'string', 'p.property_type'),
+    ('description', 'string', 'p.description'),
+    ('wabo_status', 'string', 'p.wabo_status'),
+    ('url', 'string', 'p.url'),
+    ('date_listed', 'string', 'CAST(p.date_listed AS TEXT)'),
+    ('created_at', 'timestamp', "CAST(strftime('%s', p.created_at) AS INTEGER)"),
+    ('updated_at', 'timestamp', "CAST(strftime('%s', p.updated_at) AS INTEGER)"),
+    ('viable', 'bool', 'ca.viable = 1'),
+    ('viability_score', 'float64', 'ca.viability_score'),
+    ('basic_score', 'float64', 'pa.basic_score'),
+    ('financial_score', 'float64', 'pa.financial_score'),
+    ('market_score', 'float64', 'pa.market_score'),
+    ('wabo_score', 'float64', 'pa.wabo_score'),
+    ('risk_score', 'float64', 'pa.risk_score'),
+    ('analysis_date', 'string', 'CAST(pa.analysis_date AS TEXT)')
+)
+
+# Numeric analysis fields flattened into float64 columns, e.g. financial_monthly_revenue_total:
+# (column name, codec schema slot, path in the analysis)
+METRIC_SECTIONS = ('financial_analysis', 'market_analysis', 'pricing_analysis')
+EXPORT_METRICS = tuple(
+    (path[0].replace('analysis', '') + '_'.join(path[1:]), slot, path)
+    for slot, (path, kind) in enumerate(ANALYSIS_SCHEMA) if kind == 'n' and path[0] in METRIC_SECTIONS
+)
+METRIC_SLOTS = tuple(slot for _, slot, _ in EXPORT_METRICS)
+
+EXPORT_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Partition directory for a missing county (pyarrow's default Hive null fallback)
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+class SnapshotExporter:
+    """Writes a consistent snapshot of the property table for analysis in pandas/Arrow"""
+    
+    def __init__(self, connections, export_config: Optional[Dict[str, Any]] = None):
+        """Initialize with the database ConnectionManager and export configuration"""
+        export_config = export_config or {}
+        self.connections = connections
+        self.path = export_config.get('path', 'data/exports')
+        self.chunk_size = export_config.get('chunk_size', 50000)  # Rows per fetch and row group
+        self.format = export_config.get('format', 'parquet')
+        self.compression = export_config.get('compression', 'zstd')
+    
+    def export(self, output_dir: Optional[str] = None, export_format: Optional[str] = None) -> Dict[str, Any]:
+        """Export every property with its current analysis; returns the snapshot path and counts
+        
+        Rows stream from one read transaction in id order, so memory stays bounded (about
+        2 x chunk_size rows) and the snapshot is consistent while scrapes keep writing. Each
+        county=<county>/month=<YYYY-MM> directory (month the listing was first stored) holds one
+        file, written a row group at a time as its rows accumulate. Load it with pyarrow.dataset.dataset(path, partitioning='hive'); the 'arrow'
+        format is uncompressed and can be memory-mapped without copying.
+        """
+        if pa is None:
+            raise RuntimeError("Snapshot export requires pyarrow (pip install pyarrow)")
+        export_format = export_format or self.format
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        
+        snapshot = Path(output_dir or self.path) / f"snapshot_{datetime.now().strftime('%Y%m%dT%H%M%S.%f')}"
+        staging = snapshot.with_name(snapshot.name + '.partial')
+        shutil.rmtree(staging, ignore_errors=True)
+        schema = self._schema()
+        
+        rows_written = 0
+        writers = {}  # partition -> its open file writer
+        buffers = {}  # partition -> rows fetched but not yet written
+        buffered = 0
+        
+        def write_partition(partition) -> int:
+            """Write a partition's buffered rows as one row group of its file"""
+            partition_rows = buffers.pop(partition)
+            if partition not in writers:
+                writers[partition] = self._open_writer(staging, partition, len(writers) + 1, schema, export_format)
+            writers[partition].write_batch(self._record_batch(columns, partition_rows, schema))
+            return len(partition_rows)
+        
+        try:
+            with self.connections.connection() as conn:
+                cursor = self._snapshot_cursor(conn)
+                cursor.execute(self._query())
+                rows = cursor.fetchmany(self.chunk_size)
+                # Read after the first fetch; server-side cursors only describe their rows then
+                columns = [description[0] for description in cursor.description] if rows else []
+                while rows:
+                    # Rows arrive in id order with partitions interleaved; writing out the largest
+                    # buffer whenever chunk_size rows are held keeps memory bounded without a sort
+                    for row in rows:
+                        buffers.setdefault(row[:2], []).append(row)
+                    buffered += len(rows)
+                    while buffered >= self.chunk_size:
+                        written = write_partition(max(buffers, key=lambda partition: len(buffers[partition])))
+                        buffered -= written
+                        rows_written += written
+                    rows = cursor.fetchmany(self.chunk_size)
+                for partition in list(buffers):
+                    rows_written += write_partition(partition)
+            
+            files = len(writers)
+            while writers:
+                writers.popitem()[1].close()
+            
+            staging.mkdir(parents=True, exist_ok=True)
+            os.replace(staging, snapshot)
+            logger.info(f"Exported {rows_written} properties in {files} files to {snapshot}")
+            return {'path': str(snapshot), 'rows': rows_written, 'files': files}
+        
+        except Exception:
+            while writers:
+                writers.popitem()[1].close()
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+    
+    @staticmethod
+    def _schema():
+        """Arrow schema of the exported files (county and month live in the directory names)"""
+        types = {'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string(),
+                 'bool': pa.bool_(), 'timestamp': pa.timestamp('s')}
+        fields = [pa.field(name, types[arrow_type]) for name, arrow_type, _ in EXPORT_COLUMNS]
+        fields += [pa.field(name, pa.float64()) for name, _, _ in EXPORT_METRICS]
+        return pa.schema(fields)
+    
+    @staticmethod
+    def _snapshot_cursor(conn):
+        """Cursor for the export query, in a transaction so every fetch sees one snapshot"""
+        cursor = conn.cursor()
+        cursor.execute('BEGIN')
+        return cursor
+    
+    @staticmethod
+    def _query() -> str:
+        """Listings with their current analysis in primary key order (a rowid scan, no sort)"""
+        select_list = ', '.join(f'{expression} AS {name}' for name, _, expression in EXPORT_COLUMNS)
+        # Sections are read through PropertyRow, which handles both the blob and legacy JSON columns
+        sections = ', '.join(f'pa.{section}' for section in METRIC_SECTIONS)
+        return f'''
+            SELECT NULLIF(p.county, '') AS partition_county, substr(p.created_at, 1, 7) AS partition_month,
+                   {select_list}, pa.analysis_blob, {sections}
+            FROM properties p
+            LEFT JOIN current_analysis ca ON ca.property_id = p.id
+            LEFT JOIN property_analysis pa ON pa.id = ca.analysis_id
+            ORDER BY p.id
+        '''
+    
+    def _open_writer(self, staging: Path, partition: Tuple[Optional[str], Optional[str]], number: int,
+                     schema, export_format: str):
+        """Writer for one partition's file"""
+        county, month = partition
+        directory = staging / f"county={quote(county, safe='') if county else NULL_PARTITION}" / \
+            f"month={month or NULL_PARTITION}"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = str(directory / f'part-{number:05d}{EXPORT_FORMATS[export_format]}')
+        if export_format == 'parquet':
+            return pq.ParquetWriter(path, schema, compression=self.compression)
+        return pa.ipc.new_file(path, schema)
+    
+    @staticmethod
+    def _record_batch(columns: List[str], rows: List[tuple], schema):
+        """Column arrays for a run of rows, with analysis metrics flattened out of the sections"""
+        data = {name: [row[index] for row in rows] for index, name in enumerate(columns)
+                if index >= 2 and name in schema.names}
+        
+        # Metrics come straight from the blob's numeric block; legacy rows and records with
+        # JSON extras go through the decoded sections
+        blob_index = columns.index('analysis_blob')
+        metric_rows = []
+        for row in rows:
+            blob = row[blob_index]
+            values = decode_numbers(blob, METRIC_SLOTS) if blob is not None else None
+            metric_rows.append(values if values is not None else SnapshotExporter._decoded_metrics(columns, row))
+        for (name, _, _), values in zip(EXPORT_METRICS, zip(*metric_rows)):
+            data[name] = values
+        
+        # SQLite returns booleans as 0/1
+        arrays = [pa.array(data[field.name], type=pa.int8()).cast(field.type) if field.type == pa.bool_()
+                  else pa.array(data[field.name], type=field.type) for field in schema]
+        return pa.record_batch(arrays, schema=schema)
+    
+    @staticmethod
+    def _decoded_metrics(columns: List[str], row: tuple) -> List[Any]:
+        """Metric values read from a row's decoded analysis sections (None where missing)"""
+        property_row = PropertyRow(columns[2:], row[2:])
+        values = []
+        for _, _, (section, *path) in EXPORT_METRICS:
+            value = property_row[section]
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            values.append(value if isinstance(value, (int, float)) and not isinstance(value, bool) else None)
+        return values
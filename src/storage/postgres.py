@@ -0,0 +1,666 @@
+"""
+PostgreSQL Database Manager - Shared storage for concurrent scout workers and dashboards
+Listings and analyses are bulk loaded with COPY; analysis sections are stored as JSONB
+"""
+
+import io
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from loguru import logger
+from storage.analysis_codec import ANALYSIS_SECTIONS
+from storage.base import (
+    COMPONENT_SCORE_COLUMNS, PROPERTY_COLUMNS, PROPERTY_FILTERS, PROPERTY_UPDATE_COLUMNS,
+    SEARCH_COLUMNS, TRACKED_PROPERTY_FIELDS, BaseDatabaseManager, search_terms
+)
+from storage.export import EXPORT_COLUMNS, METRIC_SECTIONS, SnapshotExporter
+from storage.retention import RetentionManager
+
+try:
+    import psycopg2
+    import psycopg2.extras
+    import psycopg2.pool
+except ImportError:  # Only needed for database.type: postgresql
+    psycopg2 = None
+
+# Advisory lock held while creating the schema, so workers starting together do not race
+SCHEMA_LOCK_KEY = 0x4146485f  # 'AFH_'
+
+# Text search configuration and tsvector weights ('A' ranks above 'B'), mirroring SEARCH_COLUMNS
+SEARCH_CONFIG = 'english'
+SEARCH_WEIGHTS = {column: 'A' if weight > 1 else 'B' for column, weight in SEARCH_COLUMNS.items()}
+
+# Columns of property_analysis written for each analysis, in COPY order
+ANALYSIS_COLUMNS = (
+    ('property_id', 'viable', 'viability_score') + ANALYSIS_SECTIONS + ('analysis_date',) +
+    tuple(COMPONENT_SCORE_COLUMNS) + ('property_hash', 'config_hash')
+)
+
+# iter_properties filters; viable accepts 0/1 as on SQLite
+POSTGRES_PROPERTY_FILTERS = {
+    **PROPERTY_FILTERS,
+    'viable': 'ca.viable = ?::INTEGER::BOOLEAN'
+}
+
+# Export expressions that differ from SQLite's; every other EXPORT_COLUMNS expression is portable
+POSTGRES_EXPORT_EXPRESSIONS = {
+    'price': 'p.price',
+    'bathrooms': 'p.bathrooms',
+    'created_at': 'EXTRACT(EPOCH FROM p.created_at)::BIGINT',
+    'updated_at': 'EXTRACT(EPOCH FROM p.updated_at)::BIGINT',
+    'viable': 'ca.viable::INTEGER'
+}
+
+# COPY text format escapes; None is written as \N
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+def _copy_buffer(rows) -> io.StringIO:
+    """Rows as a COPY ... FROM STDIN text-format stream"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join('\\N' if value is None else str(value).translate(COPY_ESCAPES) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+def _lock_order(property_data: Dict[str, Any]) -> tuple:
+    """Sort key for analyzed properties by listing key
+    
+    Writers that upsert in this order lock shared listings in the same sequence, so
+    concurrent stores wait on each other instead of deadlocking.
+    """
+    prop = property_data.get('property') or {}
+    return tuple(str(prop.get(column, '')) for column in PROPERTY_COLUMNS[:3])
+
+def _tsquery_expression(query: str) -> str:
+    """to_tsquery expression for a free-text query (same syntax as SQLite search, see search_terms)"""
+    terms = []
+    for tokens, prefix in search_terms(query):
+        words = [f"'{token}'" for token in tokens]
+        if prefix:
+            words[-1] += ':*'
+        terms.append('(' + ' <-> '.join(words) + ')')
+    return ' & '.join(terms)
+
+class PostgresConnectionManager:
+    """Pool of PostgreSQL connections shared by every thread"""
+    
+    def __init__(self, dsn: str, pool_size: int = 10):
+        """Initialize with a libpq connection string and the most connections to open"""
+        self.dsn = dsn
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._pid = os.getpid()
+    
+    def _get_pool(self):
+        """The connection pool, opened on first use"""
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Connections must not cross a fork; the child opens its own
+                self._pool = None
+                self._slots = threading.BoundedSemaphore(self.pool_size)
+                self._pid = os.getpid()
+            if self._pool is None:
+                self._pool = psycopg2.pool.ThreadedConnectionPool(1, self.pool_size, self.dsn)
+            return self._pool, self._slots
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for one transaction
+        
+        Use it as `with manager.connection() as conn:`; the transaction commits on success and
+        rolls back on error, then the connection goes back to the pool. Blocks while all
+        pool_size connections are borrowed (psycopg2's pool would raise instead).
+        """
+        pool, slots = self._get_pool()
+        with slots:
+            conn = pool.getconn()
+            try:
+                # JSONB comes back as text so PropertyRow decodes it only when read
+                psycopg2.extras.register_default_jsonb(conn, loads=lambda value: value)
+                with conn:
+                    yield conn
+            finally:
+                pool.putconn(conn, close=bool(conn.closed))
+    
+    @contextmanager
+    def maintenance_connection(self):
+        """Separate autocommit connection for statements that cannot run in a transaction (VACUUM)"""
+        conn = psycopg2.connect(self.dsn)
+        try:
+            conn.autocommit = True
+            yield conn
+        finally:
+            conn.close()
+    
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.closeall()
+
+class PostgresRetentionManager(RetentionManager):
+    """Retention policies on PostgreSQL, where VACUUM makes freed space reusable in place"""
+    
+    def _prune_analyses(self) -> int:
+        """Delete superseded analyses outside the keep-all window, keeping weekly snapshots"""
+        condition = '''
+            NOT EXISTS (
+                SELECT 1 FROM current_analysis ca
+                WHERE ca.property_id = t.property_id AND ca.analysis_id = t.id
+            )
+            AND (
+                t.created_at < now() + %s::INTERVAL
+                OR EXISTS (
+                    SELECT 1 FROM property_analysis newer
+                    WHERE newer.property_id = t.property_id AND newer.id > t.id
+                      AND date_trunc('week', newer.created_at) = date_trunc('week', t.created_at)
+                )
+            )
+        '''
+        return self._delete_in_batches(
+            'property_analysis', 'created_at', f'-{int(self.analysis_keep_all_days)} days',
+            condition, [f'-{int(self.analysis_snapshot_days)} days']
+        )
+    
+    def _delete_in_batches(self, table: str, time_column: str, cutoff: str,
+                           condition: str = 'TRUE', condition_params: Optional[list] = None) -> int:
+        """Delete rows older than cutoff (and matching condition), batch_size ids per transaction"""
+        deleted = 0
+        last_id = 0
+        while True:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT MAX(id), bool_and({time_column} >= now() + %s::INTERVAL) FROM (
+                        SELECT id, {time_column} FROM {table} WHERE id > %s ORDER BY id LIMIT %s
+                    ) batch
+                ''', (cutoff, last_id, self.batch_size))
+                batch_end, all_in_window = cursor.fetchone()
+                if batch_end is None or all_in_window:
+                    return deleted
+                
+                cursor.execute(f'''
+                    DELETE FROM {table} AS t
+                    WHERE t.id > %s AND t.id <= %s AND t.{time_column} < now() + %s::INTERVAL AND {condition}
+                ''', [last_id, batch_end, cutoff] + (condition_params or []))
+                deleted += cursor.rowcount
+                last_id = batch_end
+    
+    def _incremental_vacuum(self) -> int:
+        """VACUUM the pruned tables so deleted rows' space is reused; returns bytes truncated from their ends"""
+        tables = ('property_analysis', 'notifications', 'search_history', 'property_events')
+        size_sql = "SELECT SUM(pg_total_relation_size(name::REGCLASS)) FROM unnest(%s) AS name"
+        with self.connections.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(size_sql, (list(tables),))
+            size_before = cursor.fetchone()[0]
+        
+        with self.connections.maintenance_connection() as conn:
+            cursor = conn.cursor()
+            for table in tables:
+                cursor.execute(f'VACUUM (ANALYZE) {table}')
+            cursor.execute(size_sql, (list(tables),))
+            size_after = cursor.fetchone()[0]
+        return max(int(size_before - size_after), 0)
+    
+    def _record(self, rows_deleted: int, bytes_reclaimed: int):
+        """Add this run's totals to the compaction counters shown in database stats"""
+        with self.connections.connection() as conn:
+            conn.cursor().executemany('''
+                INSERT INTO counters (scope, key, count, total) VALUES ('compaction', %s, 1, %s)
+                ON CONFLICT (scope, key) DO UPDATE SET
+                    count = counters.count + EXCLUDED.count,
+                    total = counters.total + EXCLUDED.total
+            ''', [('rows_deleted', rows_deleted), ('bytes_reclaimed', bytes_reclaimed)])
+
+class PostgresSnapshotExporter(SnapshotExporter):
+    """Snapshot export streamed from PostgreSQL through a server-side cursor"""
+    
+    @staticmethod
+    def _snapshot_cursor(conn):
+        """Named cursor, so rows are fetched chunk by chunk instead of all at once"""
+        return conn.cursor(name='snapshot_export')
+    
+    @staticmethod
+    def _query() -> str:
+        """Listings with their current analysis in primary key order (an index scan, no sort)"""
+        select_list = ', '.join(f'{POSTGRES_EXPORT_EXPRESSIONS.get(name, expression)} AS {name}'
+                                for name, _, expression in EXPORT_COLUMNS)
+        # No analysis blob on PostgreSQL; metrics are read from the JSONB sections
+        sections = ', '.join(f'pa.{section}' for section in METRIC_SECTIONS)
+        return f'''
+            SELECT NULLIF(p.county, '') AS partition_county,
+                   to_char(p.created_at AT TIME ZONE 'UTC', 'YYYY-MM') AS partition_month,
+                   {select_list}, NULL::BYTEA AS analysis_blob, {sections}
+            FROM properties p
+            LEFT JOIN current_analysis ca ON ca.property_id = p.id
+            LEFT JOIN property_analysis pa ON pa.id = ca.analysis_id
+            ORDER BY p.id
+        '''
+
+
+class PostgresDatabaseManager(BaseDatabaseManager):
+    """Manages AFH property data in a PostgreSQL database shared by many processes
+    
+    Same interface as DatabaseManager. Totals and distributions are aggregated on read
+    instead of through trigger-maintained counters, which would serialize concurrent writers.
+    """
+    
+    retention_class = PostgresRetentionManager
+    exporter_class = PostgresSnapshotExporter
+    database_error = psycopg2.Error if psycopg2 is not None else Exception
+    property_filters = POSTGRES_PROPERTY_FILTERS
+    list_chunk_size = None  # Lists are bound as a single array parameter
+    current_time_sql = 'clock_timestamp()'
+    
+    def _connect(self, db_config: Dict[str, Any]) -> PostgresConnectionManager:
+        """Connection pool for database.dsn, or the DATABASE_URL environment variable"""
+        if psycopg2 is None:
+            raise RuntimeError("PostgreSQL storage requires psycopg2 (pip install psycopg2-binary)")
+        self.dsn = db_config.get('dsn') or os.environ.get('DATABASE_URL')
+        if not self.dsn:
+            raise ValueError("Set database.dsn or DATABASE_URL to use PostgreSQL storage")
+        return PostgresConnectionManager(self.dsn, db_config.get('connection_pool_size', 10))
+    
+    def _init_database(self):
+        """Initialize database tables, triggers and indexes"""
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', (SCHEMA_LOCK_KEY,))
+                
+                # Properties table; search_vector holds the weighted listing text for keyword search
+                search_vector = ' || '.join(
+                    f"setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE({column}, '')), '{weight}')"
+                    for column, weight in SEARCH_WEIGHTS.items()
+                )
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS properties (
+                        id BIGSERIAL PRIMARY KEY,
+                        source TEXT NOT NULL,
+                        listing_id TEXT,
+                        address TEXT NOT NULL,
+                        city TEXT,
+                        state TEXT DEFAULT 'WA',
+                        zip_code TEXT,
+                        county TEXT,
+                        price DOUBLE PRECISION,
+                        bedrooms INTEGER,
+                        bathrooms DOUBLE PRECISION,
+                        sqft INTEGER,
+                        property_type TEXT,
+                        description TEXT,
+                        wabo_status TEXT,
+                        url TEXT,
+                        images JSONB,
+                        date_listed TEXT,
+                        contact_info JSONB,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+                        search_vector TSVECTOR GENERATED ALWAYS AS ({search_vector}) STORED,
+                        UNIQUE (source, listing_id, address)
+                    )
+                ''')
+                
+                # updated_at is the comps refresh watermark, so it must be the write time rather
+                # than now()'s transaction start; databases created before that get the new default
+                cursor.execute('''
+                    SELECT column_default FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = 'properties' AND column_name = 'updated_at'
+                ''')
+                if cursor.fetchone()[0] != 'clock_timestamp()':
+                    cursor.execute('ALTER TABLE properties ALTER COLUMN updated_at SET DEFAULT clock_timestamp()')
+                
+                # Raw scraped payloads, read only on demand
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS property_raw_data (
+                        property_id BIGINT PRIMARY KEY REFERENCES properties (id),
+                        raw_data JSONB NOT NULL
+                    )
+                ''')
+                
+                # Property analysis history; each section is queryable JSONB
+                sections = ',\n'.join(f'{section} JSONB' for section in ANALYSIS_SECTIONS)
+                component_scores = ',\n'.join(f'{column} DOUBLE PRECISION' for column in COMPONENT_SCORE_COLUMNS)
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS property_analysis (
+                        id BIGSERIAL PRIMARY KEY,
+                        property_id BIGINT NOT NULL REFERENCES properties (id),
+                        viable BOOLEAN,
+                        viability_score DOUBLE PRECISION,
+                        {sections},
+                        analysis_date TEXT,
+                        {component_scores},  -- Used for re-scoring (risk_score is not inverted)
+                        property_hash TEXT,  -- Hash of analysis-relevant property fields
+                        config_hash TEXT,  -- Hash of the analyzer configuration
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                ''')
+                
+                # Current analysis per property (property_analysis keeps the full history)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS current_analysis (
+                        property_id BIGINT PRIMARY KEY REFERENCES properties (id),
+                        analysis_id BIGINT NOT NULL REFERENCES property_analysis (id),
+                        viable BOOLEAN,
+                        viability_score DOUBLE PRECISION,
+                        property_hash TEXT,
+                        config_hash TEXT
+                    )
+                ''')
+                
+                # Analysis cache table (latest analysis per listing, keyed by content and config hash)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS analysis_cache (
+                        listing_key TEXT PRIMARY KEY,  -- source|listing_id|address
+                        property_hash TEXT NOT NULL,
+                        config_hash TEXT NOT NULL,
+                        analysis BYTEA,  -- Encoded analysis (see storage.analysis_codec)
+                        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                ''')
+                
+                # Notifications table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS notifications (
+                        id BIGSERIAL PRIMARY KEY,
+                        property_id BIGINT REFERENCES properties (id),
+                        notification_type TEXT,  -- 'email', 'sms', 'both'
+                        sent_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        status TEXT DEFAULT 'sent',  -- 'sent', 'failed', 'pending'
+                        error_message TEXT
+                    )
+                ''')
+                
+                # Search history table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS search_history (
+                        id BIGSERIAL PRIMARY KEY,
+                        search_date TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        total_properties_found INTEGER,
+                        viable_properties_found INTEGER,
+                        new_properties_found INTEGER,
+                        sources_searched JSONB,
+                        search_duration_seconds DOUBLE PRECISION,
+                        status TEXT DEFAULT 'completed'  -- 'completed', 'failed', 'partial'
+                    )
+                ''')
+                
+                # Running compaction totals (other aggregates are computed on read)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS counters (
+                        scope TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        count BIGINT NOT NULL DEFAULT 0,
+                        total DOUBLE PRECISION NOT NULL DEFAULT 0,
+                        PRIMARY KEY (scope, key)
+                    )
+                ''')
+                
+                # Listing changes: one row per changed field per update; JSONB keeps prices numeric
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS property_events (
+                        id BIGSERIAL PRIMARY KEY,
+                        property_id BIGINT NOT NULL REFERENCES properties (id),
+                        ts TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        field TEXT NOT NULL,
+                        old_value JSONB,
+                        new_value JSONB
+                    )
+                ''')
+                
+                self._init_triggers(cursor)
+                
+                # Create indexes for better performance. Sort indexes put NULLs first so ascending
+                # and (scanned backwards) descending pages match SQLite's NULL ordering
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_address ON properties (address)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_county ON properties (county)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_price ON properties (price NULLS FIRST, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_created_at ON properties (created_at, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_updated_at ON properties (updated_at, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_properties_search ON properties USING GIN (search_vector)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_property ON property_analysis (property_id, id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_current_score ON current_analysis (viability_score NULLS FIRST, property_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_current_viable_score ON current_analysis (viable, viability_score)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_current_analysis_id ON current_analysis (analysis_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_property ON property_events (property_id, ts)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_field ON property_events (field, ts)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_config ON analysis_cache (config_hash)')
+            
+            logger.info("Database initialized successfully")
+        
+        except Exception as e:
+            logger.error(f"Error initializing database: {e}")
+            raise
+    
+    def _init_triggers(self, cursor):
+        """Create the statement-level triggers that maintain current_analysis and property_events
+        
+        Each trigger runs once per statement over its transition table, so a bulk upsert or
+        COPY costs one set-based statement rather than one per row.
+        """
+        changes = ',\n'.join(f"('{field}', to_jsonb(o.{field}), to_jsonb(n.{field}))"
+                             for field in TRACKED_PROPERTY_FIELDS)
+        functions = {
+            'afh_current_analysis_insert': '''
+                INSERT INTO current_analysis (
+                    property_id, analysis_id, viable, viability_score, property_hash, config_hash
+                )
+                SELECT DISTINCT ON (property_id)
+                    property_id, id, viable, viability_score, property_hash, config_hash
+                FROM new_rows
+                ORDER BY property_id, id DESC
+                ON CONFLICT (property_id) DO UPDATE SET
+                    analysis_id = EXCLUDED.analysis_id,
+                    viable = EXCLUDED.viable,
+                    viability_score = EXCLUDED.viability_score,
+                    property_hash = EXCLUDED.property_hash,
+                    config_hash = EXCLUDED.config_hash
+                WHERE EXCLUDED.analysis_id > current_analysis.analysis_id;
+            ''',
+            'afh_current_analysis_rescore': '''
+                UPDATE current_analysis ca SET
+                    viable = n.viable,
+                    viability_score = n.viability_score
+                FROM new_rows n
+                WHERE ca.property_id = n.property_id AND ca.analysis_id = n.id
+                  AND (ca.viable IS DISTINCT FROM n.viable OR ca.viability_score IS DISTINCT FROM n.viability_score);
+            ''',
+            'afh_property_events': f'''
+                INSERT INTO property_events (property_id, field, old_value, new_value)
+                SELECT n.id, change.field, change.old_value, change.new_value
+                FROM old_rows o
+                JOIN new_rows n ON n.id = o.id
+                CROSS JOIN LATERAL (VALUES {changes}) AS change (field, old_value, new_value)
+                WHERE change.old_value IS DISTINCT FROM change.new_value;
+            '''
+        }
+        for name, body in functions.items():
+            cursor.execute(f'''
+                CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    {body}
+                    RETURN NULL;
+                END
+                $$
+            ''')
+        
+        # Every write path (bulk COPY, per-row, re-scoring) goes through property_analysis
+        triggers = {
+            'trg_current_analysis_insert': (
+                'AFTER INSERT ON property_analysis REFERENCING NEW TABLE AS new_rows', 'afh_current_analysis_insert'
+            ),
+            'trg_current_analysis_rescore': (
+                'AFTER UPDATE ON property_analysis REFERENCING NEW TABLE AS new_rows', 'afh_current_analysis_rescore'
+            ),
+            'trg_property_events': (
+                'AFTER UPDATE ON properties REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows', 'afh_property_events'
+            )
+        }
+        # Scoped to this schema's tables; another schema in the database has its own triggers
+        cursor.execute('''
+            SELECT tgname FROM pg_trigger
+            WHERE tgname = ANY(%s) AND tgrelid IN ('properties'::regclass, 'property_analysis'::regclass)
+        ''', (list(triggers),))
+        existing = {row[0] for row in cursor.fetchall()}
+        for name, (event, function) in triggers.items():
+            if name not in existing:
+                cursor.execute(f'CREATE TRIGGER {name} {event} FOR EACH STATEMENT EXECUTE FUNCTION {function}()')
+    
+    def _sql(self, statement: str) -> str:
+        """A statement with psycopg2's %s placeholders"""
+        return statement.replace('?', '%s')
+    
+    def _in_list(self, column: str, values: Sequence[Any]) -> Tuple[str, List[Any]]:
+        """Condition matching column against an array of values"""
+        return f'{column} = ANY(?)', [list(values)]
+    
+    def _ago(self, amount: int, unit: str) -> Tuple[str, List[Any]]:
+        """now() less amount hours or days"""
+        return f'now() - make_interval({unit} => ?)', [int(amount)]
+    
+    def _before(self, timestamp: Any, seconds: float) -> Tuple[str, List[Any]]:
+        """A stored timestamp less seconds"""
+        return '?::TIMESTAMPTZ - make_interval(secs => ?)', [timestamp, float(seconds)]
+    
+    def _sort_direction(self, descending: bool) -> str:
+        """Direction with explicit NULL placement, matching SQLite's order (and the NULLS FIRST sort indexes)"""
+        return 'DESC NULLS LAST' if descending else 'ASC NULLS FIRST'
+    
+    def _write_order(self, analyzed_properties: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Analyzed properties in listing key order, so concurrent writers lock rows in the same sequence"""
+        # Stable, so a listing repeated in the batch still ends with its last copy
+        return sorted(analyzed_properties, key=_lock_order)
+    
+    def _upsert_chunk(self, cursor, rows: List[tuple]) -> List[int]:
+        """COPY (property params, raw_data) rows into a staging table and upsert them in one statement"""
+        columns = ', '.join(PROPERTY_COLUMNS)
+        # Session-local; emptied at commit and before each chunk
+        cursor.execute(f'''
+            CREATE TEMP TABLE IF NOT EXISTS property_staging ON COMMIT DELETE ROWS AS
+            SELECT 0 AS position, {columns}, NULL::JSONB AS raw_data FROM properties WITH NO DATA
+        ''')
+        cursor.execute('TRUNCATE property_staging')
+        cursor.copy_expert(
+            f'COPY property_staging (position, {columns}, raw_data) FROM STDIN',
+            _copy_buffer((position, *params, raw_data) for position, (params, raw_data) in enumerate(rows))
+        )
+        
+        # A listing repeated within the chunk keeps its last copy, as sequential upserts would
+        key = 'source, listing_id, address'
+        cursor.execute(f'''
+            WITH latest AS (
+                SELECT DISTINCT ON ({key}) *
+                FROM property_staging
+                ORDER BY {key}, position DESC
+            ),
+            upserted AS (
+                INSERT INTO properties ({columns})
+                SELECT {columns} FROM latest ORDER BY position
+                ON CONFLICT ({key}) DO UPDATE SET
+                    {', '.join(f'{column} = EXCLUDED.{column}' for column in PROPERTY_UPDATE_COLUMNS)},
+                    updated_at = {self.current_time_sql}
+                RETURNING id, {key}
+            ),
+            raw_written AS (
+                INSERT INTO property_raw_data (property_id, raw_data)
+                SELECT u.id, l.raw_data FROM upserted u JOIN latest l USING ({key})
+                WHERE l.raw_data IS NOT NULL
+                ON CONFLICT (property_id) DO UPDATE SET raw_data = EXCLUDED.raw_data
+                WHERE property_raw_data.raw_data IS DISTINCT FROM EXCLUDED.raw_data
+            ),
+            raw_cleared AS (
+                DELETE FROM property_raw_data r
+                USING upserted u JOIN latest l USING ({key})
+                WHERE r.property_id = u.id AND l.raw_data IS NULL
+            )
+            SELECT id, {key} FROM upserted
+        ''')
+        
+        # Key columns are TEXT, so compare them as text
+        ids = {tuple(row[1:]): row[0] for row in cursor.fetchall()}
+        return [ids[tuple(str(value) for value in params[:3])] for params, _ in rows]
+    
+    def _insert_analyses(self, cursor, rows: List[tuple]):
+        """COPY analysis rows as built by _analysis_params"""
+        cursor.copy_expert(f"COPY property_analysis ({', '.join(ANALYSIS_COLUMNS)}) FROM STDIN", _copy_buffer(rows))
+    
+    def _analysis_values(self, analysis: Dict[str, Any]) -> tuple:
+        """ANALYSIS_COLUMNS values after property_id, with each section serialized for its JSONB column"""
+        component_scores = analysis.get('component_scores', {})
+        return (
+            analysis.get('viable', False),
+            analysis.get('viability_score', 0),
+            *[json.dumps(analysis[section]) if section in analysis else None for section in ANALYSIS_SECTIONS],
+            analysis.get('analysis_date', datetime.now().isoformat()),
+            *[component_scores.get(component) for component in COMPONENT_SCORE_COLUMNS.values()],
+            analysis.get('property_hash'),
+            analysis.get('config_hash')
+        )
+    
+    def _insert_rows(self, cursor, table: str, columns: Sequence[str], rows: List[tuple], conflict: str = ''):
+        """Insert rows with multi-row VALUES lists (execute_values) instead of a statement per row"""
+        psycopg2.extras.execute_values(cursor, f'INSERT INTO {table} ({", ".join(columns)}) VALUES %s {conflict}', rows)
+    
+    def _update_component_scores(self, cursor, updates: List[tuple]):
+        """Write (analysis id, *component scores) rows with one UPDATE ... FROM (VALUES ...) statement"""
+        psycopg2.extras.execute_values(cursor, f'''
+            UPDATE property_analysis pa SET
+                {', '.join(f'{column} = v.{column}' for column in COMPONENT_SCORE_COLUMNS)}
+            FROM (VALUES %s) AS v (id, {', '.join(COMPONENT_SCORE_COLUMNS)})
+            WHERE pa.id = v.id
+        ''', updates, template='(%s' + ', %s::DOUBLE PRECISION' * len(COMPONENT_SCORE_COLUMNS) + ')')
+    
+    def _search_match(self, query: str) -> str:
+        """to_tsquery expression for a free-text query"""
+        return _tsquery_expression(query)
+    
+    def _search_sql(self, select_list: str, analysis_join: str, conditions: List[str]) -> str:
+        """Search through the GIN-indexed search_vector, ranked by ts_rank"""
+        # ts_headline is costly, so PostgreSQL defers it until after the LIMIT
+        return f'''
+            SELECT {select_list}, ts_rank(p.search_vector, q.query) AS search_rank,
+                   ts_headline('{SEARCH_CONFIG}', COALESCE(p.description, ''), q.query,
+                               'StartSel=[, StopSel=], MaxWords=16, MinWords=6, MaxFragments=1, FragmentDelimiter=...')
+                       AS snippet
+            FROM to_tsquery('{SEARCH_CONFIG}', ?) AS q (query)
+            JOIN properties p ON p.search_vector @@ q.query
+            LEFT JOIN current_analysis ca ON ca.property_id = p.id
+            {analysis_join}
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY search_rank DESC, p.id
+            LIMIT ?
+        '''
+    
+    def _event_value(self, value: Any) -> Any:
+        """A property_events JSONB value decoded to the listing value"""
+        return json.loads(value) if value is not None else None
+    
+    def _first_price_change_sql(self, since: str) -> str:
+        """First price change per property at or after since"""
+        return f'''
+            SELECT DISTINCT ON (property_id) property_id,
+                   CASE WHEN jsonb_typeof(old_value) = 'number' THEN old_value::DOUBLE PRECISION END
+                       AS previous_price,
+                   ts AS first_change_at
+            FROM property_events
+            WHERE field = 'price' AND ts >= {since}
+            ORDER BY property_id, id
+        '''
+    
+    def _database_size(self, cursor) -> int:
+        """Bytes in the database, including indexes and TOAST"""
+        cursor.execute('SELECT pg_database_size(current_database())')
+        return cursor.fetchone()[0]
+    
+    def _space_stats(self, cursor) -> Dict[str, Any]:
+        """Rows awaiting (auto)vacuum"""
+        cursor.execute('SELECT COALESCE(SUM(n_dead_tup), 0) FROM pg_stat_user_tables')
+        return {'dead_rows': int(cursor.fetchone()[0])}
@@ -0,0 +1,136 @@
+"""
+Retention Manager - Prunes history tables and returns freed pages to the filesystem
+Deletes run in small id-ordered batches, each its own short write transaction
+"""
+
+from typing import Dict, Any, Optional
+from loguru import logger
+
+# History tables pruned by age: table -> (timestamp column, retention config key, default days)
+AGED_TABLES = {
+    'notifications': ('sent_at', 'notifications_days', 180),
+    'search_history': ('search_date', 'search_history_days', 365),
+    'property_events': ('ts', 'property_events_days', 730)
+}
+
+class RetentionManager:
+    """Applies retention policies to the analysis history and log tables"""
+    
+    def __init__(self, connections, retention_config: Optional[Dict[str, Any]] = None):
+        """Initialize with the database ConnectionManager and retention configuration"""
+        retention_config = retention_config or {}
+        self.connections = connections
+        self.enabled = retention_config.get('enabled', True)
+        self.batch_size = retention_config.get('batch_size', 500)
+        self.vacuum_pages_per_step = retention_config.get('vacuum_pages_per_step', 1000)
+        
+        # Analyses: every run for keep_all_days, then the latest per property per week until
+        # snapshot_days; older runs are dropped. The current analysis is always kept.
+        self.analysis_keep_all_days = retention_config.get('analysis_keep_all_days', 14)
+        self.analysis_snapshot_days = retention_config.get('analysis_snapshot_days', 180)
+        self.table_days = {
+            table: retention_config.get(key, default) for table, (_, key, default) in AGED_TABLES.items()
+        }
+    
+    def run(self) -> Dict[str, Any]:
+        """Apply all retention policies, then release freed pages; returns rows deleted and bytes reclaimed"""
+        if not self.enabled:
+            return {'deleted': {}, 'bytes_reclaimed': 0}
+        
+        deleted = {'property_analysis': self._prune_analyses()}
+        for table, (time_column, _, _) in AGED_TABLES.items():
+            if self.table_days[table] is not None:
+                deleted[table] = self._delete_in_batches(
+                    table, time_column, f'-{int(self.table_days[table])} days'
+                )
+        
+        bytes_reclaimed = self._incremental_vacuum()
+        self._record(sum(deleted.values()), bytes_reclaimed)
+        logger.info(f"Compaction deleted {sum(deleted.values())} rows ({deleted}), "
+                    f"reclaimed {bytes_reclaimed / (1024 * 1024):.2f} MB")
+        return {'deleted': deleted, 'bytes_reclaimed': bytes_reclaimed}
+    
+    def _prune_analyses(self) -> int:
+        """Delete superseded analyses outside the keep-all window, keeping weekly snapshots"""
+        # A run is kept while it is the newest for its property within its week ('%Y-%W')
+        condition = '''
+            NOT EXISTS (
+                SELECT 1 FROM current_analysis ca
+                WHERE ca.property_id = t.property_id AND ca.analysis_id = t.id
+            )
+            AND (
+                t.created_at < datetime('now', ?)
+                OR EXISTS (
+                    SELECT 1 FROM property_analysis newer
+                    WHERE newer.property_id = t.property_id AND newer.id > t.id
+                      AND strftime('%Y-%W', newer.created_at) = strftime('%Y-%W', t.created_at)
+                )
+            )
+        '''
+        return self._delete_in_batches(
+            'property_analysis', 'created_at', f'-{int(self.analysis_keep_all_days)} days',
+            condition, [f'-{int(self.analysis_snapshot_days)} days']
+        )
+    
+    def _delete_in_batches(self, table: str, time_column: str, cutoff: str,
+                           condition: str = '1', condition_params: Optional[list] = None) -> int:
+        """Delete rows older than cutoff (and matching condition), batch_size ids per transaction
+        
+        Rows are walked in id order, which follows insertion time, so the walk stops at the
+        first batch that starts inside the retention window.
+        """
+        deleted = 0
+        last_id = 0
+        conn = self.connections.connection()
+        while True:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT MAX(id), MIN({time_column} >= datetime('now', ?)) FROM (
+                        SELECT id, {time_column} FROM {table} WHERE id > ? ORDER BY id LIMIT ?
+                    )
+                ''', (cutoff, last_id, self.batch_size))
+                batch_end, all_in_window = cursor.fetchone()
+                if batch_end is None or all_in_window:
+                    return deleted
+                
+                cursor.execute(f'''
+                    DELETE FROM {table} AS t
+                    WHERE t.id > ? AND t.id <= ? AND t.{time_column} < datetime('now', ?) AND {condition}
+                ''', [last_id, batch_end, cutoff] + (condition_params or []))
+                deleted += cursor.rowcount
+                last_id = batch_end
+    
+    def _incremental_vacuum(self) -> int:
+        """Return free pages to the filesystem in steps; returns bytes reclaimed"""
+        conn = self.connections.connection()
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            logger.warning("auto_vacuum is not INCREMENTAL; freed pages stay in the database file")
+            return 0
+        
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        while free_pages:
+            # Small steps keep each truncation's write lock short
+            conn.execute(f'PRAGMA incremental_vacuum({min(free_pages, self.vacuum_pages_per_step)})').fetchall()
+            remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if remaining >= free_pages:
+                break
+            free_pages = remaining
+        reclaimed_pages = page_count - conn.execute('PRAGMA page_count').fetchone()[0]
+        
+        # In WAL mode the file only shrinks once the truncated pages are checkpointed
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        return reclaimed_pages * page_size
+    
+    def _record(self, rows_deleted: int, bytes_reclaimed: int):
+        """Add this run's totals to the compaction counters shown in database stats"""
+        conn = self.connections.connection()
+        with conn:
+            conn.executemany('''
+                INSERT INTO counters (scope, key, count, total) VALUES ('compaction', ?, 1, ?)
+                ON CONFLICT(scope, key) DO UPDATE SET
+                    count = count + excluded.count,
+                    total = total + excluded.total
+            ''', [('rows_deleted', rows_deleted), ('bytes_reclaimed', bytes_reclaimed)])
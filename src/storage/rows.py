@@ -0,0 +1,74 @@
+"""
+Property Rows - Lazily decoded property query results
+JSON columns and the analysis blob are decoded on first access and cached on the row
+"""
+
+import json
+from collections.abc import MutableMapping
+from typing import Dict, Any, Iterator, Sequence
+from storage.analysis_codec import ANALYSIS_SECTIONS, AnalysisRecord
+
+# JSON columns on properties, with the value used when a column is empty
+JSON_COLUMN_DEFAULTS = {
+    'images': list,
+    'contact_info': dict,
+    'raw_data': dict
+}
+
+class PropertyRow(MutableMapping):
+    """Mapping over one joined property/analysis row that decodes on demand
+    
+    Plain columns (address, price, viability_score, ...) are returned as stored. JSON
+    columns and analysis sections are decoded the first time they are read, so callers
+    that only show a few scalar fields never pay for decoding.
+    """
+    
+    __slots__ = ('_values', '_pending', '_record')
+    
+    def __init__(self, columns: Sequence[str], row: Sequence[Any]):
+        values = dict(zip(columns, row))
+        blob = values.pop('analysis_blob', None)
+        self._record = AnalysisRecord(blob) if blob is not None else None
+        self._values = values
+        
+        # Keys whose stored value is still encoded
+        self._pending = {key for key in JSON_COLUMN_DEFAULTS if key in values}
+        self._pending.update(section for section in ANALYSIS_SECTIONS if section in values)
+    
+    def _decode(self, key: str):
+        """Decode one pending key from its JSON column or the analysis blob"""
+        if key in JSON_COLUMN_DEFAULTS:
+            value = self._values[key]
+            return json.loads(value) if value else JSON_COLUMN_DEFAULTS[key]()
+        if self._record is not None:
+            return getattr(self._record, key)
+        # Legacy rows stored each section as its own JSON column
+        value = self._values[key]
+        return json.loads(value) if value else ([] if key == 'recommendations' else {})
+    
+    def __getitem__(self, key: str):
+        if key in self._pending:
+            self._values[key] = self._decode(key)
+            self._pending.discard(key)
+        return self._values[key]
+    
+    def __setitem__(self, key: str, value):
+        self._values[key] = value
+        self._pending.discard(key)
+    
+    def __delitem__(self, key: str):
+        del self._values[key]
+        self._pending.discard(key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+    
+    def __len__(self) -> int:
+        return len(self._values)
+    
+    def __repr__(self) -> str:
+        return f"PropertyRow(id={self._values.get('id')!r}, address={self._values.get('address')!r})"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Fully decoded plain dict (e.g. for JSON responses)"""
+        return {key: self[key] for key in self._values}
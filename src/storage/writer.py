@@ -0,0 +1,198 @@
+"""
+Background Writer - Write-behind queue applied by a single writer thread
+Queued writes are grouped into one transaction per batch (group commit), so producers
+never wait on a commit unless the queue is full
+"""
+
+import atexit
+import queue
+import threading
+import time
+import weakref
+from typing import Dict, Any, Callable, List, Optional
+from loguru import logger
+
+# Queue markers: _FLUSH wakes the writer to end the current batch, _STOP ends the writer after the batch
+_FLUSH = object()
+_STOP = object()
+
+# Writers with a running thread; daemon threads are not joined at exit, so one hook drains them all
+_live_writers = weakref.WeakSet()
+
+@atexit.register
+def _close_live_writers():
+    """Commit whatever every live writer still has queued before the interpreter exits"""
+    for writer in list(_live_writers):
+        writer.close()
+
+class BackgroundWriter:
+    """Applies queued writes on one thread, committing them in batches"""
+    
+    def __init__(self, connections, writer_config: Optional[Dict[str, Any]] = None):
+        """Initialize with the database ConnectionManager and write-behind configuration"""
+        writer_config = writer_config or {}
+        self.connections = connections
+        self.enabled = writer_config.get('enabled', True)
+        self.max_batch = writer_config.get('max_batch', 1000)  # Writes per commit
+        self.max_delay = writer_config.get('max_delay_ms', 200) / 1000  # Longest a write waits for others to join its commit
+        self.max_pending = writer_config.get('max_pending', 10000)  # submit blocks while this many writes are queued
+        
+        self.failed = 0  # Writes dropped after their retry failed
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._condition = threading.Condition()
+        self._flush_requested = threading.Event()
+        self._submitted = 0
+        self._completed = 0
+        self._thread = None
+        self._closed = False
+    
+    def submit(self, handler: Callable[[Any, List[Any]], None], payload: Any, timeout: Optional[float] = None):
+        """Queue one write; handler(cursor, payloads) applies a run of payloads in the writer thread
+        
+        Consecutive writes with the same handler reach it together, so it can use executemany.
+        When max_pending writes are queued this blocks (back-pressure), raising queue.Full after
+        timeout seconds if given. With the writer disabled the write is applied immediately.
+        """
+        if not self.enabled:
+            with self.connections.connection() as conn:
+                handler(conn.cursor(), [payload])
+            return
+        
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Background writer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+                _live_writers.add(self)
+            self._submitted += 1
+        
+        try:
+            self._queue.put((handler, payload), timeout=timeout)
+        except queue.Full:
+            self._complete(1)  # Never queued, so flush() must not wait for it
+            raise
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every write submitted before this call is committed; False on timeout"""
+        with self._condition:
+            target = self._submitted
+            if self._thread is None or self._completed >= target:
+                return True
+        
+        # Signalled outside the bounded queue so flush never waits for a free slot; the marker
+        # only wakes a writer idling out max_delay, which it cannot be doing while the queue is full
+        self._flush_requested.set()
+        try:
+            self._queue.put_nowait(_FLUSH)
+        except queue.Full:
+            pass
+        with self._condition:
+            return self._condition.wait_for(lambda: self._completed >= target, timeout)
+    
+    def pending(self) -> int:
+        """Writes submitted but not yet committed"""
+        with self._condition:
+            return self._submitted - self._completed
+    
+    def close(self, timeout: Optional[float] = None):
+        """Commit everything queued and stop the writer thread (safe to call more than once)"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(f"Background writer still had {self.pending()} writes pending at close")
+            else:
+                _live_writers.discard(self)
+    
+    def _complete(self, count: int):
+        """Mark writes as done and wake flush() callers"""
+        with self._condition:
+            self._completed += count
+            self._condition.notify_all()
+    
+    def _run(self):
+        """Writer loop: gather a batch, commit it, repeat until stopped"""
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.max_delay
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                if item is not _FLUSH:
+                    batch.append(item)
+                if len(batch) >= self.max_batch or self._flush_requested.is_set():
+                    break
+                # Let writes arriving within the window share this commit
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            
+            # Flushes requested from here on wait for writes gathered after this batch
+            self._flush_requested.clear()
+            if batch:
+                self._commit(batch)
+                self._complete(len(batch))
+    
+    def _commit(self, batch: List[tuple]):
+        """Apply a batch in one transaction, isolating failed writes with savepoints"""
+        # Runs of consecutive writes with the same handler
+        groups = []
+        for handler, payload in batch:
+            if groups and groups[-1][0] == handler:
+                groups[-1][1].append(payload)
+            else:
+                groups.append((handler, [payload]))
+        
+        try:
+            with self.connections.connection() as conn:
+                cursor = conn.cursor()
+                if getattr(conn, 'in_transaction', None) is False:
+                    cursor.execute('BEGIN')  # SQLite autocommits until told otherwise; psycopg2 opens one itself
+                for handler, payloads in groups:
+                    if self._apply(cursor, handler, payloads):
+                        continue
+                    # Retry one at a time so a single bad write does not drop the rest
+                    failed = payloads if len(payloads) == 1 else \
+                        [payload for payload in payloads if not self._apply(cursor, handler, [payload])]
+                    self.failed += len(failed)
+        
+        except Exception as e:
+            # The transaction itself failed (e.g. at COMMIT); retry each write in its own
+            logger.warning(f"Background commit of {len(batch)} writes failed, retrying one at a time: {e}")
+            for handler, payload in batch:
+                try:
+                    with self.connections.connection() as conn:
+                        cursor = conn.cursor()
+                        if getattr(conn, 'in_transaction', None) is False:
+                            cursor.execute('BEGIN')
+                        handler(cursor, [payload])
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Background write failed in {getattr(handler, '__name__', handler)}: {e}")
+    
+    @staticmethod
+    def _apply(cursor, handler: Callable, payloads: List[Any]) -> bool:
+        """Run a handler inside a savepoint, undoing its changes if it fails"""
+        cursor.execute('SAVEPOINT background_write')
+        try:
+            handler(cursor, payloads)
+            cursor.execute('RELEASE background_write')
+            return True
+        
+        except Exception as e:
+            cursor.execute('ROLLBACK TO background_write')
+            cursor.execute('RELEASE background_write')
+            if len(payloads) == 1:
+                logger.error(f"Background write failed in {getattr(handler, '__name__', handler)}: {e}")
+            return False
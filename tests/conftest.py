@@ -0,0 +1,61 @@
+"""
+Shared pytest fixtures for AFH Property Scout
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+COUNTIES = ['King County', 'Pierce County', 'Thurston County', 'Lewis County', 'King/Lewis',
+            'Clark County', '']
+WABO_STATUSES = ['approved', 'inspected', 'mentioned', 'none', 'unknown', '', 'other']
+PROPERTY_TYPES = ['1st floor rambler', 'Two Story', 'multi-level', 'single story', 'house', '']
+DESCRIPTION_WORDS = ['dshs', 'licensed', 'inspection', 'ready', 'turnkey', 'renovated',
+                     'needs work', 'fixer', 'nice', 'large']
+
+def make_properties(count, seed=0):
+    """Deterministic synthetic listings covering every encoded category and score threshold"""
+    rng = random.Random(seed)
+    properties = []
+    for index in range(count):
+        properties.append({
+            'address': f'{index} Main St',
+            'city': 'Tacoma',
+            'source': 'zillow',
+            'listing_id': str(index),
+            'price': rng.choice([0, rng.uniform(100000, 2000000), 300000, 400000, 1200000, 1500000]),
+            'bedrooms': rng.randint(0, 7),
+            'bathrooms': rng.choice([0, 1, 2, 2.5, 3, 4]),
+            'sqft': rng.choice([0, rng.randint(800, 5000), 2000, 2200, 2500]),
+            'county': rng.choice(COUNTIES),
+            'wabo_status': rng.choice(WABO_STATUSES),
+            'property_type': rng.choice(PROPERTY_TYPES),
+            'description': ' '.join(rng.sample(DESCRIPTION_WORDS, rng.randint(0, 4)))
+        })
+    return properties
+
+@pytest.fixture(scope='session')
+def settings():
+    with open(ROOT / 'config' / 'settings.yaml', 'r') as file:
+        return yaml.safe_load(file)
+
+@pytest.fixture(scope='session')
+def analysis_config(settings):
+    return settings['afh_analysis']
+
+@pytest.fixture
+def properties():
+    return make_properties(500)
+
+@pytest.fixture
+def db_manager(tmp_path):
+    from storage.database import DatabaseManager
+    manager = DatabaseManager({'path': str(tmp_path / 'afh_properties.db')})
+    yield manager
+    manager.close()
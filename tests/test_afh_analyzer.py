@@ -0,0 +1,107 @@
+"""
+Tests for the scalar and vectorized AFH analyzer paths
+"""
+
+import pytest
+
+from analyzers import afh_analyzer as afh_analyzer_module
+from analyzers.afh_analyzer import AFHAnalyzer, encode_properties
+from analyzers.comps_engine import CompsEngine
+
+COMPONENTS = ('basic', 'financial', 'market', 'wabo', 'risk')
+
+@pytest.fixture
+def analyzer(analysis_config):
+    return AFHAnalyzer(analysis_config)
+
+def test_batch_matches_scalar(analyzer, properties):
+    batch = analyzer.analyze_batch(**encode_properties(properties))
+    
+    for index, property_data in enumerate(properties):
+        scalar = analyzer.score_property(property_data)
+        row = batch.iloc[index]
+        assert row['viability_score'] == scalar['viability_score']
+        assert bool(row['viable']) == scalar['viable']
+        for component in COMPONENTS:
+            assert row[f'{component}_score'] == scalar['component_scores'][component]
+        assert row['monthly_cash_flow'] == scalar['financial_analysis']['monthly_cash_flow']
+        assert row['optimal_price'] == scalar['pricing_analysis']['optimal_price']
+
+def test_batch_flags_lewis_in_multi_county_names(analyzer):
+    properties = [
+        {'price': 500000, 'bedrooms': 4, 'bathrooms': 2, 'sqft': 2400, 'county': county}
+        for county in ('King/Lewis', 'Lewis County', 'King County')
+    ]
+    batch = analyzer.analyze_batch(**encode_properties(properties))
+    
+    scalar_risk = [analyzer.score_property(p)['component_scores']['risk'] for p in properties]
+    assert batch['risk_score'].tolist() == scalar_risk
+    assert scalar_risk[0] == scalar_risk[1] == scalar_risk[2] + 10
+
+def test_narrative_is_built_on_demand(analyzer, properties):
+    for property_data in properties[:50]:
+        scored = analyzer.score_property(property_data)
+        assert 'recommendations' not in scored
+        assert 'negotiation_strategy' not in scored['pricing_analysis']
+        
+        full = analyzer.analyze_property(property_data, include_narrative=True)
+        narrated = analyzer.add_narrative(scored, property_data)
+        assert narrated['recommendations'] == full['recommendations']
+        assert narrated['pricing_analysis']['negotiation_strategy'] == full['pricing_analysis']['negotiation_strategy']
+        assert analyzer.add_narrative(narrated, property_data)['recommendations'] == full['recommendations']
+
+def test_narrative_defaults_to_viable_properties(analyzer, properties):
+    for property_data in properties[:50]:
+        analysis = analyzer.analyze_property(property_data)
+        assert ('recommendations' in analysis) == analysis['viable']
+
+@pytest.mark.parametrize('key, value', [
+    ('parallel', {'workers': 8}),
+    ('pricing_grid', {'cash_flow_targets': [2500]}),
+    ('sensitivity', {'scenarios': 500}),
+    ('loan_products', [{'name': 'fha', 'interest_rate': 0.055, 'loan_to_value': 0.965}])
+])
+def test_config_hash_ignores_non_scoring_settings(analysis_config, key, value):
+    assert AFHAnalyzer(dict(analysis_config, **{key: value})).config_hash == AFHAnalyzer(analysis_config).config_hash
+
+def without_dates(analyses):
+    return [{key: value for key, value in analysis.items() if key != 'analysis_date'} for analysis in analyses]
+
+def parallel_analyzer(analysis_config, comps_engine=None, **parallel):
+    config = dict(analysis_config, parallel={'workers': 3, 'chunk_size': 7, 'min_batch': 1, **parallel})
+    return AFHAnalyzer(config, comps_engine=comps_engine)
+
+def fail_in_parent(*args, **kwargs):
+    pytest.fail('analyzed in the calling process')
+
+@pytest.mark.parametrize('with_comps', [False, True])
+def test_parallel_analysis_matches_serial_in_input_order(analysis_config, db_manager, properties, with_comps):
+    comps_engine = None
+    if with_comps:
+        db_manager.store_properties([{'property': property_data, 'analysis': {}} for property_data in properties])
+        comps_engine = CompsEngine(db_manager, analysis_config.get('market_comps', {}))
+    analyzer = parallel_analyzer(analysis_config, comps_engine)
+    batch = properties[:120]
+    serial = [analyzer.analyze_property(property_data) for property_data in batch]
+    
+    # Workers build their own analyzers, so only a serial fallback would reach this one
+    analyzer.analyze_property = fail_in_parent
+    parallel = analyzer.analyze_many(batch)
+    
+    assert without_dates(parallel) == without_dates(serial)
+
+def test_single_worker_analyzes_serially(analysis_config, properties, monkeypatch):
+    monkeypatch.setattr(afh_analyzer_module, 'ProcessPoolExecutor', fail_in_parent)
+    analyzer = parallel_analyzer(analysis_config, workers=1)
+    
+    analyses = analyzer.analyze_many(properties[:40])
+    assert without_dates(analyses) == without_dates([analyzer.analyze_property(p) for p in properties[:40]])
+
+def test_unavailable_pool_falls_back_to_serial(analysis_config, properties, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise OSError('no semaphores')
+    monkeypatch.setattr(afh_analyzer_module, 'ProcessPoolExecutor', unavailable)
+    analyzer = parallel_analyzer(analysis_config)
+    
+    analyses = analyzer.analyze_many(properties[:40])
+    assert without_dates(analyses) == without_dates([analyzer.analyze_property(p) for p in properties[:40]])
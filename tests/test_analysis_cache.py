@@ -0,0 +1,52 @@
+"""
+Tests for the analysis cache
+"""
+
+import pytest
+
+from analyzers.afh_analyzer import AFHAnalyzer
+from analyzers.analysis_cache import AnalysisCache
+
+def reweighted(analysis_config):
+    weights = {'basic': 0.10, 'financial': 0.50, 'market': 0.10, 'wabo': 0.20, 'risk': 0.10}
+    return AFHAnalyzer(dict(analysis_config, viability_weights=weights, viability_threshold=60))
+
+def test_new_weights_reuse_cached_analyses(db_manager, analysis_config, properties, monkeypatch):
+    AnalysisCache(AFHAnalyzer(analysis_config), db_manager).analyze_properties(properties)
+    assert db_manager.flush(timeout=10)
+    
+    analyzer = reweighted(analysis_config)
+    monkeypatch.setattr(analyzer, 'analyze_many', lambda batch: pytest.fail('cached listings were re-analyzed') if batch else [])
+    analyses = AnalysisCache(analyzer, db_manager).analyze_properties(properties)
+    
+    expected = [analyzer.analyze_property(property_data) for property_data in properties]
+    assert [analysis['viability_score'] for analysis in analyses] == [analysis['viability_score'] for analysis in expected]
+    assert [analysis['viable'] for analysis in analyses] == [analysis['viable'] for analysis in expected]
+    assert [analysis.get('recommendations') for analysis in analyses] == \
+        [analysis.get('recommendations') for analysis in expected]
+
+def test_reweighted_hits_replace_stored_scores(db_manager, analysis_config, properties):
+    def store(analyzer):
+        analyses = AnalysisCache(analyzer, db_manager).analyze_properties(properties)
+        db_manager.store_properties([{'property': property_data, 'analysis': analysis}
+                                     for property_data, analysis in zip(properties, analyses)])
+        assert db_manager.flush(timeout=10)
+        return analyses
+    
+    original = [analysis['viability_score'] for analysis in store(AFHAnalyzer(analysis_config))]
+    analyses = store(reweighted(analysis_config))
+    store(reweighted(analysis_config))
+    
+    stored = {row['listing_id']: row['viability_score']
+              for row in db_manager.iter_properties(fields=('listing_id', 'viability_score'))}
+    assert stored == {property_data['listing_id']: analysis['viability_score']
+                      for property_data, analysis in zip(properties, analyses)}
+    # Only analyses whose score moved were stored again, and only once
+    changed = sum(1 for score, analysis in zip(original, analyses) if score != analysis['viability_score'])
+    assert changed
+    assert db_manager.get_database_stats()['property_analysis_count'] == len(properties) + changed
+
+def test_cache_key_joins_the_listing_key():
+    from analyzers.analysis_cache import cache_key
+    assert cache_key({'source': 'zillow', 'listing_id': 42, 'address': '1 Main St'}) == 'zillow|42|1 Main St'
+    assert cache_key({'address': '1 Main St'}) == '||1 Main St'
@@ -0,0 +1,53 @@
+"""
+Tests for the binary analysis codec
+"""
+
+import pytest
+
+from analyzers.afh_analyzer import AFHAnalyzer
+from storage.analysis_codec import (ANALYSIS_SCHEMA, CODEC_VERSION, AnalysisRecord,
+                                    decode_analysis, decode_numbers, encode_analysis)
+
+def test_round_trip_analyzer_output(analysis_config, properties):
+    analyzer = AFHAnalyzer(analysis_config)
+    for property_data in properties[:100]:
+        analysis = analyzer.analyze_property(property_data, include_narrative=True)
+        decoded = decode_analysis(encode_analysis(analysis))
+        assert decoded == analysis
+        assert list(decoded) == list(analysis)
+        assert list(decoded['financial_analysis']) == list(analysis['financial_analysis'])
+        assert type(decoded['financial_analysis']['loan_amount']) is type(analysis['financial_analysis']['loan_amount'])
+
+def test_round_trip_partial_and_extra_fields():
+    analysis = {
+        'viable': False,
+        'viability_score': 0,
+        'error': 'missing price',
+        'basic_analysis': {'issues': [], 'strengths': ['café', ''], 'notes': {'source': 'manual'}},
+        'financial_analysis': {'purchase_price': 'unknown'},
+        'recommendations': ['Line one', 'Line two']
+    }
+    assert decode_analysis(encode_analysis(analysis)) == analysis
+    assert decode_analysis(encode_analysis({})) == {}
+
+def test_decode_numbers_reads_slots_without_full_decode():
+    slots = [index for index, (path, _) in enumerate(ANALYSIS_SCHEMA)
+             if path in (('viable',), ('viability_score',), ('component_scores', 'risk'))]
+    blob = encode_analysis({'viable': True, 'viability_score': 72.5})
+    assert decode_numbers(blob, slots) == [True, 72.5, None]
+    
+    # Records carrying JSON extras must go through decode_analysis
+    assert decode_numbers(encode_analysis({'viability_score': 1, 'note': 'x'}), slots) is None
+
+def test_rejects_unknown_version():
+    blob = bytes([CODEC_VERSION + 1]) + encode_analysis({'viable': True})[1:]
+    with pytest.raises(ValueError):
+        decode_analysis(blob)
+
+def test_record_decodes_lazily():
+    analysis = {'viable': True, 'viability_score': 80.0, 'recommendations': ['Buy']}
+    record = AnalysisRecord(encode_analysis(analysis))
+    assert record.viable and record.viability_score == 80.0
+    assert record.recommendations == ['Buy']
+    assert record.pricing_analysis == {}
+    assert AnalysisRecord.from_analysis(analysis).blob == record.blob
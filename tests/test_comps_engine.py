@@ -0,0 +1,100 @@
+"""
+Tests for the comparable-sales engine
+"""
+
+import numpy as np
+import pytest
+
+from analyzers.afh_analyzer import AFHAnalyzer, county_code, encode_properties, listing_key
+from analyzers.comps_engine import CompsEngine
+
+def comparable(index, sqft, price):
+    return {
+        'source': 'zillow', 'listing_id': str(index), 'address': f'{index} Oak Ave',
+        'county': 'Pierce County', 'price': price, 'bedrooms': 4, 'bathrooms': 2, 'sqft': sqft
+    }
+
+@pytest.fixture
+def comps_engine(db_manager):
+    # One listing priced far above its neighbours at exactly the query point
+    listings = [comparable(index, 2000 + index * 10, 400000) for index in range(1, 8)]
+    listings.append(comparable(0, 2000, 2000000))
+    db_manager.store_properties([{'property': listing, 'analysis': {}} for listing in listings])
+    return CompsEngine(db_manager, {'k': 5, 'min_comps': 5})
+
+def test_subject_is_not_its_own_comparable(comps_engine):
+    subject = comparable(0, 2000, 2000000)
+    code = county_code(subject['county'])
+    
+    with_subject = comps_engine.local_price_per_sqft(code, 4, 2, 2000)
+    without_subject = comps_engine.local_price_per_sqft(code, 4, 2, 2000, listing_key(subject))
+    
+    assert without_subject == pytest.approx(400000 / 2030)
+    assert with_subject != without_subject
+    distances, _ = comps_engine.nearest(code, 4, 2, 2000, listing=listing_key(subject))
+    assert len(distances) == 5 and distances.min() > 0
+
+def test_exclusion_respects_min_comps(db_manager):
+    listings = [comparable(index, 2000 + index * 10, 400000) for index in range(5)]
+    db_manager.store_properties([{'property': listing, 'analysis': {}} for listing in listings])
+    engine = CompsEngine(db_manager, {'k': 5, 'min_comps': 5})
+    code = county_code('Pierce County')
+    
+    assert engine.local_price_per_sqft(code, 4, 2, 2000) is not None
+    assert engine.local_price_per_sqft(code, 4, 2, 2000, listing_key(listings[0])) is None
+
+def test_batch_matches_scalar_with_comps(comps_engine, analysis_config):
+    analyzer = AFHAnalyzer(analysis_config, comps_engine=comps_engine)
+    properties = [comparable(index, 2000 + index * 10, 400000 + index * 50000) for index in range(10)]
+    
+    batch = analyzer.analyze_batch(**encode_properties(properties))
+    scalar = [analyzer.score_property(property_data) for property_data in properties]
+    
+    assert batch['market_score'].tolist() == [analysis['component_scores']['market'] for analysis in scalar]
+    assert batch['viability_score'].tolist() == [analysis['viability_score'] for analysis in scalar]
+
+def test_refresh_rereads_writes_that_commit_late(comps_engine, db_manager):
+    code = county_code('Pierce County')
+    comps_engine.local_price_per_sqft(code, 4, 2, 2000)
+    watermark = comps_engine._last_updated_at
+    
+    # A write stamped before the last refresh but committed after it
+    with db_manager.connections.connection() as conn:
+        conn.execute("UPDATE properties SET price = 600000, updated_at = datetime(?, '-60 seconds') "
+                     "WHERE listing_id = '1'", (watermark,))
+    
+    assert comps_engine.refresh() == 1
+    assert comps_engine._dirty_counties == {code}
+    assert comps_engine._rows[comps_engine._listing_ids[listing_key(comparable(1, 2010, 0))]][4] == pytest.approx(600000 / 2010)
+    
+    # Re-read rows that did not change leave the index alone
+    comps_engine.local_price_per_sqft(code, 4, 2, 2000)
+    assert comps_engine.refresh() == 0
+    assert not comps_engine._dirty_counties
+
+def test_index_matches_a_brute_force_scan(db_manager):
+    rng = np.random.default_rng(5)
+    listings = [{
+        'source': 'zillow', 'listing_id': str(index), 'address': f'{index} Elm St', 'county': 'Pierce County',
+        'bedrooms': int(rng.integers(2, 7)), 'bathrooms': float(rng.choice([1, 1.5, 2, 3])),
+        'sqft': int(rng.integers(900, 4000)), 'price': float(rng.uniform(2e5, 9e5))
+    } for index in range(400)]
+    db_manager.store_properties([{'property': listing, 'analysis': {}} for listing in listings])
+    engine = CompsEngine(db_manager, {'k': 7, 'min_comps': 5})
+    code = county_code('Pierce County')
+    
+    scale = engine.feature_scale
+    features = np.array([[listing['bedrooms'], listing['bathrooms'], listing['sqft']] for listing in listings]) / scale
+    price_per_sqft = np.array([listing['price'] / listing['sqft'] for listing in listings])
+    for subject in listings[:40]:
+        query = np.array([subject['bedrooms'], subject['bathrooms'], subject['sqft'] + 25]) / scale
+        distances = np.sqrt(((features - query) ** 2).sum(axis=1))
+        distances[int(subject['listing_id'])] = np.inf  # the subject is not its own comparable
+        expected = np.argsort(distances)[:7]
+        
+        found, found_price_per_sqft = engine.nearest(code, subject['bedrooms'], subject['bathrooms'],
+                                                     subject['sqft'] + 25, listing=listing_key(subject))
+        np.testing.assert_allclose(found, distances[expected])
+        np.testing.assert_allclose(found_price_per_sqft, price_per_sqft[expected])
+        assert engine.local_price_per_sqft(code, subject['bedrooms'], subject['bathrooms'], subject['sqft'] + 25,
+                                           listing_key(subject)) == pytest.approx(np.median(price_per_sqft[expected]))
@@ -0,0 +1,64 @@
+"""
+Tests for per-thread SQLite connections
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from storage.connection import ConnectionManager
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ConnectionManager(str(tmp_path / 'connections.db'))
+    yield manager
+    manager.close()
+
+def run_in_thread(target):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=target()))
+    thread.start()
+    thread.join()
+    return result['value']
+
+def test_connection_is_reused_per_thread(manager):
+    conn = manager.connection()
+    assert manager.connection() is conn
+    assert run_in_thread(manager.connection) is not conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+def test_exited_threads_connections_are_closed(manager):
+    stale, stale_ident = run_in_thread(lambda: (manager.connection(), threading.get_ident()))
+    
+    # Open from new threads until one is given the exited thread's ident
+    for _ in range(100):
+        if run_in_thread(lambda: (manager.connection(), threading.get_ident())[1]) == stale_ident:
+            break
+    else:
+        pytest.skip('thread ident was not reused')
+    
+    with pytest.raises(sqlite3.ProgrammingError):
+        stale.execute('SELECT 1')
+    assert len(manager._connections) == 1
+
+def test_live_thread_connection_survives_ident_reuse(manager):
+    release = threading.Event()
+    opened = threading.Event()
+    holder = {}
+    
+    def hold():
+        holder['conn'] = manager.connection()
+        opened.set()
+        release.wait()
+        holder['conn'].execute('SELECT 1')
+    
+    thread = threading.Thread(target=hold)
+    thread.start()
+    opened.wait()
+    run_in_thread(manager.connection)
+    
+    # The long-lived thread's connection is still open while it runs
+    holder['conn'].execute('SELECT 1')
+    release.set()
+    thread.join()
@@ -0,0 +1,35 @@
+"""
+Tests for dashboard API parameter handling
+"""
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('plotly')
+
+from dashboard.dashboard import AFHDashboard, PRICE_GRID_LIMITS
+
+@pytest.fixture
+def client(db_manager, settings, properties):
+    db_manager.store_properties([{'property': property_data, 'analysis': {}} for property_data in properties[:5]])
+    dashboard = AFHDashboard(db_manager, settings)
+    return dashboard.app.test_client()
+
+def test_price_grid(client):
+    response = client.get('/api/price_grid?ids=1,2,3&targets=1000,2000&rates=0.05,0.06,0.07')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body['properties']) == 3
+    assert all(len(entry['max_price']) == 2 and len(entry['max_price'][0]) == 3 for entry in body['properties'])
+
+@pytest.mark.parametrize('name', sorted(PRICE_GRID_LIMITS))
+def test_price_grid_rejects_oversized_lists(client, name):
+    values = {'ids': '1', 'targets': '1000', 'rates': '0.06'}
+    values[name] = ','.join(['1'] * (PRICE_GRID_LIMITS[name] + 1))
+    response = client.get('/api/price_grid', query_string=values)
+    assert response.status_code == 400
+    assert name in response.get_json()['error']
+
+@pytest.mark.parametrize('query', ['ids=abc', 'ids=1&targets=x', 'ids=1&rates=nan', 'ids=1&targets=inf', 'ids='])
+def test_price_grid_rejects_invalid_values(client, query):
+    assert client.get(f'/api/price_grid?{query}').status_code == 400
@@ -0,0 +1,123 @@
+"""
+Tests for SQLite property storage
+"""
+
+import pytest
+
+def analyzed(properties):
+    return [{'property': property_data, 'analysis': {'viable': True, 'viability_score': 70.0}}
+            for property_data in properties]
+
+def test_unencodable_analysis_drops_only_its_row(db_manager, properties):
+    batch = analyzed(properties[:20])
+    batch[7]['analysis']['unserializable'] = object()  # stored as a JSON extra, which cannot encode it
+    
+    assert db_manager.store_properties(batch) == 19
+    stored = {row['listing_id'] for row in db_manager.iter_properties(fields=('listing_id',))}
+    assert stored == {property_data['listing_id'] for index, property_data in enumerate(properties[:20]) if index != 7}
+    assert db_manager.get_property_summary()['total'] == 19
+
+def query(db_manager, sql, params=()):
+    with db_manager.connections.connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+def test_current_analysis_tracks_latest_analysis(db_manager, analysis_config, properties):
+    from analyzers.afh_analyzer import AFHAnalyzer
+    analyzer = AFHAnalyzer(analysis_config)
+    
+    def latest_matches_current():
+        current = query(db_manager, '''
+            SELECT property_id, analysis_id, viable, viability_score, property_hash, config_hash
+            FROM current_analysis ORDER BY property_id
+        ''')
+        latest = query(db_manager, '''
+            SELECT pa.property_id, pa.id, pa.viable, pa.viability_score, pa.property_hash, pa.config_hash
+            FROM property_analysis pa
+            WHERE pa.id = (SELECT MAX(id) FROM property_analysis WHERE property_id = pa.property_id)
+            ORDER BY pa.property_id
+        ''')
+        return current == latest and len(current) == len(properties)
+    
+    db_manager.store_properties([{'property': p, 'analysis': analyzer.analyze_property(p)} for p in properties])
+    assert latest_matches_current()
+    
+    repriced = [dict(p, price=p['price'] * 0.9) for p in properties[::2]]
+    db_manager.store_properties([{'property': p, 'analysis': analyzer.analyze_property(p)} for p in repriced])
+    assert latest_matches_current()
+    assert query(db_manager, 'SELECT COUNT(*) FROM property_analysis')[0][0] == len(properties) + len(repriced)
+    
+    weights = {'basic': 0.1, 'financial': 0.6, 'market': 0.1, 'wabo': 0.1, 'risk': 0.1}
+    db_manager.rescore_analyses(weights, 50)
+    assert latest_matches_current()
+
+def counters_match_tables(db_manager):
+    """Trigger-maintained counters equal a rebuild from the underlying tables"""
+    counters_sql = 'SELECT scope, key, count, total FROM counters WHERE count != 0 ORDER BY scope, key'
+    with db_manager.connections.connection() as conn:
+        cursor = conn.cursor()
+        maintained = cursor.execute(counters_sql).fetchall()
+        db_manager._rebuild_counters(cursor)
+        rebuilt = cursor.execute(counters_sql).fetchall()
+        conn.rollback()
+    # Score sums accumulate in a different order, so totals compare after rounding
+    return [row[:3] + (round(row[3], 6),) for row in maintained] == [row[:3] + (round(row[3], 6),) for row in rebuilt]
+
+def test_counters_follow_writes(db_manager, analysis_config, properties):
+    from analyzers.afh_analyzer import AFHAnalyzer
+    analyzer = AFHAnalyzer(analysis_config)
+    
+    db_manager.store_properties([{'property': p, 'analysis': analyzer.analyze_property(p)} for p in properties])
+    assert counters_match_tables(db_manager)
+    
+    moved = [dict(p, county='Thurston County', wabo_status='approved', price=p['price'] + 1) for p in properties[:100]]
+    db_manager.store_properties([{'property': p, 'analysis': analyzer.analyze_property(p)} for p in moved])
+    db_manager.rescore_analyses({'basic': 0.2, 'financial': 0.2, 'market': 0.2, 'wabo': 0.2, 'risk': 0.2}, 60)
+    for property_id in range(1, 11):
+        db_manager.record_notification(property_id, 'new_property')
+    db_manager.record_search_history({'total_properties': len(properties)})
+    db_manager.flush()
+    assert counters_match_tables(db_manager)
+    
+    with db_manager.connections.connection() as conn:
+        conn.execute('DELETE FROM notifications WHERE property_id <= 5')
+        conn.execute('DELETE FROM current_analysis WHERE property_id > 450')
+    assert counters_match_tables(db_manager)
+    
+    summary = db_manager.get_property_summary()
+    stats = db_manager.get_database_stats()
+    assert summary['total'] == stats['properties_count'] == len(properties)
+    assert summary['viable'] == query(db_manager, 'SELECT COUNT(*) FROM current_analysis WHERE viable')[0][0]
+    assert summary['county_distribution']['Thurston County'] == query(
+        db_manager, "SELECT COUNT(*) FROM properties WHERE county = 'Thurston County'")[0][0]
+    assert stats['current_analysis_count'] == 450
+    assert stats['notifications_count'] == 5
+    assert stats['search_history_count'] == 1
+    assert sum(stats['viability_distribution'].values()) == 450
+
+def test_property_events_record_changes(db_manager):
+    listing = {'source': 'zillow', 'listing_id': '1', 'address': '1 Main St', 'price': 500000,
+               'bedrooms': 4, 'description': 'Rambler'}
+    other = dict(listing, listing_id='2', address='2 Main St', price=400000)
+    db_manager.store_properties([{'property': listing, 'analysis': {}}, {'property': other, 'analysis': {}}])
+    
+    # Re-seen without changes: nothing recorded
+    db_manager.store_properties([{'property': listing, 'analysis': {}}])
+    assert db_manager.get_property_events(1) == []
+    
+    db_manager.store_properties([{'property': dict(listing, price=450000, description='Rambler, ADA ramp'),
+                                  'analysis': {}}])
+    db_manager.store_properties([{'property': dict(listing, price=440000, description='Rambler, ADA ramp'),
+                                  'analysis': {}},
+                                 {'property': dict(other, price=398000), 'analysis': {}}])
+    
+    # One row per changed field; fields changed by the same update share a timestamp
+    changes = [(event['field'], event['old_value'], event['new_value']) for event in db_manager.get_property_events(1)]
+    assert sorted(changes[:2]) == [('description', 'Rambler', 'Rambler, ADA ramp'), ('price', 500000, 450000)]
+    assert changes[2:] == [('price', 450000, 440000)]
+    assert [event['new_value'] for event in db_manager.get_property_events(1, 'price')] == [450000, 440000]
+    
+    # Drops compare with the price before the first change in the window
+    drops = db_manager.get_price_drops(min_drop_percentage=5.0)
+    assert [(row['id'], row['previous_price']) for row in drops] == [(1, 500000)]
+    assert drops[0]['price_drop_percentage'] == pytest.approx(12.0)
+    assert len(db_manager.get_price_drops(min_drop_percentage=0.1)) == 2
@@ -0,0 +1,69 @@
+"""
+Tests for partitioned snapshot export
+"""
+
+import os
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from analyzers.afh_analyzer import AFHAnalyzer
+from storage.database import DatabaseManager
+from storage.export import SnapshotExporter
+
+@pytest.fixture
+def export_db(tmp_path, analysis_config, properties):
+    manager = DatabaseManager({'path': str(tmp_path / 'export.db'), 'export': {'chunk_size': 16}})
+    analyzer = AFHAnalyzer(analysis_config)
+    manager.store_properties([{'property': p, 'analysis': analyzer.analyze_property(p)} for p in properties])
+    with manager.connections.connection() as conn:
+        # Spread listings over months so partitions interleave in id order
+        conn.execute("UPDATE properties SET created_at = datetime(created_at, '-' || (id % 3) || ' months')")
+    yield manager
+    manager.close()
+
+def partition_files(path):
+    return [os.path.join(directory, name) for directory, _, names in os.walk(path) for name in names]
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow'])
+def test_export_writes_every_row_once_per_partition_file(export_db, tmp_path, export_format):
+    result = export_db.export_snapshot(str(tmp_path / 'exports'), export_format)
+    
+    table = ds.dataset(result['path'], format='parquet' if export_format == 'parquet' else 'ipc',
+                       partitioning='hive').to_table()
+    with export_db.connections.connection() as conn:
+        expected = conn.execute('''
+            SELECT id, NULLIF(county, ''), substr(created_at, 1, 7), price FROM properties ORDER BY id
+        ''').fetchall()
+    
+    assert result['rows'] == table.num_rows == len(expected)
+    rows = sorted(zip(*(table.column(name).to_pylist() for name in ('id', 'county', 'month', 'price'))))
+    assert rows == [tuple(row) for row in expected]
+    
+    # One file per county/month directory
+    partitions = {(county, month) for _, county, month, _ in expected}
+    files = partition_files(result['path'])
+    assert result['files'] == len(files) == len(partitions)
+    assert len({os.path.dirname(path) for path in files}) == len(files)
+
+def test_export_row_groups_are_bounded_by_chunk_size(export_db, tmp_path):
+    result = export_db.export_snapshot(str(tmp_path / 'exports'), 'parquet')
+    for path in partition_files(result['path']):
+        metadata = pq.ParquetFile(path).metadata
+        assert all(metadata.row_group(index).num_rows <= 2 * 16 for index in range(metadata.num_row_groups))
+
+def test_export_metrics_match_stored_analysis(export_db, tmp_path):
+    result = export_db.export_snapshot(str(tmp_path / 'exports'), 'parquet')
+    table = ds.dataset(result['path'], format='parquet', partitioning='hive').to_table()
+    exported = dict(zip(table.column('id').to_pylist(), table.column('financial_monthly_cash_flow').to_pylist()))
+    
+    for row in export_db.iter_properties(fields=('id', 'financial_analysis')):
+        assert exported[row['id']] == row['financial_analysis']['monthly_cash_flow']
+
+def test_export_query_streams_without_sorting(export_db):
+    with export_db.connections.connection() as conn:
+        plan = ' '.join(row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + SnapshotExporter._query()))
+    assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,88 @@
+"""
+Tests for the financing model and annuity factors
+"""
+
+import numpy as np
+import pytest
+
+from analyzers.financing import FinancingModel, LoanProduct, annuity_factors
+
+PRODUCTS = [
+    LoanProduct('conventional', 0.06, 30, 0.80),
+    LoanProduct('fifteen_year', 0.055, 15, 0.80),
+    LoanProduct('fha', 0.0575, 30, 0.965),
+    LoanProduct('seller_carry', 0.0, 10, 0.50)
+]
+
+def legacy_payment(price):
+    """Debt service as the analyzer computed it before the financing model (6%, 30 years, 80% LTV)"""
+    monthly_interest_rate = 0.06 / 12
+    num_payments = 30 * 12
+    growth = (1 + monthly_interest_rate)**num_payments
+    return price * 0.8 * (monthly_interest_rate * growth) / (growth - 1)
+
+def legacy_max_price(max_monthly_payment):
+    monthly_interest_rate = 0.06 / 12
+    num_payments = 30 * 12
+    growth = (1 + monthly_interest_rate)**num_payments
+    return max_monthly_payment * (growth - 1) / (monthly_interest_rate * growth) / 0.8
+
+def test_defaults_reproduce_the_legacy_terms():
+    financing = FinancingModel({})
+    assert financing.default_product == LoanProduct('default', 0.06, 30, 0.8)
+    for price in (150000, 525000.5, 1800000):
+        assert financing.monthly_payment(financing.loan_amount(price)) == pytest.approx(legacy_payment(price), rel=1e-12)
+    assert financing.max_purchase_price(4321.0) == pytest.approx(legacy_max_price(4321.0), rel=1e-12)
+
+@pytest.mark.parametrize('product', PRODUCTS, ids=[product.name for product in PRODUCTS])
+def test_payment_and_max_price_are_inverses(product):
+    financing = FinancingModel({})
+    prices = np.array([100000.0, 437500.0, 2500000.0])
+    
+    payments = financing.monthly_payment(financing.loan_amount(prices, product), product)
+    np.testing.assert_allclose(financing.max_purchase_price(payments, product), prices, rtol=1e-12)
+    payment_factor, inverse_payment_factor = annuity_factors(product.interest_rate, product.term_years)
+    assert payment_factor * inverse_payment_factor == pytest.approx(1.0, rel=1e-12)
+
+def test_zero_interest_rate_spreads_principal_evenly():
+    financing = FinancingModel({'interest_rate': 0.0, 'loan_term_years': 10, 'loan_to_value': 0.5})
+    
+    assert annuity_factors(0.0, 10) == (1 / 120, 120.0)
+    assert financing.monthly_payment(financing.loan_amount(240000)) == pytest.approx(1000)
+    assert financing.max_purchase_price(1000) == pytest.approx(240000)
+
+def test_evaluate_products_matches_each_product_alone():
+    financing = FinancingModel({})
+    prices = np.array([0.0, 250000.0, 640000.0, 1300000.0])
+    net_income = np.array([2000.0, 6500.0, 9000.0, 4000.0])
+    
+    results = financing.evaluate_products(prices, net_income, cash_flow_target=3000, products=PRODUCTS)
+    
+    for row, product in enumerate(PRODUCTS):
+        for column, (price, income) in enumerate(zip(prices, net_income)):
+            loan_amount = financing.loan_amount(price, product)
+            payment = financing.monthly_payment(loan_amount, product)
+            assert results['loan_amount'][row, column] == pytest.approx(loan_amount)
+            assert results['monthly_payment'][row, column] == pytest.approx(payment)
+            assert results['monthly_cash_flow'][row, column] == pytest.approx(income - payment)
+            assert results['dscr'][row, column] == pytest.approx(income / payment if payment > 0 else 0.0)
+            expected_max = financing.max_purchase_price(income - 3000, product) if income > 3000 else 0.0
+            assert results['max_price'][row, column] == pytest.approx(expected_max)
+
+def test_configured_products_follow_the_default():
+    financing = FinancingModel({'interest_rate': 0.065, 'loan_products': [
+        {'name': 'fha', 'loan_to_value': 0.965},
+        {'name': 'fifteen_year', 'interest_rate': 0.055, 'term_years': 15}
+    ]})
+    
+    assert [product.name for product in financing.products] == ['default', 'fha', 'fifteen_year']
+    assert financing.products[1] == LoanProduct('fha', 0.065, 30, 0.965)
+    assert financing.products[2] == LoanProduct('fifteen_year', 0.055, 15, 0.8)
+
+def test_analyzer_defaults_reproduce_the_legacy_figures(properties):
+    from analyzers.afh_analyzer import AFHAnalyzer
+    analyzer = AFHAnalyzer({})
+    for property_data in properties[:50]:
+        financial_analysis = analyzer.score_property(property_data)['financial_analysis']
+        assert financial_analysis['loan_amount'] == pytest.approx(property_data['price'] * 0.8)
+        assert financial_analysis['monthly_payment'] == pytest.approx(legacy_payment(property_data['price']), rel=1e-12)
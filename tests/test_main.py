@@ -0,0 +1,81 @@
+"""
+Tests for the command line entry points
+"""
+
+import importlib.util
+
+import pytest
+import yaml
+
+pytest.importorskip('dotenv')
+
+from main import AFHPropertyScout, build_parser
+from conftest import ROOT, make_properties
+
+@pytest.fixture
+def scout(tmp_path, settings):
+    config = dict(settings)
+    config['database'] = {'path': str(tmp_path / 'afh_properties.db')}
+    config['logging'] = {'level': 'WARNING', 'file': str(tmp_path / 'logs' / 'afh_scout.log')}
+    config_path = tmp_path / 'settings.yaml'
+    config_path.write_text(yaml.safe_dump(config))
+    scout = AFHPropertyScout(str(config_path))
+    yield scout
+    scout.db_manager.close()
+
+@pytest.mark.parametrize('argv', [
+    ['--portfolio', '--budget', '250000'],
+    ['--compact'],
+    ['--export'],
+    ['--export', 'snapshots', '--export-format', 'arrow'],
+    ['--rescore'],
+    ['--sensitivity'],
+    ['--sensitivity', '5']
+])
+def test_parser_accepts_maintenance_commands(argv):
+    args = build_parser().parse_args(argv)
+    assert args.portfolio or args.compact or args.rescore or args.export is not None or args.sensitivity
+
+def test_sensitivity_covers_top_stored_properties(scout):
+    analyzer = scout.afh_analyzer
+    scout.db_manager.store_properties([
+        {'property': property_data, 'analysis': analyzer.analyze_property(property_data)}
+        for property_data in make_properties(200)
+    ])
+    scout.sensitivity_analyzer.num_scenarios = 500
+    
+    results = scout.run_sensitivity(limit=5)
+    
+    top = scout.db_manager.get_top_properties(limit=5, min_score=analyzer.viability_threshold, fields=('address',))
+    assert [result['address'] for result in results] == [row['address'] for row in top]
+    for result in results:
+        assert 0 <= result['prob_min_cash_flow'] <= 1
+        assert result['cash_flow_p5'] <= result['cash_flow_p50'] <= result['cash_flow_p95']
+
+def test_portfolio_considers_every_viable_property(scout):
+    properties = make_properties(2500)
+    analyzer = scout.afh_analyzer
+    scout.db_manager.store_properties([
+        {'property': property_data, 'analysis': analyzer.analyze_property(property_data)}
+        for property_data in properties
+    ])
+    viable = scout.db_manager.get_property_summary()['viable']
+    assert viable > 1000
+    
+    portfolio = scout.optimize_portfolio()
+    eligible = scout.portfolio_optimizer.optimize(
+        scout.db_manager.get_top_properties(limit=viable, min_score=analyzer.viability_threshold)
+    )
+    assert portfolio['candidates_considered'] == eligible['candidates_considered']
+    assert portfolio['total_monthly_cash_flow'] == eligible['total_monthly_cash_flow']
+
+def test_startup_benchmark_covers_every_command():
+    spec = importlib.util.spec_from_file_location('benchmark_startup', ROOT / 'benchmark_startup.py')
+    benchmark = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(benchmark)
+    
+    options = {'budget', 'export_format', 'config', 'help'}
+    commands = {action.dest for action in build_parser()._actions if action.dest not in options}
+    assert set(benchmark.MODE_COMPONENTS) == commands
+    for components in benchmark.MODE_COMPONENTS.values():
+        assert all(hasattr(AFHPropertyScout, component) for component in components)
@@ -0,0 +1,90 @@
+"""
+Tests for keyset pagination over stored properties
+"""
+
+import pytest
+
+SORT_ORDERS = ['id', '-id', 'price', '-price', 'viability_score', '-viability_score']
+
+@pytest.fixture
+def paged_db(db_manager):
+    """Listings with NULL prices, NULL scores, repeated values and unanalyzed rows"""
+    batch = []
+    for index in range(40):
+        price = None if index % 5 == 0 else [300000, 450000, 450000, 600000][index % 4]
+        batch.append({
+            'property': {'source': 'zillow', 'listing_id': str(index), 'address': f'{index} Elm St', 'price': price},
+            'analysis': {'viable': index % 2 == 0, 'viability_score': float(index % 6 * 10)}
+        })
+    db_manager.store_properties(batch)
+    with db_manager.connections.connection() as conn:
+        conn.execute('UPDATE property_analysis SET viability_score = NULL WHERE property_id % 7 = 0')
+        conn.execute('DELETE FROM current_analysis WHERE property_id % 11 = 0')
+    return db_manager
+
+def expected_ids(db_manager, order_by, filters_sql=''):
+    """Reference order: SQLite sorts NULLs first ascending and last descending, ties by id"""
+    descending = order_by.startswith('-')
+    field = order_by.lstrip('-')
+    column = {'id': 'p.id', 'price': 'p.price', 'viability_score': 'ca.viability_score'}[field]
+    join = 'JOIN' if field == 'viability_score' else 'LEFT JOIN'
+    direction = 'DESC' if descending else 'ASC'
+    with db_manager.connections.connection() as conn:
+        rows = conn.execute(f'''
+            SELECT p.id FROM properties p {join} current_analysis ca ON ca.property_id = p.id
+            {filters_sql}
+            ORDER BY {column} {direction}, p.id {direction}
+        ''').fetchall()
+    return [row[0] for row in rows]
+
+def paged_ids(db_manager, order_by, page_size, filters=None):
+    ids = []
+    after = None
+    while True:
+        rows, after = db_manager.get_properties_page(filters, order_by, page_size, after, fields=('id',))
+        assert len(rows) <= page_size
+        ids.extend(row['id'] for row in rows)
+        if after is None:
+            return ids
+
+@pytest.mark.parametrize('order_by', SORT_ORDERS)
+@pytest.mark.parametrize('page_size', [1, 3, 8, 100])
+def test_pages_match_full_sort(paged_db, order_by, page_size):
+    assert paged_ids(paged_db, order_by, page_size) == expected_ids(paged_db, order_by)
+
+@pytest.mark.parametrize('order_by', ['price', '-price'])
+def test_null_run_spans_page_boundaries(paged_db, order_by):
+    expected = expected_ids(paged_db, order_by)
+    with paged_db.connections.connection() as conn:
+        null_ids = {row[0] for row in conn.execute('SELECT id FROM properties WHERE price IS NULL')}
+    assert len(null_ids) == 8
+    
+    # Page size 3 splits the NULL run, so pages seek both into and out of it
+    assert paged_ids(paged_db, order_by, 3) == expected
+    null_positions = [position for position, property_id in enumerate(expected) if property_id in null_ids]
+    assert null_positions == list(range(8)) if order_by == 'price' else list(range(32, 40))
+
+@pytest.mark.parametrize('order_by', ['viability_score', '-viability_score'])
+def test_null_scores_and_unanalyzed_rows(paged_db, order_by):
+    with paged_db.connections.connection() as conn:
+        null_scores = conn.execute('SELECT COUNT(*) FROM current_analysis WHERE viability_score IS NULL').fetchone()[0]
+        analyzed = conn.execute('SELECT COUNT(*) FROM current_analysis').fetchone()[0]
+    assert null_scores == 5 and analyzed == 37
+    
+    # Score order only covers analyzed properties
+    ids = paged_ids(paged_db, order_by, 2)
+    assert len(ids) == analyzed and ids == expected_ids(paged_db, order_by)
+
+def test_filters_apply_to_every_page(paged_db):
+    ids = paged_ids(paged_db, '-price', 4, {'min_price': 450000})
+    assert ids == expected_ids(paged_db, '-price', 'WHERE p.price >= 450000')
+
+def test_iter_properties_streams_all_rows(paged_db):
+    rows = list(paged_db.iter_properties(order_by='-viability_score', page_size=7, fields=('id', 'viability_score')))
+    assert [row['id'] for row in rows] == expected_ids(paged_db, '-viability_score')
+
+def test_invalid_arguments(paged_db):
+    with pytest.raises(ValueError):
+        paged_db.get_properties_page(order_by='address')
+    with pytest.raises(ValueError):
+        paged_db.get_properties_page(page_size=0)
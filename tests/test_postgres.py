@@ -0,0 +1,154 @@
+"""
+Tests for PostgreSQL property storage, checked against the SQLite backend
+
+Set TEST_DATABASE_URL to a PostgreSQL database to run them; each test works in its own
+schema, which is dropped afterwards.
+"""
+
+import os
+import uuid
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+from psycopg2.extensions import make_dsn
+
+from storage.postgres import PostgresDatabaseManager
+
+TEST_DSN = os.environ.get('TEST_DATABASE_URL')
+pytestmark = pytest.mark.skipif(not TEST_DSN, reason='TEST_DATABASE_URL is not set')
+
+ORDERS = ('id', '-id', 'price', '-price', 'created_at', 'updated_at', 'viability_score', '-viability_score')
+
+@pytest.fixture
+def pg_manager():
+    schema = f'afh_test_{uuid.uuid4().hex[:12]}'
+    admin = psycopg2.connect(TEST_DSN)
+    admin.autocommit = True
+    admin.cursor().execute(f'CREATE SCHEMA {schema}')
+    manager = PostgresDatabaseManager({'dsn': make_dsn(TEST_DSN, options=f'-csearch_path={schema}')})
+    yield manager
+    manager.close()
+    admin.cursor().execute(f'DROP SCHEMA {schema} CASCADE')
+    admin.close()
+
+@pytest.fixture
+def analyzed(analysis_config, properties):
+    from analyzers.afh_analyzer import AFHAnalyzer
+    analyzer = AFHAnalyzer(analysis_config)
+    return [{'property': property_data, 'analysis': analyzer.analyze_property(property_data)}
+            for property_data in properties]
+
+def listings(manager, **kwargs):
+    """Stored rows keyed by listing, without the backend-assigned ids and timestamps"""
+    rows = {}
+    for row in manager.iter_properties(**kwargs):
+        values = row.to_dict()
+        for name in ('id', 'created_at', 'updated_at'):
+            values.pop(name, None)
+        rows[(values['source'], values['listing_id'], values['address'])] = values
+    return rows
+
+def test_stored_rows_match_sqlite(pg_manager, db_manager, analyzed):
+    assert pg_manager.store_properties(analyzed) == db_manager.store_properties(analyzed) == len(analyzed)
+    
+    fields = ('id', 'source', 'listing_id', 'address', 'price', 'county', 'viable', 'viability_score',
+              'financial_analysis', 'images')
+    stored, expected = listings(pg_manager, fields=fields), listings(db_manager, fields=fields)
+    assert stored.keys() == expected.keys()
+    for key, values in expected.items():
+        assert stored[key]['viable'] == bool(values['viable'])
+        assert stored[key]['viability_score'] == pytest.approx(values['viability_score'])
+        assert stored[key]['financial_analysis'] == values['financial_analysis']
+        assert stored[key]['images'] == values['images']
+
+def test_unchanged_analyses_are_skipped(pg_manager, analyzed):
+    for item in analyzed:
+        item['analysis'].update(property_hash=item['property']['listing_id'], config_hash='config')
+    pg_manager.store_properties(analyzed)
+    pg_manager.store_properties(analyzed)
+    
+    stats = pg_manager.get_database_stats()
+    assert stats['property_analysis_count'] == stats['properties_count'] == len(analyzed)
+
+@pytest.mark.parametrize('order_by', ORDERS)
+def test_pages_cover_every_row_once_in_order(pg_manager, db_manager, analyzed, order_by):
+    pg_manager.store_properties(analyzed)
+    db_manager.store_properties(analyzed)
+    
+    paged = [row['id'] for row in pg_manager.iter_properties(order_by=order_by, page_size=7, fields=('id',))]
+    single, _ = pg_manager.get_properties_page(order_by=order_by, page_size=len(analyzed) + 1, fields=('id',))
+    assert paged == [row['id'] for row in single]
+    
+    # Same rows per filter as SQLite, NULL sort values included
+    filters = {'viable': 1, 'min_price': 1}
+    assert listings(pg_manager, order_by=order_by, filters=filters, fields=('source', 'listing_id', 'address')).keys() == \
+        listings(db_manager, order_by=order_by, filters=filters, fields=('source', 'listing_id', 'address')).keys()
+
+def test_summary_and_stats_match_sqlite(pg_manager, db_manager, analyzed):
+    pg_manager.store_properties(analyzed)
+    db_manager.store_properties(analyzed)
+    
+    summary, expected = pg_manager.get_property_summary(), db_manager.get_property_summary()
+    for name in ('total', 'viable', 'new', 'county_distribution', 'wabo_distribution', 'average_viability_score'):
+        assert summary[name] == expected[name]
+    
+    stats, expected = pg_manager.get_database_stats(), db_manager.get_database_stats()
+    for name in ('properties_count', 'property_analysis_count', 'current_analysis_count',
+                 'properties_last_7_days', 'viability_distribution'):
+        assert stats[name] == expected[name]
+
+def test_price_changes_are_recorded(pg_manager, analyzed):
+    priced = [item for item in analyzed if item['property']['price']][:10]
+    pg_manager.store_properties(priced)
+    for item in priced:
+        item['property']['price'] *= 0.8
+    pg_manager.store_properties(priced)
+    
+    drops = pg_manager.get_price_drops(min_drop_percentage=10)
+    assert len(drops) == len(priced)
+    assert all(row['price_drop_percentage'] == pytest.approx(20) for row in drops)
+    events = pg_manager.get_property_events(drops[0]['id'], 'price')
+    assert events[0]['old_value'] == pytest.approx(drops[0]['previous_price'])
+
+def test_search_matches_sqlite(pg_manager, db_manager, analyzed):
+    if not db_manager.full_text_search:
+        pytest.skip('SQLite built without FTS5')
+    pg_manager.store_properties(analyzed)
+    db_manager.store_properties(analyzed)
+    
+    for query in ('dshs licensed', 'turnk*', '"needs work"', 'Main'):
+        found = {row['address'] for row in pg_manager.search_properties(query, limit=1000)}
+        assert found == {row['address'] for row in db_manager.search_properties(query, limit=1000)}
+
+def test_queued_writes_commit_on_flush(pg_manager, analyzed):
+    pg_manager.store_properties_async(analyzed[:50])
+    pg_manager.record_search_history({'total_properties': 50})
+    pg_manager.store_cached_analyses([('key', dict(analyzed[0]['analysis'], property_hash='p', config_hash='c'))] * 2)
+    assert pg_manager.flush(timeout=30)
+    
+    stats = pg_manager.get_database_stats()
+    assert stats['properties_count'] == 50 and stats['search_history_count'] == 1
+    assert list(pg_manager.get_cached_analyses(['key', 'missing'])) == ['key']
+
+def test_compact_and_export(pg_manager, analyzed, tmp_path):
+    pytest.importorskip('pyarrow')
+    pg_manager.store_properties(analyzed)
+    
+    result = pg_manager.compact()
+    assert 'error' not in result
+    export = pg_manager.export_snapshot(str(tmp_path))
+    assert export['rows'] == len(analyzed)
+
+def test_updated_at_is_the_write_time(pg_manager, analyzed):
+    # The comps refresh watermark reads updated_at, so it must not be the transaction start
+    with pg_manager.connections.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT now(), pg_sleep(0.05)')
+        started = cursor.fetchone()[0]
+        pg_manager._upsert_property(cursor, analyzed[0]['property'])
+        pg_manager._upsert_property(cursor, analyzed[0]['property'])
+        cursor.execute('SELECT created_at, updated_at FROM properties')
+        created_at, updated_at = cursor.fetchone()
+    
+    assert started == created_at < updated_at
@@ -0,0 +1,76 @@
+"""
+Tests for retention policies and compaction
+"""
+
+import pytest
+
+from storage.database import DatabaseManager, INSERT_ANALYSIS_SQL
+
+@pytest.fixture
+def retention_db(tmp_path):
+    manager = DatabaseManager({
+        'path': str(tmp_path / 'retention.db'),
+        'retention': {'batch_size': 2, 'analysis_keep_all_days': 14, 'analysis_snapshot_days': 180,
+                      'notifications_days': 180, 'property_events_days': 730}
+    })
+    yield manager
+    manager.close()
+
+def add_analysis(conn, property_id, age):
+    """Insert an analysis created `age` ago (an SQLite datetime modifier such as '-5 days')"""
+    cursor = conn.execute(INSERT_ANALYSIS_SQL, (property_id, True, 75.0, None, '', *[None] * 5, None, None))
+    conn.execute("UPDATE property_analysis SET created_at = datetime('now', ?) WHERE id = ?", (age, cursor.lastrowid))
+    return cursor.lastrowid
+
+def test_compaction_applies_retention_policies(retention_db):
+    listings = [{'source': 'zillow', 'listing_id': str(index), 'address': f'{index} Main St'} for index in (1, 2)]
+    retention_db.store_properties([{'property': listing, 'analysis': {}} for listing in listings])
+    
+    with retention_db.connections.connection() as conn:
+        # Rows are inserted oldest first, as they would be in production
+        conn.execute("UPDATE property_analysis SET created_at = datetime('now', '-1000 days') WHERE property_id = 2")
+        conn.execute("UPDATE property_analysis SET created_at = datetime('now', '-400 days') WHERE property_id = 1")
+        same_week_older = add_analysis(conn, 1, '-100 days')
+        same_week_newer = add_analysis(conn, 1, '-100 days')
+        recent = add_analysis(conn, 1, '-5 days')
+        current = add_analysis(conn, 1, '-0 days')
+        conn.executemany("INSERT INTO notifications (property_id, notification_type, sent_at) "
+                         "VALUES (1, 'new_property', datetime('now', ?))", [('-300 days',), ('-200 days',), ('-1 days',)])
+        conn.execute("INSERT INTO property_events (property_id, field, old_value, new_value, ts) "
+                     "VALUES (1, 'price', 1, 2, datetime('now', '-800 days'))")
+    
+    result = retention_db.compact()
+    
+    with retention_db.connections.connection() as conn:
+        kept = {row[0] for row in conn.execute('SELECT id FROM property_analysis WHERE property_id = 1')}
+        assert kept == {same_week_newer, recent, current}
+        assert same_week_older not in kept
+        # A property's current analysis is kept however old it is
+        assert conn.execute('SELECT COUNT(*) FROM property_analysis WHERE property_id = 2').fetchone()[0] == 1
+        assert conn.execute('SELECT COUNT(*) FROM notifications').fetchone()[0] == 1
+        assert conn.execute('SELECT COUNT(*) FROM property_events').fetchone()[0] == 0
+    
+    assert result['deleted'] == {'property_analysis': 2, 'notifications': 2, 'search_history': 0, 'property_events': 1}
+    stats = retention_db.get_database_stats()
+    assert stats['rows_compacted'] == 5
+    assert stats['property_analysis_count'] == 4
+    assert stats['notifications_count'] == 1
+
+def test_compaction_disabled(tmp_path):
+    manager = DatabaseManager({'path': str(tmp_path / 'off.db'), 'retention': {'enabled': False}})
+    try:
+        assert manager.compact() == {'deleted': {}, 'bytes_reclaimed': 0}
+    finally:
+        manager.close()
+
+def test_compaction_returns_freed_pages(retention_db):
+    with retention_db.connections.connection() as conn:
+        conn.executemany("INSERT INTO notifications (property_id, notification_type, error_message, sent_at) "
+                         "VALUES (1, 'new_property', ?, datetime('now', '-365 days'))", [('x' * 2000,)] * 500)
+    size_before = retention_db.get_database_stats()['database_size_bytes']
+    
+    result = retention_db.compact()
+    
+    assert result['deleted']['notifications'] == 500
+    assert result['bytes_reclaimed'] > 500 * 2000 * 0.9
+    assert retention_db.get_database_stats()['database_size_bytes'] == size_before - result['bytes_reclaimed']
@@ -0,0 +1,53 @@
+"""
+Tests for full-text keyword search over listing text
+"""
+
+import pytest
+
+from storage.database import _match_expression
+
+@pytest.fixture
+def search_db(db_manager):
+    if not db_manager.full_text_search:
+        pytest.skip('SQLite built without FTS5')
+    descriptions = [
+        'Turnkey rambler with wheelchair accessible entry',
+        'Renovated two story, roll-in shower',
+        'Fixer with large lot',
+        'Accessible single story near transit, turnkey'
+    ]
+    db_manager.store_properties([
+        {'property': {'source': 'zillow', 'listing_id': str(index), 'address': f'{index} Lake St',
+                      'city': 'Lakewood' if index % 2 else 'Tacoma', 'description': description, 'price': 500000},
+         'analysis': {'viable': True, 'viability_score': 60.0 + index * 10}}
+        for index, description in enumerate(descriptions, start=1)
+    ])
+    return db_manager
+
+def ids(rows):
+    return sorted(row['id'] for row in rows)
+
+@pytest.mark.parametrize('query', ['"unterminated', '***', 'a OR b NEAR(', "O'Brien 3-bed", ''])
+def test_user_input_is_always_a_valid_query(search_db, query):
+    # Operators and quotes are treated as text, never as FTS5 syntax errors
+    search_db.search_properties(query)
+
+def test_terms_phrases_and_prefixes(search_db):
+    assert ids(search_db.search_properties('turnkey')) == [1, 4]
+    assert ids(search_db.search_properties('"roll-in shower"')) == [2]
+    assert ids(search_db.search_properties('renov*')) == [2]
+    assert ids(search_db.search_properties('accessible lakewood')) == [1]
+    assert _match_expression('***') in (None, '')
+
+def test_results_carry_rank_snippet_and_filters(search_db):
+    rows = search_db.search_properties('accessible')
+    assert [row['search_rank'] for row in rows] == sorted((row['search_rank'] for row in rows), reverse=True)
+    assert all('[' in row['snippet'] for row in rows)
+    assert ids(search_db.search_properties('accessible', filters={'min_score': 100})) == [4]
+
+def test_index_follows_listing_changes(search_db):
+    search_db.store_properties([{'property': {'source': 'zillow', 'listing_id': '3', 'address': '3 Lake St',
+                                              'city': 'Tacoma', 'description': 'Fully renovated', 'price': 500000},
+                                 'analysis': {}}])
+    assert ids(search_db.search_properties('fixer')) == []
+    assert ids(search_db.search_properties('renovated')) == [2, 3]
@@ -0,0 +1,56 @@
+"""
+Tests for the Monte Carlo sensitivity analyzer
+"""
+
+import numpy as np
+import pytest
+
+from analyzers.afh_analyzer import AFHAnalyzer
+from analyzers.sensitivity import SensitivityAnalyzer
+from conftest import make_properties
+
+EXPENSE_KEYS = ('utilities', 'insurance', 'maintenance', 'supplies', 'licensing_fees')
+
+@pytest.fixture
+def sensitivity(analysis_config):
+    config = dict(analysis_config, sensitivity=dict(analysis_config.get('sensitivity', {}), seed=7))
+    return SensitivityAnalyzer(AFHAnalyzer(config))
+
+def scalar_scenarios(analysis_config, scenarios, properties):
+    """(cash flow, DSCR, viability score) per property and scenario, from one scalar analyzer per scenario"""
+    results = np.zeros((3, len(properties), len(scenarios['occupancy_rate'])))
+    for scenario in range(len(scenarios['occupancy_rate'])):
+        config = dict(analysis_config,
+                      occupancy_rate=scenarios['occupancy_rate'][scenario],
+                      medicaid_rate_per_day=scenarios['medicaid_rate_per_day'][scenario],
+                      private_pay_rate_per_day=scenarios['private_pay_rate_per_day'][scenario])
+        for key in EXPENSE_KEYS:
+            config[key] = analysis_config[key] * scenarios['expense_factor'][scenario]
+        analyzer = AFHAnalyzer(config)
+        for index, property_data in enumerate(properties):
+            analysis = analyzer.score_property(property_data)
+            results[:, index, scenario] = (analysis['financial_analysis']['monthly_cash_flow'],
+                                           analysis['financial_analysis']['dscr'],
+                                           analysis['viability_score'])
+    return results
+
+def test_percentiles_and_probabilities_match_scalar_scenarios(sensitivity, analysis_config):
+    properties = [property_data for property_data in make_properties(40, seed=3) if property_data['price']][:8]
+    scenarios = sensitivity.sample_scenarios(300)
+    cash_flow, dscr, viability = scalar_scenarios(analysis_config, scenarios, properties)
+    
+    results = sensitivity.analyze_properties(properties, num_scenarios=300)
+    
+    for name, values in (('cash_flow', cash_flow), ('dscr', dscr), ('viability', viability)):
+        expected = np.percentile(values, sensitivity.percentiles, axis=1).T
+        for column, percentile in enumerate(sensitivity.percentiles):
+            np.testing.assert_allclose(results[f'{name}_p{percentile}'], expected[:, column], rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(results['prob_min_cash_flow'], (cash_flow >= analysis_config['min_cash_flow']).mean(axis=1))
+    np.testing.assert_allclose(results['prob_dscr_above_1'], (dscr >= 1).mean(axis=1))
+    np.testing.assert_allclose(results['prob_viable'],
+                               (viability >= sensitivity.analyzer.viability_threshold).mean(axis=1))
+
+def test_scenarios_are_reproducible_with_a_seed(sensitivity):
+    first, second = sensitivity.sample_scenarios(100), sensitivity.sample_scenarios(100)
+    for name in first:
+        assert np.array_equal(first[name], second[name])
@@ -0,0 +1,131 @@
+"""
+Tests for the background group-commit writer
+"""
+
+import atexit
+import threading
+import time
+
+import pytest
+
+from storage import writer as writer_module
+from storage.connection import ConnectionManager
+from storage.writer import BackgroundWriter
+
+class ForeignKeyConnectionManager(ConnectionManager):
+    """Connections that enforce foreign keys, so deferred violations fail at COMMIT"""
+    
+    def _open(self):
+        conn = super()._open()
+        conn.execute('PRAGMA foreign_keys = ON')
+        return conn
+
+@pytest.fixture
+def connections(tmp_path):
+    connections = ForeignKeyConnectionManager(str(tmp_path / 'writer.db'))
+    with connections.connection() as conn:
+        conn.execute('CREATE TABLE parents (id INTEGER PRIMARY KEY)')
+        conn.execute('CREATE TABLE rows (value TEXT, parent_id INTEGER '
+                     'REFERENCES parents(id) DEFERRABLE INITIALLY DEFERRED)')
+        conn.execute('INSERT INTO parents (id) VALUES (1)')
+    yield connections
+    connections.close()
+
+@pytest.fixture
+def make_writer(connections):
+    writers = []
+    
+    def make_writer(**config):
+        writer = BackgroundWriter(connections, {'max_delay_ms': 1000, **config})
+        writers.append(writer)
+        return writer
+    
+    yield make_writer
+    for writer in writers:
+        writer.close()
+
+def insert_rows(cursor, payloads):
+    for payload in payloads:
+        if payload == 'bad':
+            raise ValueError('bad payload')
+    cursor.executemany('INSERT INTO rows (value, parent_id) VALUES (?, ?)',
+                       [(payload, 2 if payload == 'orphan' else 1) for payload in payloads])
+
+def stored(connections):
+    return [row[0] for row in connections.connection().execute('SELECT value FROM rows ORDER BY rowid')]
+
+def test_writes_are_committed_in_groups(connections, make_writer):
+    calls = []
+    
+    def handler(cursor, payloads):
+        calls.append(len(payloads))
+        insert_rows(cursor, payloads)
+    
+    writer = make_writer()
+    for index in range(50):
+        writer.submit(handler, str(index))
+    assert writer.flush(timeout=5)
+    
+    assert stored(connections) == [str(index) for index in range(50)]
+    assert sum(calls) == 50 and len(calls) < 50
+    assert writer.pending() == 0
+
+def test_flush_does_not_wait_for_a_queue_slot(connections, make_writer):
+    started, release = threading.Event(), threading.Event()
+    
+    def blocking(cursor, payloads):
+        started.set()
+        release.wait(5)
+        insert_rows(cursor, payloads)
+    
+    writer = make_writer(max_batch=1, max_pending=2)
+    writer.submit(blocking, 'first')
+    assert started.wait(5)
+    writer.submit(insert_rows, 'second')
+    writer.submit(insert_rows, 'third')  # The queue is now full
+    
+    began = time.monotonic()
+    assert writer.flush(timeout=0.2) is False
+    assert time.monotonic() - began < 2
+    
+    release.set()
+    assert writer.flush(timeout=5)
+    assert stored(connections) == ['first', 'second', 'third']
+
+def test_failed_write_only_drops_its_own_payload(connections, make_writer):
+    writer = make_writer()
+    for payload in ['a', 'bad', 'b']:
+        writer.submit(insert_rows, payload)
+    assert writer.flush(timeout=5)
+    
+    assert stored(connections) == ['a', 'b']
+    assert writer.failed == 1
+
+def test_failed_commit_is_retried_one_write_at_a_time(connections, make_writer):
+    # The orphan only violates its deferred foreign key at COMMIT, failing the whole group
+    writer = make_writer()
+    for payload in ['a', 'orphan', 'b']:
+        writer.submit(insert_rows, payload)
+    assert writer.flush(timeout=5)
+    
+    assert stored(connections) == ['a', 'b']
+    assert writer.failed == 1
+
+def test_disabled_writer_applies_immediately(connections, make_writer):
+    writer = make_writer(enabled=False)
+    writer.submit(insert_rows, 'a')
+    assert stored(connections) == ['a']
+    assert writer.flush()
+
+def test_one_exit_hook_drains_every_writer(connections, make_writer):
+    callbacks = atexit._ncallbacks()
+    writers = [make_writer(), make_writer()]
+    for index, writer in enumerate(writers):
+        writer.submit(insert_rows, str(index))
+    assert atexit._ncallbacks() == callbacks
+    assert set(writers) <= set(writer_module._live_writers)
+    
+    writer_module._close_live_writers()
+    
+    assert sorted(stored(connections)) == ['0', '1']
+    assert not set(writers) & set(writer_module._live_writers)